@@ -2,6 +2,7 @@ import os
 import socket
 
 from leapp.utils.clicmd import command, command_opt
+import leapp.cli.prune
 import leapp.cli.upgrade
 from leapp import VERSION
 
@@ -15,4 +16,5 @@ def cli(args):
 def main():
     os.environ['LEAPP_HOSTNAME'] = socket.getfqdn()
     cli.command.add_sub(leapp.cli.upgrade.upgrade.command)
+    cli.command.add_sub(leapp.cli.prune.prune.command)
     cli.command.execute('leapp version {}'.format(VERSION))
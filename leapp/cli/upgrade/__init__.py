@@ -7,6 +7,7 @@ from leapp.exceptions import LeappError
 from leapp.logger import configure_logger
 from leapp.repository.scan import find_and_scan_repositories
 from leapp.utils.audit import Execution, get_connection, get_checkpoints
+from leapp.utils.audit.retention import get_retention_policy, prune
 from leapp.utils.clicmd import command, command_opt
 from leapp.utils.output import report_errors
 
@@ -52,6 +53,8 @@ def upgrade(args):
         context = fetch_last_upgrade_context()
         skip_phases_until = get_last_phase(context)
     else:
+        if get_config().getboolean('retention', 'automatic'):
+            prune(**get_retention_policy())
         e = Execution(context=context, kind='upgrade', configuration={})
         e.store()
     os.environ['LEAPP_EXECUTION_ID'] = context
@@ -10,10 +10,51 @@ _LEAPP_CONFIG = None
 _CONFIG_DEFAULTS = {
     'database': {
         'path': '/var/lib/leapp/leapp.db',
+        'profile': 'default',
+        'synchronous': '',
+        'busy_timeout': '5000',
+        'wal_autocheckpoint': '1000',
+        'audit_writer': 'False',
+        'audit_writer_batch_size': '1000',
+        'compression_threshold': '4096',
+        'compression_level': '6',
+        'side_storage_threshold': '16777216',
+        'side_storage_dir': '',
+    },
+    'retention': {
+        'automatic': 'False',
+        'max_age_days': '90',
+        'kinds': '',
+        'keep_last': '1',
+        'archive': 'True',
+        'archive_dir': '',
+        'vacuum_pages': '0',
     },
     'repositories': {
         'repo_path': '.',
     },
+    'workflow': {
+        'max_workers': '1',
+    },
+    'executor': {
+        'kind': 'process',
+        'pool_size': '2',
+        'max_actors_per_worker': '1',
+    },
+    'logging': {
+        'asynchronous': 'False',
+        'queue_size': '10000',
+        'batch_size': '500',
+    },
+    'messaging': {
+        'codec': 'json',
+        'payload_cache_size': '33554432',
+        'stream': 'False',
+        'stream_batch_size': '500',
+        'write_buffer_size': '0',
+        'write_errors_immediately': 'True',
+        'workflow_cache': 'False',
+    },
 }
 
 
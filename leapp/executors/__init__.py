@@ -0,0 +1,205 @@
+""" Leapp Executors
+
+Executors are responsible for running actors isolated from the process that orchestrates the execution, e.g. the
+workflow. Every actor execution is described by an :py:class:`ActorJob` which is handed to the executor configured in
+the `executor` section of the leapp configuration.
+"""
+import logging
+import os
+import sys
+import time
+import traceback
+from io import UnsupportedOperation
+
+import six
+
+from leapp.actors import get_actors
+from leapp.config import get_config
+from leapp.exceptions import LeappRuntimeError
+from leapp.logger import flush_audit_log
+from leapp.utils.audit import writer as audit_writer
+
+
+def _get_stdin_fileno():
+    try:
+        return sys.stdin.fileno()
+    except (AttributeError, UnsupportedOperation):
+        return None
+
+
+def _exit_code(exc):
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, six.integer_types):
+        return exc.code
+    sys.stderr.write(str(exc.code) + '\n')
+    return 1
+
+
+def _run_job(job, connection):
+    """
+    Runs the job in a process which is not terminated afterwards and returns the exit code the process would have had.
+    """
+    try:
+        job.run(connection)
+        return 0
+    except SystemExit as e:
+        return _exit_code(e)
+    except BaseException:  # noqa
+        # Same behaviour as for actors executed by multiprocessing.Process
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+class ActorJob(object):
+    """
+    Describes a single actor execution which is passed to the process executing the actor.
+    """
+    def __init__(self, definition, logger, messaging, args=(), kwargs=None):
+        """
+        :param definition: Definition of the actor to execute
+        :type definition: :py:class:`leapp.repository.actor_definition.ActorDefinition`
+        :param logger: Logger to be passed to the actor
+        :type logger: :py:class:`logging.Logger` or None
+        :param messaging: Messaging to be passed to the actor
+        :type messaging: :py:class:`leapp.messaging.BaseMessaging` or None
+        :param args: Positional arguments for the actor's run method
+        :type args: tuple
+        :param kwargs: Keyword arguments for the actor's run method
+        :type kwargs: dict
+        """
+        self.definition = definition
+        self.logger = logger
+        self.messaging = messaging
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.stdin = None
+        self.environ = dict(os.environ)
+        self.dispatched = time.time()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['logger'] = self.logger.name if self.logger else None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.logger is not None:
+            self.logger = logging.getLogger(self.logger)
+
+    def run(self, connection=None):
+        """
+        Executes the actor in the current process.
+
+        :param connection: Connection to report the start and the results of the actor execution with
+        :type connection: :py:class:`multiprocessing.connection.Connection` or None
+        :return: None
+        """
+        if connection is not None:
+            connection.send(('started', time.time()))
+        try:
+            self._run()
+        finally:
+            try:
+                flush_audit_log()
+                if self.messaging is not None:
+                    self.messaging.flush()
+                # Whatever the actor stored has to be written before its results are processed
+                audit_writer.flush()
+            finally:
+                # The produced messages, errors and answers are passed back at once when the actor has finished
+                if connection is not None and self.messaging is not None:
+                    connection.send(('results', self.messaging.export_results()))
+
+    def _run(self):
+        if self.stdin is not None:
+            sys.stdin = os.fdopen(self.stdin)
+        # The process might have been started before the environment of the dispatching process has been updated
+        if os.environ != self.environ:
+            os.environ.clear()
+            os.environ.update(self.environ)
+        self.definition.load()
+        with self.definition.injected_context():
+            target_actor = [actor for actor in get_actors() if actor.name == self.definition.name][0]
+            target_actor(logger=self.logger, messaging=self.messaging).run(*self.args, **self.kwargs)
+
+
+class ActorExecutor(object):
+    """
+    ActorExecutor is the base class for all executor implementations.
+    """
+    def __init__(self):
+        self.log = logging.getLogger('leapp.executor')
+        self._launch_latencies = []
+
+    @property
+    def launch_latencies(self):
+        """
+        :return: Tuple of (actor name, seconds) pairs of the time it took from dispatching an actor until it started
+        """
+        return tuple(self._launch_latencies)
+
+    def _record_launch(self, job, started):
+        latency = max(0.0, started - job.dispatched)
+        self._launch_latencies.append((job.definition.name, latency))
+        self.log.debug('Actor %s launched after %.2f ms', job.definition.name, latency * 1000)
+
+    def _handle_report(self, job, kind, value):
+        if kind == 'started':
+            self._record_launch(job, value)
+        elif kind == 'results' and job.messaging is not None:
+            job.messaging.import_results(value)
+
+    @staticmethod
+    def _check_exit_code(job, exitcode):
+        if exitcode != 0:
+            raise LeappRuntimeError(
+                'Actor {actorname} unexpectedly terminated with exit code: {exitcode}'
+                .format(actorname=job.definition.name, exitcode=exitcode))
+
+    def execute(self, job):
+        """
+        Executes the given job and returns when the actor execution has finished.
+
+        :param job: Actor execution to perform
+        :type job: :py:class:`ActorJob`
+        :return: None
+        :raises leapp.exceptions.LeappRuntimeError: When the actor terminated unexpectedly
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Releases all resources held by the executor.
+
+        :return: None
+        """
+
+
+def get_executor(actors=()):
+    """
+    Creates the executor configured by the `kind` option in the `executor` section of the leapp configuration.
+
+    Supported kinds are `process`, which executes every actor in a new child process, `pool`, which executes
+    actors in pre-forked worker processes, and `zygote`, which forks every actor from a process that has preloaded
+    all actors.
+
+    :param actors: Definitions of the actors which are going to be executed
+    :type actors: Iterable of :py:class:`leapp.repository.actor_definition.ActorDefinition`
+    :return: Instance of an :py:class:`ActorExecutor` derived class
+    """
+    kind = get_config().get('executor', 'kind')
+    if kind == 'zygote':
+        from leapp.executors.zygote import ZygoteExecutor
+        return ZygoteExecutor(definitions=actors)
+    if kind == 'pool':
+        from leapp.executors.pool import PoolExecutor
+        return PoolExecutor(size=get_config().getint('executor', 'pool_size'),
+                            max_actors_per_worker=get_config().getint('executor', 'max_actors_per_worker'))
+    if kind != 'process':
+        logging.getLogger('leapp.executor').warning('Unknown executor kind %s - Falling back to process', kind)
+    from leapp.executors.process import ProcessExecutor
+    return ProcessExecutor()
@@ -0,0 +1,125 @@
+import atexit
+import os
+import sys
+import threading
+import weakref
+from multiprocessing import Pipe, Process
+
+from leapp.executors import ActorExecutor, _get_stdin_fileno, _run_job
+from leapp.utils.audit import database_lock
+
+
+def _worker_main(connection, stdin, max_actors):
+    if stdin is not None:
+        sys.stdin = os.fdopen(stdin)
+    executed = 0
+    while not max_actors or executed < max_actors:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        executed += 1
+        exitcode = _run_job(job, connection)
+        connection.send(('finished', exitcode))
+        if exitcode:
+            return
+
+
+class _Worker(object):
+    def __init__(self, stdin, max_actors):
+        self.connection, child_connection = Pipe()
+        self.process = Process(target=_worker_main, args=(child_connection, stdin, max_actors))
+        with database_lock():
+            self.process.start()
+        child_connection.close()
+        self.executed = 0
+
+    def retire(self):
+        try:
+            self.connection.send(None)
+        except (IOError, OSError):
+            pass
+        self.connection.close()
+        self.process.join()
+
+
+_POOLS = weakref.WeakSet()
+
+
+@atexit.register
+def _close_pools():
+    for pool in list(_POOLS):
+        pool.close()
+
+
+class PoolExecutor(ActorExecutor):
+    """
+    Executes actors in a pool of pre-forked worker processes.
+
+    Workers are forked when the pool is created and whenever a worker is retired, so that dispatching an actor does
+    not have to wait for a new process to be started. A worker is retired after it executed `max_actors_per_worker`
+    actors or when an actor terminated unexpectedly. With the default of one actor per worker every actor is still
+    executed in a process of its own.
+    """
+
+    def __init__(self, size=2, max_actors_per_worker=1):
+        """
+        :param size: Number of worker processes
+        :type size: int
+        :param max_actors_per_worker: Number of actors a worker executes before it is replaced, 0 means unlimited
+        :type max_actors_per_worker: int
+        """
+        super(PoolExecutor, self).__init__()
+        self._max_actors = max(0, max_actors_per_worker)
+        self._stdin = _get_stdin_fileno()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._idle = [_Worker(self._stdin, self._max_actors) for _ in range(max(1, size))]
+        _POOLS.add(self)
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle:
+                self._condition.wait()
+            return self._idle.pop(0)
+
+    def _release(self, worker, reusable):
+        if not reusable:
+            worker.retire()
+            worker = None if self._closed else _Worker(self._stdin, self._max_actors)
+        if worker is None:
+            return
+        with self._condition:
+            if not self._closed:
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+        worker.retire()
+
+    def execute(self, job):
+        worker = self._acquire()
+        exitcode = None
+        try:
+            worker.connection.send(job)
+            while exitcode is None:
+                kind, value = worker.connection.recv()
+                if kind == 'finished':
+                    exitcode = value
+                else:
+                    self._handle_report(job, kind, value)
+        except (EOFError, IOError, OSError):
+            worker.process.join()
+            exitcode = worker.process.exitcode
+        finally:
+            worker.executed += 1
+            self._release(worker, exitcode == 0 and (not self._max_actors or worker.executed < self._max_actors))
+        self._check_exit_code(job, exitcode)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.retire()
@@ -0,0 +1,31 @@
+from multiprocessing import Pipe, Process
+
+from leapp.executors import ActorExecutor, _get_stdin_fileno
+from leapp.utils.audit import database_lock
+
+
+def _process_main(job, connection):
+    job.run(connection)
+
+
+class ProcessExecutor(ActorExecutor):
+    """
+    Executes every actor in a new child process.
+    """
+
+    def execute(self, job):
+        job.stdin = _get_stdin_fileno()
+        reader, writer = Pipe(duplex=False)
+        p = Process(target=_process_main, args=(job, writer))
+        with database_lock():
+            p.start()
+        writer.close()
+        try:
+            while True:
+                self._handle_report(job, *reader.recv())
+        except EOFError:
+            pass
+        finally:
+            reader.close()
+        p.join()
+        self._check_exit_code(job, p.exitcode)
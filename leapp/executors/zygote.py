@@ -0,0 +1,210 @@
+import atexit
+import gc
+import itertools
+import logging
+import os
+import select
+import sys
+import threading
+import weakref
+from multiprocessing import Pipe, Process
+
+from leapp.exceptions import LeappRuntimeError
+from leapp.executors import ActorExecutor, _get_stdin_fileno, _run_job
+from leapp.utils.audit import database_lock
+
+# Interval in seconds in which the zygote checks for terminated children, whose status pipe is still held open by
+# processes they have spawned
+_REAP_INTERVAL = 0.5
+
+
+def _preload(definitions):
+    preloaded = {}
+    for definition in definitions:
+        try:
+            # The children inject the libraries loaded here instead of loading them again
+            definition.load(keep_libraries=True)
+        except Exception:  # noqa
+            # The actor will fail the same way in its own process, where the error is reported properly
+            logging.getLogger('leapp.executor').debug('Failed to preload actor in %s', definition.directory,
+                                                      exc_info=True)
+            continue
+        # All actor modules share the same module name, as do libraries of different actors with the same file name.
+        # Removing them from sys.modules ensures the next actor is loaded into module objects of its own instead of
+        # overwriting the globals of the previous one.
+        for module in [definition._module] + [library for _, library in definition._libraries or ()]:
+            if sys.modules.get(module.__name__) is module:
+                sys.modules.pop(module.__name__)
+        preloaded[definition.full_path] = definition
+    return preloaded
+
+
+def _exit_status(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _fork_child(job, zygote_connections):
+    reader, writer = Pipe(duplex=False)
+    pid = os.fork()
+    if pid == 0:
+        exitcode = 1
+        try:
+            reader.close()
+            for connection in zygote_connections:
+                connection.close()
+            gc.enable()
+            if job.definition._module:
+                # Actors are looked up by the name of their module
+                sys.modules[job.definition._module.__name__] = job.definition._module
+            exitcode = _run_job(job, writer)
+        finally:
+            os._exit(exitcode)
+    writer.close()
+    return reader, pid
+
+
+def _zygote_main(connection, definitions, stdin):
+    if stdin is not None:
+        sys.stdin = os.fdopen(stdin)
+    # Keeps the heap of the zygote as compact as possible and prevents the garbage collector of the children from
+    # touching, and therefore copying, the memory pages of the preloaded objects.
+    gc.disable()
+    preloaded = _preload(definitions)
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    children = {}
+    accepting = True
+
+    def finish(reader, status):
+        req_id, _ = children.pop(reader)
+        try:
+            while reader.poll():
+                kind, value = reader.recv()
+                connection.send((kind, req_id, value))
+        except (EOFError, IOError, OSError):
+            pass
+        reader.close()
+        connection.send(('finished', req_id, _exit_status(status)))
+
+    while accepting or children:
+        watched = list(children) + ([connection] if accepting else [])
+        readable = select.select(watched, [], [], _REAP_INTERVAL)[0]
+        for reader in readable:
+            if reader is connection:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    request = None
+                if request is None:
+                    accepting = False
+                    continue
+                req_id, job = request
+                job.definition = preloaded.get(job.definition.full_path, job.definition)
+                reader, pid = _fork_child(job, [connection] + list(children))
+                children[reader] = (req_id, pid)
+                continue
+            try:
+                kind, value = reader.recv()
+                connection.send((kind, children[reader][0], value))
+            except EOFError:
+                finish(reader, os.waitpid(children[reader][1], 0)[1])
+        for reader, (_, pid) in list(children.items()):
+            exited, status = os.waitpid(pid, os.WNOHANG)
+            if exited:
+                finish(reader, status)
+
+
+_ZYGOTES = weakref.WeakSet()
+
+
+@atexit.register
+def _close_zygotes():
+    for zygote in list(_ZYGOTES):
+        zygote.close()
+
+
+class ZygoteExecutor(ActorExecutor):
+    """
+    Executes every actor in a process forked from a zygote process.
+
+    The zygote is forked from the current process, which already has loaded the repositories, once the executor is
+    created. It then preloads the modules of the given actors and freezes its heap, so that the actor processes
+    forked from it share the memory of all loaded models, tags, topics, libraries and actors copy-on-write and can
+    start executing the actor immediately.
+    """
+
+    def __init__(self, definitions=()):
+        """
+        :param definitions: Definitions of the actors to preload in the zygote
+        :type definitions: Iterable of :py:class:`leapp.repository.actor_definition.ActorDefinition`
+        """
+        super(ZygoteExecutor, self).__init__()
+        self._connection, child_connection = Pipe()
+        self._process = Process(target=_zygote_main,
+                                args=(child_connection, tuple(definitions), _get_stdin_fileno()))
+        with database_lock():
+            self._process.start()
+        child_connection.close()
+        self._ids = itertools.count()
+        self._send_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._requests = {}
+        self._terminated = False
+        self._closed = False
+        self._reader = threading.Thread(target=self._read)
+        self._reader.daemon = True
+        self._reader.start()
+        _ZYGOTES.add(self)
+
+    def _read(self):
+        while True:
+            try:
+                kind, req_id, value = self._connection.recv()
+            except (EOFError, IOError, OSError):
+                break
+            with self._condition:
+                self._requests[req_id][kind] = value
+                self._condition.notify_all()
+        with self._condition:
+            self._terminated = True
+            self._condition.notify_all()
+
+    def execute(self, job):
+        with self._condition:
+            req_id = next(self._ids)
+            state = self._requests[req_id] = {}
+        try:
+            with self._send_lock:
+                self._connection.send((req_id, job))
+            with self._condition:
+                while 'finished' not in state and not self._terminated:
+                    self._condition.wait()
+        except (IOError, OSError):
+            pass
+        finally:
+            with self._condition:
+                self._requests.pop(req_id)
+        if 'finished' not in state:
+            raise LeappRuntimeError(
+                'Zygote process terminated unexpectedly while executing actor {actorname}'
+                .format(actorname=job.definition.name))
+        for kind in ('started', 'results'):
+            if kind in state:
+                self._handle_report(job, kind, state[kind])
+        self._check_exit_code(job, state['finished'])
+
+    def close(self):
+        with self._send_lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                self._connection.send(None)
+            except (IOError, OSError):
+                pass
+        self._process.join()
+        self._reader.join()
+        self._connection.close()
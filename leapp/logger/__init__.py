@@ -2,21 +2,116 @@ import datetime
 import logging
 import logging.config
 import os
+import threading
 import time
 import sys
+import traceback
+import weakref
 
-from leapp.utils.audit import Audit
+from six.moves import queue
+
+from leapp.config import get_config
+from leapp.utils.audit import Audit, store_audit_entries
 _logger = None
+_AUDIT_HANDLERS = weakref.WeakSet()
+
+
+def flush_audit_log():
+    """
+    Waits until all log records of the current process have been stored in the audit log.
+
+    :return: None
+    """
+    for handler in list(_AUDIT_HANDLERS):
+        handler.flush()
 
 
 class LeappAuditHandler(logging.Handler):
+    """
+    Stores log records in the audit log.
+
+    When enabled by the `asynchronous` option in the `logging` section of the leapp configuration, records are
+    handed to a writer thread, which stores them in batches. :py:meth:`flush` waits until all records emitted so far
+    have been stored.
+    """
+
     def __init__(self, *args, **kwargs):
-        super(LeappAuditHandler, self).__init__(*args, **kwargs)
         self.use_remote = kwargs.pop('use_remote', False)
+        super(LeappAuditHandler, self).__init__(*args, **kwargs)
         if self.use_remote:
             from leapp.utils.actorapi import get_actor_api
             self.url = 'leapp://localhost/actors/v1/log'
             self.session = get_actor_api()
+        config = get_config()
+        self._asynchronous = config.getboolean('logging', 'asynchronous')
+        self._queue_size = config.getint('logging', 'queue_size')
+        self._batch_size = config.getint('logging', 'batch_size')
+        self._pid = None
+        self._queue = None
+        self._queue_lock = threading.Lock()
+        self._queue_lock_pid = os.getpid()
+        _AUDIT_HANDLERS.add(self)
+
+    def _get_queue(self):
+        # The writer thread does not exist in forked processes, they start a writer of their own
+        if self._pid != os.getpid() or self._queue is None:
+            if self._queue_lock_pid != os.getpid():
+                # A lock inherited from the parent might be held by a thread which does not exist in this process
+                self._queue_lock, self._queue_lock_pid = threading.Lock(), os.getpid()
+            with self._queue_lock:
+                # Another thread might have started the writer while this one was waiting for the lock
+                if self._pid != os.getpid() or self._queue is None:
+                    entries = queue.Queue(self._queue_size)
+                    writer = threading.Thread(target=self._write, args=(entries,))
+                    writer.daemon = True
+                    writer.start()
+                    self._queue, self._pid = entries, os.getpid()
+        return self._queue
+
+    @staticmethod
+    def _store(batch):
+        try:
+            store_audit_entries(batch)
+        except Exception:  # noqa
+            if len(batch) == 1:
+                raise
+            # Store every record on its own, so that only the failing records are lost
+            for entry in batch:
+                try:
+                    store_audit_entries([entry])
+                except Exception:  # noqa
+                    if logging.raiseExceptions:
+                        traceback.print_exc()
+
+    def _write(self, entries):
+        while True:
+            batch = [entries.get()]
+            try:
+                while batch[-1] is not None and len(batch) < self._batch_size:
+                    batch.append(entries.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self._store([entry for entry in batch if entry is not None])
+            except Exception:  # noqa
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+            finally:
+                for _ in batch:
+                    entries.task_done()
+            if batch[-1] is None:
+                return
+
+    def flush(self):
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._queue.join()
+            self._queue = None
+        super(LeappAuditHandler, self).close()
 
     def emit(self, record):
         log_data = {
@@ -36,10 +131,13 @@ class LeappAuditHandler(logging.Handler):
         else:
             self._do_emit(log_data)
 
-    @staticmethod
-    def _do_emit(log_data):
+    def _do_emit(self, log_data):
         log_data['data'] = log_data.pop('log', {})
-        Audit(**log_data).store()
+        entry = Audit(**log_data)
+        if self._asynchronous:
+            self._get_queue().put(entry)
+        else:
+            entry.store()
 
     def _remote_emit(self, log_data):
         from leapp.utils.actorapi import RequestException
@@ -1,7 +1,6 @@
 import datetime
-import hashlib
+import itertools
 import json
-import multiprocessing
 import os
 import socket
 
@@ -9,9 +8,36 @@ from six.moves import configparser
 
 from leapp.dialogs.renderer import CommandlineRenderer
 from leapp.messaging.answerstore import AnswerStore
+from leapp.messaging.codecs import get_codec, verify_payload
+from leapp.messaging.messagestore import MessageStore, get_payload_cache
 from leapp.exceptions import CannotConsumeErrorMessages
 from leapp.models import ErrorModel
 
+# Number of messages of a single model created at once when consuming
+_CONSUME_BATCH_SIZE = 500
+
+
+def _is_trusted(entry):
+    # Messages loaded from the database have been validated when they were produced, their payloads are trusted only
+    # while they match their hash, payloads which have been altered or stored inconsistently are validated again
+    message, trusted = entry
+    return trusted and verify_payload(message['message'])
+
+
+def _create_many(model, messages, decode):
+    """
+    Creates the models of the given messages of a single model in batches, preserving their order.
+
+    The messages are given as tuples of a message and whether it is trusted.
+    """
+    while True:
+        batch = list(itertools.islice(messages, _CONSUME_BATCH_SIZE))
+        if not batch:
+            return
+        for trusted, group in itertools.groupby(batch, key=_is_trusted):
+            for instance in model.create_many([decode(message['message']) for message, _ in group], trusted=trusted):
+                yield instance
+
 
 class BaseMessaging(object):
     """
@@ -19,13 +45,46 @@ class BaseMessaging(object):
     supported within the framework. These are called the `produce` and `consume` methods.
     """
     def __init__(self, stored=True):
-        self._manager = multiprocessing.Manager()
         self._dialog_renderer = CommandlineRenderer()
-        self._data = self._manager.list()
-        self._answers = AnswerStore(manager=self._manager)
-        self._new_data = self._manager.list()
-        self._errors = self._manager.list()
+        self._data = MessageStore()
+        self._stream = None
+        self._answers = AnswerStore()
+        self._new_data = MessageStore()
+        self._errors = []
         self._stored = stored
+        self._lookups = {}
+        self._codec = get_codec()
+
+    def __getstate__(self):
+        # The model lookups are keyed by actor types, which are not necessarily available in other processes
+        state = self.__dict__.copy()
+        state['_lookups'] = {}
+        return state
+
+    def export_results(self):
+        """
+        Exports the results of an actor execution to be passed back from the process the actor has been executed in.
+
+        :return: Dictionary with the produced messages, reported errors and given answers
+        :rtype: dict
+        """
+        return {
+            'messages': list(self._new_data),
+            'errors': list(self._errors),
+            'answers': self._answers.export()
+        }
+
+    def import_results(self, results):
+        """
+        Imports the results of an actor execution exported by :py:meth:`export_results` in the actor process.
+
+        :param results: Results as returned by :py:meth:`export_results`
+        :type results: dict
+        :return: None
+        """
+        self._new_data.extend(results['messages'])
+        self._errors.extend(results['errors'])
+        self._answers.update(results['answers'])
 
     def load_answers(self, answer_file, workflow):
         """
@@ -60,6 +119,13 @@ class BaseMessaging(object):
         """
         return list(self._new_data)
 
+    def flush(self):
+        """
+        Processes all messages which have been buffered by the implementation.
+
+        :return: None
+        """
+
     def _perform_load(self, consumes):
         """
         Loads all messages that are requested from the `consumes` attribute of :py:class:`leapp.actors.Actor`
@@ -141,7 +207,7 @@ class BaseMessaging(object):
     def _do_produce(self, model, actor, target, stored=True):
         if not os.environ.get('LEAPP_HOSTNAME', None):
             os.environ['LEAPP_HOSTNAME'] = socket.getfqdn()
-        data = json.dumps(model.dump(), sort_keys=True)
+        data = self._codec.encode(model.dump())
         message = {
             'type': type(model).__name__,
             'actor': type(actor).name,
@@ -152,7 +218,8 @@ class BaseMessaging(object):
             'hostname': os.environ['LEAPP_HOSTNAME'],
             'message': {
                 'data': data,
-                'hash': hashlib.sha256(data.encode('utf-8')).hexdigest()
+                'hash': self._codec.digest(data),
+                'codec': self._codec.name
             }
         }
 
@@ -173,10 +240,17 @@ class BaseMessaging(object):
         :param actor: Actor that consumes the data
         :return: Iterable with messages matching the criteria
         """
-        types = tuple((getattr(t, '_resolved', t) for t in types))
-        messages = list(self._data) + list(self._new_data)
-        lookup = dict([(model.__name__, model) for model in type(actor).consumes])
+        lookup = self._lookups.get(type(actor))
+        if lookup is None:
+            lookup = self._lookups[type(actor)] = dict([(model.__name__, model) for model in type(actor).consumes])
         if types:
-            filtered = set(requested.__name__ for requested in types)
-            messages = [message for message in messages if message['type'] in filtered]
-        return (lookup[message['type']].create(json.loads(message['message']['data'])) for message in messages)
+            names = [getattr(t, '_resolved', t).__name__ for t in types]
+        else:
+            names = list(lookup.keys())
+        sources = (self._stream, self._data, self._new_data) if self._stream else (self._data, self._new_data)
+        messages = itertools.chain(*[source.by_types_with_trust(names) for source in sources])
+        decode = get_payload_cache().decode
+        if len(set(names)) == 1 and names[0] in lookup:
+            return _create_many(lookup[names[0]], messages, decode)
+        return (lookup[entry[0]['type']].create(decode(entry[0]['message']), trusted=_is_trusted(entry))
+                for entry in messages)
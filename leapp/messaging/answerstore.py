@@ -1,4 +1,3 @@
-import multiprocessing
 from six.moves import configparser
 import six
 
@@ -7,22 +6,33 @@ class AnswerStore(object):
     """
     AnswerStore handles storing and loading answer files for user questions.
     """
-    def __init__(self, manager=None):
+    def __init__(self):
         """
         Initialize the answer store.
-        :param manager: Passes through a given instance of multiprocessing.Manager() to use, by default it creates
-                        an own instance.
         """
-        self._manager = manager or multiprocessing.Manager()
-        self._storage = self._manager.dict()
+        self._storage = {}
 
     def answer(self, scope, key, value):
-        dialog_scope = self._storage.get(scope, {})
-        dialog_scope[key] = value
-        # As _storage is a dict proxy, we have to explicitly update the object via __setitem__
-        # Otherwise we won't get the update propagated to the parent process
-        # So don't even bother updating this to some more 'pythonic' coding style
-        self._storage[scope] = dialog_scope
+        self._storage.setdefault(scope, {})[key] = value
+
+    def export(self):
+        """
+        Exports all answers to be passed to another answer store.
+
+        :return: Dictionary with the answers by dialog scope
+        """
+        return dict((scope, dict(answers)) for scope, answers in self._storage.items())
+
+    def update(self, answers):
+        """
+        Updates the answers with answers exported by :py:meth:`export`.
+
+        :param answers: Dictionary with the answers by dialog scope
+        :type answers: dict
+        :return: None
+        """
+        for scope, values in answers.items():
+            self._storage.setdefault(scope, {}).update(values)
 
     def load(self, answer_file):
         """
@@ -34,7 +44,7 @@ class AnswerStore(object):
         conf = configparser.SafeConfigParser(allow_no_value=True)
         conf.read(answer_file)
         for section in conf.sections():
-            self._storage[section] = self._manager.dict(conf.items(section=section, raw=True))
+            self._storage[section] = dict(conf.items(section=section, raw=True))
 
     def load_and_translate_for_workflow(self, answer_file, workflow):
         """
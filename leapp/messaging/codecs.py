@@ -0,0 +1,331 @@
+"""
+Codecs serialize the data of message payloads.
+
+The codec used for produced messages is configured by the `codec` option in the `messaging` section of the leapp
+configuration. Every message payload records the name of its codec, so that messages serialized by different codecs
+can be consumed side by side. Payloads which do not record a codec have been serialized by the JSON codec.
+"""
+import hashlib
+import json
+import struct
+
+import six
+
+from leapp.config import get_config
+from leapp.exceptions import LeappRuntimeError
+from leapp.utils.audit.payloads import PayloadFile
+
+
+class Codec(object):
+    """
+    Base class of the message payload codecs
+    """
+
+    name = None
+    """ Name of the codec, which is recorded with every payload """
+
+    def encode(self, data):
+        """
+        Serializes the data of a message.
+
+        Equal data has to be serialized to the same payload, so that the hash of a payload identifies its content.
+        Payloads are stored only once per hash.
+
+        :param data: Builtin representation of a model as returned by :py:meth:`leapp.models.Model.dump`
+        :type data: dict
+        :return: Serialized payload
+        """
+        raise NotImplementedError()
+
+    def decode(self, payload):
+        """
+        Deserializes a payload serialized by :py:meth:`encode`.
+
+        :param payload: Serialized payload
+        :return: Builtin representation of the model
+        :rtype: dict
+        """
+        raise NotImplementedError()
+
+    def digest(self, payload):
+        """
+        :param payload: Serialized payload
+        :return: SHA256 hash in hexadecimal representation of the payload
+        :rtype: str
+        """
+        raise NotImplementedError()
+
+
+class JSONCodec(Codec):
+    """
+    JSON with sorted keys, the payloads are text and can be read by any consumer of messages.
+    """
+
+    name = 'json'
+
+    def encode(self, data):
+        return json.dumps(data, sort_keys=True)
+
+    def decode(self, payload):
+        return json.loads(payload.decode('utf-8') if isinstance(payload, bytes) else payload)
+
+    def digest(self, payload):
+        return hashlib.sha256(payload if isinstance(payload, bytes) else payload.encode('utf-8')).hexdigest()
+
+
+# Tags of the values of binary payloads
+_NONE, _TRUE, _FALSE, _INTEGER, _FLOAT, _STRING, _LIST, _MAP = (ord(tag) for tag in 'NTFIDSLM')
+_BYTES = [six.int2byte(value) for value in range(256)]
+_DOUBLE = struct.Struct('>d')
+
+
+def _encode_size(size):
+    if size < 0x80:
+        return _BYTES[size]
+    parts = []
+    while size > 0x7f:
+        parts.append(_BYTES[(size & 0x7f) | 0x80])
+        size >>= 7
+    parts.append(_BYTES[size])
+    return b''.join(parts)
+
+
+def _encode_string(value, append):
+    if isinstance(value, six.binary_type):
+        # Python 2 strings are text in model data, like the JSON codec treats them
+        value = value.decode('utf-8')
+    raw = value.encode('utf-8')
+    append(_encode_size(len(raw)))
+    append(raw)
+
+
+def _encode_text(value, append):
+    append(_BYTES[_STRING])
+    _encode_string(value, append)
+
+
+def _encode_integer(value, append):
+    append(_BYTES[_INTEGER])
+    # Zigzag encoding maps integers of small magnitude to small sizes regardless of their sign
+    append(_encode_size(value << 1 if value >= 0 else (-value << 1) - 1))
+
+
+def _encode_float(value, append):
+    append(_BYTES[_FLOAT])
+    append(_DOUBLE.pack(value))
+
+
+def _encode_map(value, append):
+    append(_BYTES[_MAP])
+    append(_encode_size(len(value)))
+    items = value.items()
+    if six.PY2:
+        items = [(key.decode('utf-8') if isinstance(key, str) else key, item) for key, item in items]
+    for key, item in sorted(items):
+        _encode_string(key, append)
+        _encode_value(item, append)
+
+
+def _encode_list(value, append):
+    append(_BYTES[_LIST])
+    append(_encode_size(len(value)))
+    for item in value:
+        _encode_value(item, append)
+
+
+_ENCODERS = {
+    type(None): lambda value, append: append(_BYTES[_NONE]),
+    bool: lambda value, append: append(_BYTES[_TRUE if value else _FALSE]),
+    float: _encode_float,
+    dict: _encode_map,
+    list: _encode_list,
+    tuple: _encode_list,
+}
+_ENCODERS.update((string_type, _encode_text) for string_type in six.string_types + (six.text_type,))
+_ENCODERS.update((integer_type, _encode_integer) for integer_type in six.integer_types)
+
+
+def _encode_value(value, append):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        # Instances of derived types are serialized like their base type
+        encoder = next((encoder for base, encoder in _ENCODERS.items() if isinstance(value, base)), None)
+        if encoder is None:
+            raise TypeError('{!r} can not be serialized by the binary codec'.format(value))
+    encoder(value, append)
+
+
+def _decode_size(payload, position):
+    size = payload[position]
+    if size < 0x80:
+        return size, position + 1
+    size &= 0x7f
+    shift = 7
+    while True:
+        position += 1
+        byte = payload[position]
+        size |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return size, position + 1
+        shift += 7
+
+
+def _decode_string(payload, position):
+    size, position = _decode_size(payload, position)
+    end = position + size
+    return payload[position:end].decode('utf-8'), end
+
+
+def _decode_map(payload, position):
+    size, position = _decode_size(payload, position)
+    value = {}
+    for _ in range(size):
+        key, position = _decode_string(payload, position)
+        value[key], position = _decode_value(payload, position)
+    return value, position
+
+
+def _decode_list(payload, position):
+    size, position = _decode_size(payload, position)
+    value = [None] * size
+    for index in range(size):
+        value[index], position = _decode_value(payload, position)
+    return value, position
+
+
+def _decode_integer(payload, position):
+    value, position = _decode_size(payload, position)
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), position
+
+
+def _decode_float(payload, position):
+    return _DOUBLE.unpack_from(payload, position)[0], position + _DOUBLE.size
+
+
+def _decode_invalid(payload, position):
+    raise LeappRuntimeError('Invalid binary message payload: unknown tag {} at {}'.format(
+        payload[position - 1], position - 1))
+
+
+_DECODERS = [_decode_invalid] * 256
+_DECODERS[_NONE] = lambda payload, position: (None, position)
+_DECODERS[_TRUE] = lambda payload, position: (True, position)
+_DECODERS[_FALSE] = lambda payload, position: (False, position)
+_DECODERS[_INTEGER] = _decode_integer
+_DECODERS[_FLOAT] = _decode_float
+_DECODERS[_STRING] = _decode_string
+_DECODERS[_LIST] = _decode_list
+_DECODERS[_MAP] = _decode_map
+
+
+def _decode_value(payload, position):
+    return _DECODERS[payload[position]](payload, position + 1)
+
+
+class BinaryCodec(Codec):
+    """
+    Canonical binary format, which is more compact than JSON and does not depend on the version of Python.
+
+    A payload starts with the version of the format followed by the serialized data. Every value is a tag byte
+    followed by its content: None, True and False consist of their tag only, integers are zigzag encoded varints,
+    floats are big-endian IEEE 754 doubles, strings are UTF-8 prefixed by their size in bytes as varint, lists are
+    their size as varint followed by their items and dictionaries their size followed by the keys as strings without
+    tag and their values, sorted by the keys. Equal data is therefore always serialized to the same payload.
+    """
+
+    name = 'binary'
+    version = 1
+
+    def encode(self, data):
+        parts = [_BYTES[self.version]]
+        _encode_value(data, parts.append)
+        return b''.join(parts)
+
+    def decode(self, payload):
+        # Indexing gives integers on Python 2 only for byte arrays
+        payload = bytearray(payload) if six.PY2 else bytes(payload)
+        if not payload or payload[0] != self.version:
+            raise LeappRuntimeError('Unsupported version of a binary message payload: {}'.format(
+                payload[0] if payload else None))
+        try:
+            data, position = _decode_value(payload, 1)
+        except (IndexError, UnicodeDecodeError, struct.error) as e:
+            raise LeappRuntimeError('Invalid binary message payload: {}'.format(e))
+        if position != len(payload):
+            raise LeappRuntimeError('Invalid binary message payload: trailing data at {}'.format(position))
+        return data
+
+    def digest(self, payload):
+        return hashlib.sha256(payload).hexdigest()
+
+
+_CODECS = dict((codec.name, codec) for codec in (JSONCodec(), BinaryCodec()))
+
+
+def get_codec(name=None):
+    """
+    Returns the codec of the given name or the configured codec.
+
+    :param name: Name of the codec, the codec configured in the leapp configuration if None
+    :type name: str or None
+    :return: Instance of :py:class:`Codec`
+    :raises leapp.exceptions.LeappRuntimeError: When the codec is unknown
+    """
+    name = name or get_config().get('messaging', 'codec')
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise LeappRuntimeError('Unknown message codec {name} - Supported codecs are: {codecs}'.format(
+            name=name, codecs=', '.join(sorted(_CODECS))))
+
+
+def decode_payload(payload):
+    """
+    Returns the deserialized data of a message payload.
+
+    :param payload: Message payload with the serialized `data` and optionally the name of its `codec`
+    :type payload: dict
+    :return: Builtin representation of the model
+    :rtype: dict
+    """
+    data = payload['data']
+    if isinstance(data, PayloadFile):
+        data = data.read()
+    return get_codec(payload.get('codec') or JSONCodec.name).decode(data)
+
+
+def verify_payload(payload):
+    """
+    Returns whether the serialized data of a message payload matches its hash.
+
+    Only payloads matching their hash are known to have been produced from a valid model.
+
+    :param payload: Message payload with the serialized `data`, its `hash` and optionally the name of its `codec`
+    :type payload: dict
+    :return: bool
+    """
+    data = payload['data']
+    if isinstance(data, PayloadFile):
+        data = data.read()
+    return data is not None and get_codec(payload.get('codec') or JSONCodec.name).digest(data) == payload.get('hash')
+
+
+def to_json_message(message):
+    """
+    Returns the message with its payload serialized by the JSON codec, e.g. to output it as JSON.
+
+    Messages whose payload has been serialized by another codec are copied, their payload is decoded and serialized
+    again.
+
+    :param message: Raw message as returned by :py:meth:`leapp.messaging.BaseMessaging.messages`
+    :type message: dict
+    :return: dict
+    """
+    payload = message['message']
+    if (payload.get('codec') or JSONCodec.name) == JSONCodec.name and not isinstance(payload['data'], PayloadFile):
+        return message
+    codec = _CODECS[JSONCodec.name]
+    data = codec.encode(decode_payload(payload))
+    message = dict(message)
+    message['message'] = dict(payload, data=data, hash=codec.digest(data), codec=codec.name)
+    return message
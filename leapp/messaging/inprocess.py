@@ -1,7 +1,149 @@
+import collections
 import os
+import threading
 
+from leapp.config import get_config
 from leapp.messaging import BaseMessaging
-from leapp.utils.audit import Message, Audit, MessageData, get_messages
+from leapp.messaging.codecs import JSONCodec
+from leapp.messaging.messagestore import MessageStore
+from leapp.models import ErrorModel
+from leapp.utils.audit import (Message, Audit, MessageData, get_last_message_id, get_messages, iter_messages,
+                               store_audit_entries)
+
+
+class MessageStream(object):
+    """
+    Provides the messages of the given model names from the database while they are iterated, instead of keeping them
+    in memory.
+
+    Only messages which have been stored at the time the stream has been created are provided.
+    """
+
+    def __init__(self, names, context, batch_size):
+        """
+        :param names: Names of the models to provide the messages for
+        :type names: list of str
+        :param context: Execution id to provide the messages of
+        :type context: str
+        :param batch_size: Number of messages fetched from the database at once
+        :type batch_size: int
+        """
+        self._names = frozenset(names)
+        self._context = context
+        self._batch_size = batch_size
+        self._until_id = get_last_message_id()
+
+    def by_types(self, names):
+        """
+        Returns all messages of the given model names.
+
+        :param names: Names of the models to return the messages for
+        :type names: Iterable of str
+        :return: Iterable of messages in the order they have been stored
+        """
+        return iter_messages([name for name in set(names) if name in self._names], self._context,
+                             until_id=self._until_id, batch_size=self._batch_size)
+
+    def by_types_with_trust(self, names):
+        """
+        Returns all messages of the given model names, which are all trusted as they are loaded from the database.
+
+        :param names: Names of the models to return the messages for
+        :type names: Iterable of str
+        :return: Iterable of tuples of a message and True, in the order they have been stored
+        """
+        return ((message, True) for message in self.by_types(names))
+
+
+class MessageCache(object):
+    """
+    Keeps the messages of the given model names of a workflow execution in the workflow process, so that the messages
+    consumed by an actor are provided without querying the database for every actor.
+
+    The cache is fed with the messages produced by the actors of the workflow. Messages stored by anyone else are
+    fetched by :py:meth:`refresh`, which only queries the messages stored after the last refresh. Fed messages are
+    trusted once they have been seen in the database, like the messages loaded from it.
+    """
+
+    def __init__(self, names, context):
+        """
+        :param names: Names of the models to keep the messages of
+        :type names: Iterable of str
+        :param context: Execution id to keep the messages of
+        :type context: str
+        """
+        self._names = frozenset(names)
+        self._context = context
+        self._store = MessageStore()
+        self._last_id = 0
+        # Positions of fed messages, which have not been seen in the database yet
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._store)
+
+    @staticmethod
+    def _key(message):
+        return message['type'], message['actor'], message['phase'], message['message']['hash']
+
+    def covers(self, names):
+        """
+        :param names: Names of models
+        :type names: Iterable of str
+        :return: Whether the messages of all the given model names are kept
+        :rtype: bool
+        """
+        return self._names.issuperset(names)
+
+    def feed(self, messages):
+        """
+        Adds messages which have been produced in the workflow execution.
+
+        :param messages: Produced messages
+        :type messages: Iterable of dict
+        :return: None
+        """
+        with self._lock:
+            for message in messages:
+                if message['type'] in self._names:
+                    position = self._store.append(message)
+                    self._pending.setdefault(self._key(message), collections.deque()).append(position)
+
+    def refresh(self):
+        """
+        Adds the messages stored in the database since the last refresh, which have not been fed already.
+
+        :return: Number of added messages
+        :rtype: int
+        """
+        added = 0
+        with self._lock:
+            for message in iter_messages(sorted(self._names), self._context, after_id=self._last_id):
+                self._last_id = message['id']
+                key = self._key(message)
+                fed = self._pending.get(key)
+                if fed:
+                    self._store.trust(fed.popleft())
+                    if not fed:
+                        del self._pending[key]
+                    continue
+                self._store.append(message, trusted=True)
+                added += 1
+        return added
+
+    def messages(self, names):
+        """
+        :param names: Names of the models to return the messages for
+        :type names: Iterable of str
+        :return: Store with the messages of the given model names in the order they have been added
+        :rtype: :py:class:`leapp.messaging.messagestore.MessageStore`
+        """
+        store = MessageStore()
+        with self._lock:
+            for message, trusted in self._store.by_types_with_trust(names):
+                store.append(message, trusted=trusted)
+        return store
 
 
 class InProcessMessaging(BaseMessaging):
@@ -9,10 +151,33 @@ class InProcessMessaging(BaseMessaging):
     This class implements the direct database access for the messaging.
     """
 
-    def __init__(self, stored=True):
+    def __init__(self, stored=True, cache=None):
+        """
+        :param stored: Whether produced messages are stored in the database
+        :type stored: bool
+        :param cache: Cache to load the consumed messages from instead of the database
+        :type cache: :py:class:`MessageCache` or None
+        """
         super(InProcessMessaging, self).__init__(stored=stored)
+        config = get_config()
+        self._buffer_size = config.getint('messaging', 'write_buffer_size')
+        self._write_errors_immediately = config.getboolean('messaging', 'write_errors_immediately')
+        self._buffer = []
+        self._cache = cache
+
+    def __getstate__(self):
+        # The cache is kept in the workflow process only, the loaded messages are passed on
+        state = super(InProcessMessaging, self).__getstate__()
+        state['_cache'] = None
+        return state
+
+    def flush(self):
+        self._buffer, buffered = [], self._buffer
+        store_audit_entries(buffered)
 
     def _process_message(self, message):
+        immediately = not self._buffer_size or (
+            self._write_errors_immediately and message['type'] == ErrorModel.__name__)
         message['event'] = 'new-message'
         message_keys = ('stamp', 'topic', 'actor', 'phase', 'hostname', 'context', 'msg_type')
         audit_keys = ('event', 'stamp', 'data', 'actor', 'phase', 'hostname', 'context')
@@ -21,10 +186,23 @@ class InProcessMessaging(BaseMessaging):
         msg = Message(**dict(((k, message[k]) for k in message_keys if k in message)))
         audit = Audit(**dict(((k, message[k]) for k in audit_keys if k in message)))
         audit.message = msg
-        audit.message.data = MessageData(data=payload['data'], hash_id=payload['hash'])
-        audit.store()
+        audit.message.data = MessageData(data=payload['data'], hash_id=payload['hash'],
+                                         codec=payload.get('codec', JSONCodec.name))
+        if immediately:
+            audit.store()
+        else:
+            self._buffer.append(audit)
+            if len(self._buffer) >= self._buffer_size:
+                self.flush()
         return message
 
     def _perform_load(self, consumes):
         context = os.environ.get('LEAPP_EXECUTION_ID', 'TESTING-CONTEXT')
-        self._data = get_messages([consume.__name__ for consume in consumes], context)
+        names = [consume.__name__ for consume in consumes]
+        config = get_config()
+        if self._cache is not None and self._cache.covers(names):
+            self._data = self._cache.messages(names)
+        elif config.getboolean('messaging', 'stream'):
+            self._stream = MessageStream(names, context, batch_size=config.getint('messaging', 'stream_batch_size'))
+        else:
+            self._data = MessageStore(get_messages(names, context), trusted=True)
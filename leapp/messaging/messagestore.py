@@ -0,0 +1,191 @@
+import collections
+import heapq
+import itertools
+import threading
+
+from leapp.config import get_config
+from leapp.messaging.codecs import decode_payload
+
+
+class MessageStore(object):
+    """
+    In memory storage of messages which is indexed by the name of the message models.
+
+    Messages are kept in the order they have been added and are returned in this order when queried.
+
+    Messages can be marked as trusted when they have been loaded from the audit database. Their payloads have been
+    validated when they were produced, so the consumed models are created from them without validation as long as the
+    payloads match their hash.
+    """
+
+    def __init__(self, messages=(), trusted=False):
+        """
+        :param messages: Messages to initially add to the store
+        :type messages: Iterable of dict
+        :param trusted: Whether the given messages have been loaded from the audit database
+        :type trusted: bool
+        """
+        self._messages = []
+        self._by_type = {}
+        self._trusted = set()
+        self.extend(messages, trusted=trusted)
+
+    def append(self, message, trusted=False):
+        """
+        Adds a message to the store.
+
+        :param message: Message to add
+        :type message: dict
+        :param trusted: Whether the message has been loaded from the audit database
+        :type trusted: bool
+        :return: Position of the message in the store
+        :rtype: int
+        """
+        position = len(self._messages)
+        self._by_type.setdefault(message['type'], []).append(position)
+        self._messages.append(message)
+        if trusted:
+            self._trusted.add(position)
+        return position
+
+    def extend(self, messages, trusted=False):
+        """
+        Adds all given messages to the store.
+
+        :param messages: Messages to add
+        :type messages: Iterable of dict
+        :param trusted: Whether the messages have been loaded from the audit database
+        :type trusted: bool
+        :return: None
+        """
+        for message in messages:
+            self.append(message, trusted=trusted)
+
+    def trust(self, position):
+        """
+        Marks the message at the given position as trusted, once it has been seen in the audit database.
+
+        :param position: Position of the message as returned by :py:meth:`append`
+        :type position: int
+        :return: None
+        """
+        self._trusted.add(position)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def by_types(self, names):
+        """
+        Returns all messages of the given model names.
+
+        Only messages stored at the time of the call are returned, messages added while iterating the result are not.
+
+        :param names: Names of the models to return the messages for
+        :type names: Iterable of str
+        :return: Iterable of messages in the order they have been added
+        """
+        return (self._messages[position] for position in self._positions(names))
+
+    def by_types_with_trust(self, names):
+        """
+        Returns all messages of the given model names together with whether they are trusted.
+
+        :param names: Names of the models to return the messages for
+        :type names: Iterable of str
+        :return: Iterable of tuples of a message and whether it is trusted, in the order they have been added
+        """
+        return ((self._messages[position], position in self._trusted) for position in self._positions(names))
+
+    def _positions(self, names):
+        indexes = [self._by_type[name] for name in set(names) if name in self._by_type]
+        if not indexes:
+            return iter(())
+        if len(indexes) == 1:
+            return itertools.islice(indexes[0], len(indexes[0]))
+        count = len(self._messages)
+        return itertools.takewhile(lambda position: position < count, heapq.merge(*indexes))
+
+
+class PayloadCache(object):
+    """
+    Cache of decoded message payloads with a bounded size, which evicts the least recently used payloads first.
+
+    Payloads are identified by their hash, the size of a payload is accounted by the length of its encoded data.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size: Maximum size of all cached payloads, 0 disables the cache
+        :type max_size: int
+        """
+        self._max_size = max_size
+        self._size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        :return: Size of all cached payloads
+        """
+        return self._size
+
+    def decode(self, payload):
+        """
+        Returns the decoded data of the given message payload.
+
+        Every call returns a copy of the cached data, so that callers can modify it.
+
+        :param payload: Message payload with the encoded `data`, its `hash` and optionally its `codec`
+        :type payload: dict
+        :return: Decoded payload data
+        """
+        size = len(payload['data'])
+        if size > self._max_size:
+            return decode_payload(payload)
+        key = payload['hash']
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                return _copy_data(entry[0])
+        decoded = decode_payload(payload)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (decoded, size)
+                self._size += size
+                while self._size > self._max_size:
+                    self._size -= self._entries.popitem(last=False)[1][1]
+        return _copy_data(decoded)
+
+
+def _copy_data(value):
+    # Decoded payloads consist of dicts, lists and immutable values only, which is cheaper to copy than by deepcopy
+    value_type = type(value)
+    if value_type is dict:
+        return {key: _copy_data(item) for key, item in value.items()}
+    if value_type is list:
+        return [_copy_data(item) for item in value]
+    return value
+
+
+_PAYLOAD_CACHE = None
+
+
+def get_payload_cache():
+    """
+    Returns the payload cache of the current process, its size is configured by the `payload_cache_size` option in
+    the `messaging` section of the leapp configuration.
+
+    :return: Instance of :py:class:`PayloadCache`
+    """
+    global _PAYLOAD_CACHE
+    if _PAYLOAD_CACHE is None:
+        _PAYLOAD_CACHE = PayloadCache(max_size=get_config().getint('messaging', 'payload_cache_size'))
+    return _PAYLOAD_CACHE
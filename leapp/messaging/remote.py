@@ -1,6 +1,8 @@
 import os
 
 from leapp.messaging import BaseMessaging
+from leapp.messaging.codecs import JSONCodec, get_codec
+from leapp.messaging.messagestore import MessageStore
 from leapp.utils.actorapi import get_actor_api
 
 
@@ -11,6 +13,8 @@ class RemoteMessaging(BaseMessaging):
 
     def __init__(self):
         super(RemoteMessaging, self).__init__()
+        # Messages are sent as JSON documents, which cannot contain binary payloads
+        self._codec = get_codec(JSONCodec.name)
         self._session = get_actor_api()
 
     def _process_message(self, message):
@@ -23,4 +27,4 @@ class RemoteMessaging(BaseMessaging):
             'context': os.environ.get('LEAPP_EXECUTION_ID', 'TESTING-CONTEXT'),
             'messages': names})
         request.raise_for_status()
-        self._data = request.json()['messages']
+        self._data = MessageStore(request.json()['messages'])
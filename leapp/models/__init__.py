@@ -23,7 +23,9 @@ Now, the models can be used like this::
     pprint(f.dump())
 
 """
+import collections
 import sys
+import types
 
 from leapp.models import fields
 
@@ -39,8 +41,17 @@ class ModelMeta(type):
     ModelMeta is a metaclass used for Model
 
     It verifies the validity of attributes and registers the model as a message type with the :py:class:`Topic`.
+    Fields of compact models are stored in slots, see :py:attr:`Model.compact`.
     """
     def __new__(mcs, name, bases, attrs):
+        defined_fields = {name: value for name, value in attrs.items() if isinstance(value, fields.Field)}
+        if not globals().get('Model'):
+            # The base classes of all models must not provide a dictionary to allow compact models
+            attrs.setdefault('__slots__', ())
+        elif '__slots__' not in attrs:
+            inherited = any(getattr(base, 'compact', False) is True for base in bases)
+            if attrs.get('compact', inherited) is True:
+                attrs = _make_compact(bases, attrs, defined_fields)
         klass = super(ModelMeta, mcs).__new__(mcs, name, bases, attrs)
 
         model_ref_cls = globals().get('_ModelReference')
@@ -58,8 +69,9 @@ class ModelMeta(type):
             topic.messages = tuple(set(topic.messages + (klass,)))
 
         kls_attrs = (getattr(klass, 'fields', None) or {}).copy()
-        kls_attrs.update({name: value for name, value in attrs.items() if isinstance(value, fields.Field)})
+        kls_attrs.update(defined_fields)
         klass.fields = kls_attrs.copy()
+        klass._plan = None
 
         setattr(sys.modules[mcs.__module__], name, klass)
         return klass
@@ -67,6 +79,119 @@ class ModelMeta(type):
     def __init__(cls, name, bases, attrs):
         super(ModelMeta, cls).__init__(name, bases, attrs)
 
+    def get_plan(cls):
+        """
+        Returns the functions loading and dumping the fields of instances of the model, which are generated from the
+        compiled converters of the fields when they are used first, see
+        :py:meth:`leapp.models.fields.Field.get_converters`.
+
+        The functions raise :py:class:`leapp.models.fields.ModelViolationError` without a proper message, the fields
+        have to be converted by their methods again in this case.
+
+        Models which define their own initialization can not be created by the plan, `create` and `create_trusted`
+        are None for them.
+
+        :return: :py:class:`_Plan` of the model or an empty tuple if the fields of the model can not be compiled
+        """
+        if cls._plan is None:
+            cls._plan = _compile_plan(cls) or ()
+        return cls._plan
+
+
+def _make_compact(bases, attrs, defined_fields):
+    """
+    Returns the attributes of a compact model, in which the fields defined by the model are replaced by slots.
+    """
+    attrs = {name: value for name, value in attrs.items() if name not in defined_fields}
+    # Fields stored in slots of a base model keep using them
+    attrs['__slots__'] = tuple(sorted(name for name in defined_fields if not any(
+        isinstance(getattr(base, name, None), types.MemberDescriptorType) for base in bases)))
+    attrs['__getstate__'] = _get_compact_state
+    attrs['__setstate__'] = _set_compact_state
+    return attrs
+
+
+def _get_compact_state(self):
+    return {name: getattr(self, name) for name in type(self).fields if hasattr(self, name)}
+
+
+def _set_compact_state(self, state):
+    for name, value in state.items():
+        setattr(self, name, value)
+
+
+_Plan = collections.namedtuple('_Plan', (
+    # Loads the fields of an instance from builtin data
+    'load',
+    # Dumps the fields of an instance to builtin data
+    'dump',
+    # Creates an instance from builtin data
+    'create',
+    # Creates an instance from trusted builtin data without validating it, see Model.create
+    'create_trusted',
+))
+
+
+def _compile_plan(model):
+    load_plan, dump_plan, trusted_plan = [], [], []
+    for name, field in model.fields.items():
+        converters = field.get_converters()
+        if not converters:
+            return None
+        load_plan.append((name, field._default, field._required, converters[0]))
+        dump_plan.append((name, converters[1]))
+        trusted_plan.append((name, field._default, field._required, converters[2]))
+
+    def load(instance, data):
+        for name, default, required, convert in load_plan:
+            value = data.get(name, default)
+            if value is not fields.missing or required:
+                value = convert(value)
+            setattr(instance, name, value)
+
+    def dump(instance):
+        result = {}
+        for name, convert in dump_plan:
+            value = convert(getattr(instance, name, None))
+            if value is not fields.missing:
+                result[name] = value
+        return result
+
+    def check_keys(data):
+        for key in data:
+            if key not in model.fields:
+                raise ModelMisuseError(
+                    'Trying to initialize model {} with value for undefined field {}'.format(model.__name__, key))
+
+    def create(data):
+        check_keys(data)
+        instance = object.__new__(model)
+        try:
+            load(instance, data)
+        except fields.ModelViolationError:
+            # Converted again by the fields to raise the error with the proper message
+            return model(init_method='to_model', **data)
+        return instance
+
+    def create_trusted(data):
+        # Values are not validated, but the data has to match the fields of the model nonetheless
+        check_keys(data)
+        instance = object.__new__(model)
+        for name, default, required, convert in trusted_plan:
+            value = data.get(name, default)
+            if value is fields.missing:
+                if required:
+                    # Created with validation to raise the error with the proper message
+                    return create(data)
+            elif convert is not None:
+                value = convert(value)
+            setattr(instance, name, value)
+        return instance
+
+    if model.__init__ != Model.__init__:
+        create = create_trusted = None
+    return _Plan(load=load, dump=dump, create=create, create_trusted=create_trusted)
+
 
 class Model(with_metaclass(ModelMeta)):
     """
@@ -82,6 +207,15 @@ class Model(with_metaclass(ModelMeta)):
             if key not in defined_fields:
                 raise ModelMisuseError(
                     'Trying to initialize model {} with value for undefined field {}'.format(type(self).__name__, key))
+        if init_method == 'to_model':
+            plan = type(self).get_plan()
+            if plan:
+                try:
+                    plan.load(self, kwargs)
+                    return
+                except fields.ModelViolationError:
+                    # Converted again by the fields to raise the error with the proper message
+                    pass
         for field in defined_fields.keys():
             getattr(defined_fields[field], init_method)(kwargs, field, self)
 
@@ -91,6 +225,14 @@ class Model(with_metaclass(ModelMeta)):
     It defines the categorization of this model.
     """
 
+    compact = False
+    """
+    Instances of models with `compact` set to True store their fields in slots instead of a dictionary per instance.
+    They need less memory and setting attributes, which are not fields of the model, raises AttributeError. The fields
+    are only available in :py:attr:`fields` and not as attributes of the model class. Derived models are compact as
+    well, unless they set `compact` to False.
+    """
+
     fields = None
     """
     `fields` contains a dictionary with all attributes of the py:class:`leapp.models.fields.Field` type in the class.
@@ -99,27 +241,83 @@ class Model(with_metaclass(ModelMeta)):
     """
 
     @classmethod
-    def create(cls, data):
+    def create(cls, data, trusted=False):
         """
         Create an instance of this class and use the data to initialize the fields within.
 
         :param data: Data to initialize the Model from deserialized data
         :type data: dict
+        :param trusted: Whether the data has been dumped from a valid instance of this class, e.g. a message stored in
+                        the audit database, and is not validated again. Data from any other source must not be trusted.
+        :type trusted: bool
         :return: Instance of this class
         """
+        plan = cls.get_plan()
+        if plan and plan.create:
+            return plan.create_trusted(data) if trusted else plan.create(data)
         return cls(init_method='to_model', **data)
 
+    @classmethod
+    def create_many(cls, data, trusted=False):
+        """
+        Creates instances of this class from a batch of data like :py:meth:`create`, the fields are looked up only
+        once for the whole batch.
+
+        :param data: Data to initialize the instances from deserialized data
+        :type data: Iterable of dict
+        :param trusted: Whether the data has been dumped from valid instances of this class, see :py:meth:`create`
+        :type trusted: bool
+        :return: List of instances of this class in the order of the data
+        """
+        plan = cls.get_plan()
+        if plan and plan.create:
+            create = plan.create_trusted if trusted else plan.create
+            return [create(entry) for entry in data]
+        return [cls.create(entry, trusted=trusted) for entry in data]
+
     def dump(self):
         """
         Dumps the data in the dictionary form that is safe to serialize to JSON.
 
         :return: dict with a builtin representation of the data that can be safely serialized to JSON
         """
+        plan = type(self).get_plan()
+        if plan:
+            try:
+                return plan.dump(self)
+            except fields.ModelViolationError:
+                # Converted again by the fields to raise the error with the proper message
+                pass
         result = {}
         for field in type(self).fields.keys():
             type(self).fields[field].to_builtin(self, field, result)
         return result
 
+    @classmethod
+    def dump_many(cls, models):
+        """
+        Dumps a batch of instances of this class like :py:meth:`dump`, the fields are looked up only once for the whole
+        batch.
+
+        :param models: Instances to dump
+        :type models: Iterable of instances of this class
+        :return: List of dicts with the builtin representation of the instances in their order
+        """
+        plan = cls.get_plan()
+        if not plan or cls.dump != Model.dump:
+            return [model.dump() for model in models]
+        result = []
+        for model in models:
+            if type(model) is cls:
+                try:
+                    result.append(plan.dump(model))
+                    continue
+                except fields.ModelViolationError:
+                    # Dumped again to raise the error with the proper message
+                    pass
+            result.append(model.dump())
+        return result
+
     def __eq__(self, other):
         """
         Implementation for equality comparison of Model instances
@@ -155,7 +353,9 @@ class _ModelReference(Model):
         return cls.resolve()(*args, **kwargs)
 
     @classmethod
-    def create(cls, data):
+    def create(cls, data, trusted=False):
+        if trusted:
+            return cls.resolve().create(data, trusted=True)
         return cls.resolve()(init_method='to_model', **data)
 
     @classmethod
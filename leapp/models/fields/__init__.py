@@ -1,5 +1,7 @@
 import copy
 import datetime
+import itertools
+
 import six
 
 
@@ -23,6 +25,52 @@ class ModelMisuseError(Exception):
         super(ModelMisuseError, self).__init__(message)
 
 
+class _InvalidValue(ModelViolationError):
+    """
+    Raised by compiled converters for values which are not valid. Such values are converted again by the methods of
+    the fields, which raise the error with the proper message.
+    """
+    def __init__(self):
+        super(_InvalidValue, self).__init__('Invalid value')
+
+
+# Methods defining the conversion of values, fields overriding any of them are not compiled
+_CONVERSION_METHODS = ('_model_type', '_builtin_type', '_validate', '_validate_model_value', '_validate_builtin_value',
+                       '_validate_choices', '_validate_count', '_convert_to_model', '_convert_from_model', 'to_model',
+                       'to_builtin', '_compile_to_model', '_compile_from_model',
+                       '_compile_trusted_to_model')
+
+
+def _compile_type_check(expected_type, allow_null, required):
+    """
+    Returns a function which returns a value of the given type and raises :py:class:`_InvalidValue` for any other
+    value, None is accepted if `allow_null` is set and missing values if the field is not `required`.
+    """
+    if not isinstance(expected_type, tuple):
+        expected_type = (expected_type,)
+
+    def check(value):
+        if value is None:
+            if allow_null:
+                return value
+            raise _InvalidValue()
+        if value is missing and not required:
+            return value
+        if not isinstance(value, expected_type):
+            raise _InvalidValue()
+        return value
+    return check
+
+
+def _all_instances(values, expected_type):
+    """
+    :return: Whether all values are instances of the expected type, the values are checked without a Python function
+             call per value
+    :rtype: bool
+    """
+    return all(six.moves.map(isinstance, values, itertools.repeat(expected_type)))
+
+
 class Field(object):
     """
     Field is the base of all supported fields.
@@ -148,6 +196,65 @@ class Field(object):
         if target_value is not missing:
             target[name] = target_value
 
+    def _is_compilable(self):
+        """
+        :return: Whether the conversion of this field can be compiled, which is not the case for fields overriding
+                 any conversion method of the field they are derived from
+        """
+        for klass in type(self).__mro__:
+            if klass in _COMPILABLE_FIELDS:
+                return True
+            if any(method in vars(klass) for method in _CONVERSION_METHODS):
+                return False
+        return False
+
+    def get_converters(self):
+        """
+        Returns functions converting values of this field between the builtin and the model representation, which
+        give the same results as :py:meth:`_convert_to_model` and :py:meth:`_convert_from_model`.
+
+        Names of fields are not known to the functions and they raise :py:class:`ModelViolationError` without a proper
+        message, such values have to be converted by the methods of the field again, which raise the proper error.
+        The functions are created once per field.
+
+        The third function converts trusted builtin values, which have been created from valid model values, without
+        validating them, see :py:meth:`_compile_trusted_to_model`.
+
+        :return: Tuple of the functions converting a value to the model and to the builtin representation and a trusted
+                 value to the model representation, or None if the conversion of this field can not be compiled
+        """
+        converters = self.__dict__.get('_converters', missing)
+        if converters is missing:
+            converters = None
+            if self._is_compilable():
+                to_model, from_model = self._compile_to_model(), self._compile_from_model()
+                if to_model and from_model:
+                    converters = (to_model, from_model, self._compile_trusted_to_model())
+            self._converters = converters
+        return converters
+
+    def _compile_to_model(self):
+        """
+        :return: Function converting a builtin value to the model representation, see :py:meth:`get_converters`
+        """
+        return None
+
+    def _compile_from_model(self):
+        """
+        :return: Function converting a model value to the builtin representation, see :py:meth:`get_converters`
+        """
+        return None
+
+    def _compile_trusted_to_model(self):
+        """
+        Trusted values are not validated and are never missing. Mutable values must not be shared with the builtin
+        value, which might be shared by other consumers.
+
+        :return: Function converting a trusted builtin value to the model representation or None if the value is used
+                 as it is
+        """
+        return None
+
 
 class BuiltinField(Field):
     """
@@ -186,6 +293,12 @@ class BuiltinField(Field):
             raise ModelViolationError("Fields {} is of type: {} expected: {}".format(name, type(value).__name__,
                                                                                      names))
 
+    def _compile_to_model(self):
+        return _compile_type_check(self._builtin_type, self._allow_null, self._required)
+
+    def _compile_from_model(self):
+        return _compile_type_check(self._model_type, self._allow_null, self._required)
+
 
 class Boolean(BuiltinField):
     """
@@ -244,12 +357,8 @@ class DateTime(BuiltinField):
     def _builtin_type(self):
         return six.string_types
 
-    def _convert_to_model(self, value, name):
-        self._validate_builtin_value(value=value, name=name)
-
-        if value is None:
-            return value
-
+    @staticmethod
+    def _parse(value):
         # We want Z to be appended but it needs support from our side here:
         value = value.rstrip('Z')
 
@@ -262,11 +371,19 @@ class DateTime(BuiltinField):
         try:
             return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S{fractions}%Z'.format(fractions=fractions))
         except ValueError:
-            try:
-                return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S{fractions}'.format(fractions=fractions))
-            except ValueError:
-                raise ModelViolationError(
-                    "The {name} field contains an invalid datetime value: '{value}'".format(name=name, value=value))
+            return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S{fractions}'.format(fractions=fractions))
+
+    def _convert_to_model(self, value, name):
+        self._validate_builtin_value(value=value, name=name)
+
+        if value is None:
+            return value
+
+        try:
+            return self._parse(value)
+        except ValueError:
+            raise ModelViolationError("The {name} field contains an invalid datetime value: '{value}'".format(
+                name=name, value=value.rstrip('Z')))
 
     def _convert_from_model(self, value, name):
         self._validate_model_value(value=value, name=name)
@@ -277,6 +394,39 @@ class DateTime(BuiltinField):
         if not value.utcoffset():
             return value.isoformat() + 'Z'
 
+    def _compile_to_model(self):
+        check = super(DateTime, self)._compile_to_model()
+        parse = self._parse
+
+        def convert(value):
+            value = check(value)
+            if value is None:
+                return value
+            try:
+                return parse(value)
+            except ValueError:
+                raise _InvalidValue()
+        return convert
+
+    def _compile_trusted_to_model(self):
+        parse = self._parse
+
+        def convert(value):
+            return value if value is None else parse(value)
+        return convert
+
+    def _compile_from_model(self):
+        check = super(DateTime, self)._compile_from_model()
+
+        def convert(value):
+            value = check(value)
+            if value is None or value is missing:
+                return value
+            if not value.utcoffset():
+                return value.isoformat() + 'Z'
+            return None
+        return convert
+
 
 class EnumMixin(Field):
     """
@@ -306,6 +456,22 @@ class EnumMixin(Field):
             raise ModelViolationError("The {name} field value must be one of '{values}'".format(name=name,
                                                                                                 values=values))
 
+    def _compile_choices_check(self, convert):
+        choices = self._choices
+
+        def check(value):
+            value = convert(value)
+            if value is not None and value is not missing and value not in choices:
+                raise _InvalidValue()
+            return value
+        return check
+
+    def _compile_to_model(self):
+        return self._compile_choices_check(super(EnumMixin, self)._compile_to_model())
+
+    def _compile_from_model(self):
+        return self._compile_choices_check(super(EnumMixin, self)._compile_from_model())
+
 
 class StringEnum(EnumMixin, String):
     """
@@ -365,6 +531,19 @@ class List(Field):
         self._elem_type = elem_field
         self._minimum = minimum or 0
         self._maximum = maximum
+        # Elements of builtin types, which are only validated by their type, are checked for the whole list at once
+        self._elem_builtin_type = None
+        if isinstance(elem_field, BuiltinField) and not isinstance(elem_field, (DateTime, EnumMixin)) and \
+                elem_field._is_compilable():
+            expected_type = elem_field._model_type
+            self._elem_builtin_type = expected_type if isinstance(expected_type, tuple) else (expected_type,)
+
+    def _has_builtin_elements(self, value):
+        """
+        :return: Whether the elements are valid values of a builtin element type, which are used as they are
+        :rtype: bool
+        """
+        return self._elem_builtin_type is not None and _all_instances(value, self._elem_builtin_type)
 
     def _validate_count(self, value, name):
         message = 'Element count error for field {name} expected between {minimum} and {maximum} elements got {count}'
@@ -377,6 +556,8 @@ class List(Field):
         super(List, self)._validate_model_value(value, name)
         if isinstance(value, (list, tuple)):
             self._validate_count(value, name)
+            if self._has_builtin_elements(value):
+                return
             for idx, entry in enumerate(value):
                 self._elem_type._validate_model_value(entry, name='{}[{}]'.format(name, idx))
         elif value and value is not missing:
@@ -386,6 +567,8 @@ class List(Field):
         super(List, self)._validate_builtin_value(value, name)
         if isinstance(value, (list, tuple)):
             self._validate_count(value, name)
+            if self._has_builtin_elements(value):
+                return
             for idx, entry in enumerate(value):
                 self._elem_type._validate_builtin_value(entry, name='{}[{}]'.format(name, idx))
         elif value is not None:
@@ -395,6 +578,8 @@ class List(Field):
         self._validate_builtin_value(value=value, name=name)
         if value is None:
             return value
+        if self._has_builtin_elements(value):
+            return list(value)
         converter = self._elem_type._convert_to_model
         return list(converter(entry, name='{}[{}]'.format(name, idx)) for idx, entry in enumerate(value))
 
@@ -402,9 +587,50 @@ class List(Field):
         self._validate_model_value(value=value, name=name)
         if value in (None, missing):
             return value
+        if isinstance(value, (list, tuple)) and self._has_builtin_elements(value):
+            return list(value)
         converter = self._elem_type._convert_from_model
         return list(converter(entry, name='{}[{}]'.format(name, idx)) for idx, entry in enumerate(value))
 
+    def _compile_list(self, convert, accept_missing):
+        allow_null, minimum, maximum = self._allow_null, self._minimum, self._maximum
+        builtin_type = self._elem_builtin_type
+
+        def convert_list(value):
+            if value is None:
+                if allow_null:
+                    return value
+                raise _InvalidValue()
+            if value is missing and accept_missing:
+                return value
+            if not isinstance(value, (list, tuple)):
+                raise _InvalidValue()
+            count = len(value)
+            if not (minimum <= count <= (maximum or count)):
+                raise _InvalidValue()
+            if builtin_type is not None and _all_instances(value, builtin_type):
+                return list(value)
+            return [convert(entry) for entry in value]
+        return convert_list
+
+    def _compile_to_model(self):
+        converters = self._elem_type.get_converters()
+        return converters and self._compile_list(converters[0], accept_missing=False)
+
+    def _compile_from_model(self):
+        converters = self._elem_type.get_converters()
+        return converters and self._compile_list(converters[1], accept_missing=not self._required)
+
+    def _compile_trusted_to_model(self):
+        converter = self._elem_type.get_converters()[2]
+        if converter is None:
+            def convert(value):
+                return value if value is None else list(value)
+        else:
+            def convert(value):
+                return value if value is None else [converter(entry) for entry in value]
+        return convert
+
 
 class Model(Field):
     """
@@ -452,7 +678,46 @@ class Model(Field):
             return value
         return value.dump()
 
+    def _compile_to_model(self):
+        allow_null, model_type = self._allow_null, self._model_type
+
+        def convert(value):
+            if value is None:
+                if allow_null:
+                    return value
+                raise _InvalidValue()
+            if not isinstance(value, dict):
+                raise _InvalidValue()
+            return model_type(init_method='to_model', **value)
+        return convert
+
+    def _compile_trusted_to_model(self):
+        model_type = self._model_type
+
+        def convert(value):
+            return value if value is None else model_type.create(value, trusted=True)
+        return convert
+
+    def _compile_from_model(self):
+        allow_null, required, model_type = self._allow_null, self._required, self._model_type
+
+        def convert(value):
+            if value is None:
+                if allow_null:
+                    return value
+                raise _InvalidValue()
+            if value is missing and not required:
+                return value
+            if not isinstance(value, model_type):
+                raise _InvalidValue()
+            return value.dump()
+        return convert
+
 
 class Nested(Model):
     def __init__(self, *args, **kwargs):
         raise ModelMisuseError('Please use leapp.models.fields.Model instead of leapp.models.fields.Nested')
+
+
+_COMPILABLE_FIELDS = frozenset((Boolean, Float, Integer, Number, String, DateTime, StringEnum, IntegerEnum, FloatEnum,
+                                NumberEnum, List, Model))
@@ -3,13 +3,13 @@ import logging
 import os
 import pkgutil
 import sys
-from io import UnsupportedOperation
 from multiprocessing import Process, Queue
 
 import leapp.libraries.actor
 from leapp.actors import get_actors, get_actor_metadata
-from leapp.exceptions import ActorInspectionFailedError, MultipleActorsError, UnsupportedDefinitionKindError,\
-    LeappRuntimeError
+from leapp.exceptions import ActorInspectionFailedError, MultipleActorsError, UnsupportedDefinitionKindError
+from leapp.executors import ActorJob
+from leapp.executors.process import ProcessExecutor
 from leapp.repository import DefinitionKind
 from leapp.repository.loader import library_loader
 
@@ -33,7 +33,7 @@ class ActorCallContext(object):
     """
     Wraps the actor execution into child process.
     """
-    def __init__(self, definition, logger, messaging):
+    def __init__(self, definition, logger, messaging, executor=None):
         """
         :param definition: Actor definition
         :type definition: :py:class:`leapp.repository.actor_definition.ActorDefinition`
@@ -41,35 +41,21 @@ class ActorCallContext(object):
         :type logger: :py:class:`logging.Logger`
         :param messaging: Leapp Messaging
         :type messaging: :py:class:`leapp.messaging.BaseMessaging`
+        :param executor: Executor to run the actor with, by default a new child process is used for the actor
+        :type executor: :py:class:`leapp.executors.ActorExecutor` or None
         """
         self.definition = definition
         self.logger = logger
         self.messaging = messaging
-
-    @staticmethod
-    def _do_run(stdin, logger, messaging, definition, args, kwargs):
-        if stdin is not None:
-            sys.stdin = os.fdopen(stdin)
-        definition.load()
-        with definition.injected_context():
-            target_actor = [actor for actor in get_actors() if actor.name == definition.name][0]
-            target_actor(logger=logger, messaging=messaging).run(*args, **kwargs)
+        self.executor = executor
 
     def run(self, *args, **kwargs):
         """
         Performs the actor execution in the child process.
         """
-        try:
-            stdin = sys.stdin.fileno()
-        except UnsupportedOperation:
-            stdin = None
-        p = Process(target=self._do_run, args=(stdin, self.logger, self.messaging, self.definition, args, kwargs))
-        p.start()
-        p.join()
-        if p.exitcode != 0:
-            raise LeappRuntimeError(
-                'Actor {actorname} unexpectedly terminated with exit code: {exitcode}'
-                .format(actorname=self.definition.name, exitcode=p.exitcode))
+        job = ActorJob(definition=self.definition, logger=self.logger, messaging=self.messaging, args=args,
+                       kwargs=kwargs)
+        (self.executor or ProcessExecutor()).execute(job)
 
 
 class ActorDefinition(object):
@@ -91,6 +77,7 @@ class ActorDefinition(object):
         self._repo_dir = repo_dir
         self._definitions = {}
         self._module = None
+        self._libraries = None
         self._discovery = None
 
     @property
@@ -124,11 +111,18 @@ class ActorDefinition(object):
             'tests': self.tests
         }
 
-    def load(self):
+    def load(self, keep_libraries=False):
         """
         Loads the actor module to be introspectable.
+
+        :param keep_libraries: Keep the loaded private libraries of the actor, so that they are injected again by
+                               :py:meth:`injected_context` instead of being loaded once more. Processes forked
+                               afterwards inherit them.
+        :type keep_libraries: bool
         """
         if not self._module:
+            if keep_libraries:
+                self._libraries = self._load_libraries(None)
             with self.injected_context():
                 path = os.path.abspath(os.path.join(self._repo_dir, self.directory))
                 for importer, name, is_pkg in pkgutil.iter_modules((path,)):
@@ -165,8 +159,20 @@ class ActorDefinition(object):
                     tag.actors += (self,)
         return self._discovery
 
-    def __call__(self, messaging=None, logger=None):
-        return ActorCallContext(definition=self, messaging=messaging, logger=logger)
+    def __call__(self, messaging=None, logger=None, executor=None):
+        return ActorCallContext(definition=self, messaging=messaging, logger=logger, executor=executor)
+
+    def __getstate__(self):
+        # Loggers and modules cannot be pickled, which is required to pass definitions to executor processes
+        state = self.__dict__.copy()
+        state['log'] = self.log.name
+        state['_module'] = None
+        state['_libraries'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.log = logging.getLogger(self.log)
 
     @property
     def dialogs(self):
@@ -237,9 +243,16 @@ class ActorDefinition(object):
 
         # We make a snapshot of the symbols in the module
         before = leapp.libraries.actor.__dict__.keys()
-        # Now we are loading all modules and packages and injecting them at the same time into the modules at hand
-        to_add = library_loader(leapp.libraries.actor, 'leapp.libraries.actor',
-                                map(lambda x: os.path.join(self._repo_dir, self.directory, x), self.libraries))
+        if self._libraries is None:
+            # Now we are loading all modules and packages and injecting them at the same time into the modules at hand
+            to_add = self._load_libraries(leapp.libraries.actor)
+        else:
+            # Libraries kept by load are injected again without executing their code once more
+            to_add = self._libraries
+            for name, mod in to_add:
+                parent, _, short_name = name.rpartition('.')
+                if parent == 'leapp.libraries.actor':
+                    setattr(leapp.libraries.actor, short_name, mod)
         backup = {}
 
         # Now we are injecting them into the global sys.modules dictionary and keep a backup of existing ones
@@ -275,6 +288,10 @@ class ActorDefinition(object):
                 else:
                     sys.modules.pop(name)
 
+    def _load_libraries(self, mod):
+        return library_loader(mod, 'leapp.libraries.actor',
+                              map(lambda x: os.path.join(self._repo_dir, self.directory, x), self.libraries))
+
     @property
     def directory(self):
         """
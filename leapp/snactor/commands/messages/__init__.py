@@ -39,4 +39,5 @@ def clear(args):
         get_config().get("database", "path")
     ))
     with get_connection(None) as con:
-        con.execute("DELETE FROM message WHERE context = ?", (os.environ["LEAPP_EXECUTION_ID"],))
+        con.execute("DELETE FROM message WHERE execution_id IN (SELECT id FROM execution WHERE context = ?)",
+                    (os.environ["LEAPP_EXECUTION_ID"],))
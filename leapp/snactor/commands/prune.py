@@ -0,0 +1,27 @@
+from leapp.utils.audit.retention import get_retention_policy, prune, report
+from leapp.utils.clicmd import command, command_opt
+from leapp.utils.repository import requires_repository
+
+_LONG_DESCRIPTION = '''
+Removes old executions, like previous actor test runs, together with their
+messages and log entries from the database of the current repository.
+
+The latest execution of every kind is kept, which includes the context of
+`snactor run`.
+
+For more information please consider reading the documentation at:
+https://red.ht/leapp-docs
+'''
+
+
+@command('prune', help='Removes old executions from the repository database', description=_LONG_DESCRIPTION)
+@command_opt('max-age-days', value_type=int, help='Removes executions older than this, 0 removes executions of any age')
+@command_opt('kind', action='append', metavar='KIND', help='Removes only executions of this kind')
+@command_opt('keep-last', value_type=int, help='Number of the latest executions of every kind to keep')
+@command_opt('no-archive', is_flag=True, help='Does not archive the removed executions')
+@command_opt('archive-dir', help='Directory to archive the removed executions in')
+@requires_repository
+def cli(args):
+    policy = get_retention_policy(max_age_days=args.max_age_days, kinds=args.kind, keep_last=args.keep_last,
+                                  archive=False if args.no_archive else None, archive_dir=args.archive_dir)
+    print(report(prune(**policy)))
@@ -6,6 +6,7 @@ from leapp.utils.clicmd import command, command_opt, command_arg
 from leapp.utils.repository import requires_repository, find_repository_basedir
 from leapp.logger import configure_logger
 from leapp.messaging.inprocess import InProcessMessaging
+from leapp.messaging.codecs import to_json_message
 from leapp.utils.output import report_errors
 from leapp.repository.scan import find_and_scan_repositories
 from leapp.snactor.context import with_snactor_context
@@ -46,5 +47,5 @@ def cli(args):
     report_errors(messaging.errors())
 
     if args.print_output:
-        json.dump(messaging.messages(), sys.stdout, indent=2)
+        json.dump([to_json_message(message) for message in messaging.messages()], sys.stdout, indent=2)
         sys.stdout.write('\n')
@@ -10,6 +10,7 @@ from leapp.utils.audit import Execution, get_connection
 from leapp.repository.scan import find_and_scan_repositories
 from leapp.utils.repository import find_repository_basedir
 from leapp.messaging.inprocess import InProcessMessaging
+from leapp.messaging.codecs import to_json_message
 from leapp.compat import raise_with_traceback
 
 import pytest
@@ -105,11 +106,11 @@ class ActorContext(object):
 
     def messages(self):
         """
-        Returns raw messages produced by the actor.
+        Returns raw messages produced by the actor, their payloads are serialized by the JSON codec.
 
         :return: list of raw message data dictionaries.
         """
-        return self._messaging.messages()
+        return [to_json_message(message) for message in self._messaging.messages()]
 
     def consume(self, *models):
         """
@@ -1,10 +1,17 @@
+import calendar
 import datetime
 import json
+import os
 import sqlite3
+import threading
+import zlib
 
 import six
 
 from leapp.config import get_config
+from leapp.exceptions import LeappRuntimeError
+from leapp.utils.audit.payloads import (PayloadFile, get_payload_dir, is_storable, remove_payload_files,
+                                        write_payload_file)
 from leapp.utils.schemas import CURRENT_SCHEMA, MIGRATIONS
 
 
@@ -18,9 +25,15 @@ def _initialize_database(db):
     """
     schema_version = db.execute('PRAGMA schema_version').fetchone()[0]
     if not schema_version:
+        # Allows to return the space of pruned executions to the file system, see leapp.utils.audit.retention
+        db.execute('PRAGMA auto_vacuum = INCREMENTAL')
         db.executescript(CURRENT_SCHEMA)
     else:
         user_version = db.execute('PRAGMA user_version').fetchone()[0]
+        if user_version == 1 and 'kind' in [column[1] for column in db.execute('PRAGMA table_info(execution)')]:
+            # Migration 0001 used to leave the version at 1 after it added the kind column
+            db.execute('PRAGMA user_version = 2')
+            user_version = 2
         versions = [m[0] for m in MIGRATIONS]
         try:
             index = versions.index(user_version)
@@ -32,27 +45,252 @@ def _initialize_database(db):
     return db
 
 
+# Settings of the storage profiles, which can be selected by the `profile` option in the `database` section of the
+# leapp configuration. With the `wal` profile readers do not block the writer and vice versa, the synchronous level
+# NORMAL keeps the database consistent, however the last transactions might be lost on a power failure.
+_STORAGE_PROFILES = {
+    'default': {'journal_mode': 'delete', 'synchronous': 'FULL'},
+    'wal': {'journal_mode': 'wal', 'synchronous': 'NORMAL'},
+}
+_SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def _get_storage_profile():
+    config = get_config()
+    name = config.get('database', 'profile')
+    if name not in _STORAGE_PROFILES:
+        raise LeappRuntimeError('Unknown database profile {name} - Supported profiles are: {profiles}'.format(
+            name=name, profiles=', '.join(sorted(_STORAGE_PROFILES))))
+    profile = dict(_STORAGE_PROFILES[name])
+    profile['synchronous'] = (config.get('database', 'synchronous') or profile['synchronous']).upper()
+    if profile['synchronous'] not in _SYNCHRONOUS_LEVELS:
+        raise LeappRuntimeError('Unknown database synchronous level {level} - Supported levels are: {levels}'.format(
+            level=profile['synchronous'], levels=', '.join(_SYNCHRONOUS_LEVELS)))
+    profile['busy_timeout'] = config.getint('database', 'busy_timeout')
+    profile['wal_autocheckpoint'] = config.getint('database', 'wal_autocheckpoint')
+    return profile
+
+
+def _open_database(path):
+    """
+    Opens a connection to the database at path with the per connection settings of the configured storage profile.
+
+    :return: Tuple of the connection and the storage profile
+    """
+    profile = _get_storage_profile()
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA busy_timeout = %d' % profile['busy_timeout'])
+    connection.execute('PRAGMA synchronous = %s' % profile['synchronous'])
+    connection.execute('PRAGMA wal_autocheckpoint = %d' % profile['wal_autocheckpoint'])
+    return connection, profile
+
+
+def _set_journal_mode(db, journal_mode):
+    """
+    Switches the database to the given journal mode, which is persisted in the database file.
+
+    The journal mode can only be switched while no other connection is writing to the database, or in case of
+    switching away from WAL, while no other connection is open. Instead of waiting for this, the database keeps its
+    current journal mode and switching is attempted again by the next process opening the database.
+    """
+    if db.execute('PRAGMA journal_mode').fetchone()[0].lower() in (journal_mode, 'memory'):
+        return
+    busy_timeout = db.execute('PRAGMA busy_timeout').fetchone()[0]
+    db.execute('PRAGMA busy_timeout = 0')
+    try:
+        db.execute('PRAGMA journal_mode = %s' % journal_mode)
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        db.execute('PRAGMA busy_timeout = %d' % busy_timeout)
+
+
 def create_connection(path):
     """
     Creates a database connection to the path and ensures it's initialized and up to date.
 
+    The connection is configured according to the storage profile selected in the `database` section of the leapp
+    configuration.
+
     :param path: Path to the database
     :return: Connection object
     """
-    return _initialize_database(sqlite3.connect(path))
+    connection, profile = _open_database(path)
+    _initialize_database(connection)
+    _set_journal_mode(connection, profile['journal_mode'])
+    return connection
+
+
+_DATABASE_LOCK = None
+_DATABASE_LOCK_PID = None
+
+
+def database_lock():
+    """
+    Returns the lock held by the current process while it is accessing the database.
+
+    SQLite keeps track of the locks held on a database file by the whole process. A process forked while a connection
+    is in use inherits this state and is not able to access the database afterwards. Processes must therefore be
+    forked only while holding this lock.
+
+    :return: Reentrant lock of the current process
+    """
+    global _DATABASE_LOCK, _DATABASE_LOCK_PID
+    if _DATABASE_LOCK_PID != os.getpid():
+        # A lock inherited from the parent might be held by a thread which does not exist in this process
+        _DATABASE_LOCK, _DATABASE_LOCK_PID = threading.RLock(), os.getpid()
+    return _DATABASE_LOCK
+
+
+if hasattr(os, 'register_at_fork'):
+    # Python 3.7+ allows to protect every fork, older versions rely on the callers to use database_lock
+    os.register_at_fork(before=lambda: database_lock().acquire(),
+                        after_in_parent=lambda: database_lock().release())
+
+
+# Cached connections by process id, thread id and database path. Entries of other processes are kept on purpose, as
+# closing a connection inherited by fork could affect the process that opened it.
+_CONNECTIONS = {}
+# Ids of host and data source rows by the id of the cached connection they have been resolved with
+_ID_CACHES = {}
+
+
+def _get_file_id(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def _get_cached_connection(path):
+    """
+    Returns the connection to the database at path for the current process and thread.
+
+    The connection is opened again if the database file has been replaced or removed. The schema of a database is only
+    verified once, as long as any connection to the same file is held open.
+    """
+    pid = os.getpid()
+    key = (pid, threading.current_thread().ident, path)
+    file_id = _get_file_id(path)
+    entry = _CONNECTIONS.get(key)
+    if entry and file_id and entry[1] == file_id:
+        return entry[0]
+
+    connection, profile = _open_database(path)
+    file_id = _get_file_id(path)
+    if not any(cached_path == path and cached_id == file_id for (_, _, cached_path), (_, cached_id)
+               in list(_CONNECTIONS.items())):
+        with database_lock():
+            _initialize_database(connection)
+            _set_journal_mode(connection, profile['journal_mode'])
+
+    alive = set(thread.ident for thread in threading.enumerate())
+    for cached_key, (cached, _) in list(_CONNECTIONS.items()):
+        if cached_key == key or (cached_key[0] == pid and cached_key[1] not in alive):
+            _ID_CACHES.pop(id(cached), None)
+            _CONNECTIONS.pop(cached_key, None)
+    _CONNECTIONS[key] = (connection, file_id)
+    _ID_CACHES[id(connection)] = {}
+    return connection
+
+
+def _get_id_cache(connection):
+    # Connections which are not cached by get_connection are not guaranteed to live long enough to cache ids for them
+    return _ID_CACHES.get(id(connection), {})
+
+
+def clear_id_cache(connection):
+    """
+    Forgets all host and data source ids resolved with the given connection.
+
+    This has to be called whenever host or data_source rows are removed or a transaction, which might have created
+    them, has been rolled back.
+
+    :param connection: Connection to forget the ids of
+    :type connection: :py:class:`sqlite3.Connection`
+    :return: None
+    """
+    _ID_CACHES.get(id(connection), {}).clear()
+
+
+def _get_writer():
+    """
+    Returns the :py:mod:`leapp.utils.audit.writer` module if an audit writer is running for the current process.
+    """
+    from leapp.utils.audit import writer
+    return writer if writer.is_active() else None
+
+
+def flush_writer():
+    """
+    Waits until everything sent to the audit writer of the current process has been stored, so that the following
+    reads see it. Nothing is done if no audit writer is running.
+
+    :return: None
+    """
+    writer = _get_writer()
+    if writer:
+        writer.flush()
 
 
 def get_connection(db):
     """
     Get the database connection or passes it through if it is already set
 
+    Connections to the configured database are opened once per process and thread and reused afterwards.
+
     :param db: Database connection to be passed through in case it exists already
     :return: database object initialized and migrated to the latest schema version
     """
     if db:
         return db
-    cfg = get_config()
-    return create_connection(cfg.get('database', 'path'))
+    path = get_config().get('database', 'path')
+    if path == ':memory:':
+        return create_connection(path)
+    return _get_cached_connection(path)
+
+
+def to_epoch_us(stamp):
+    """
+    Converts a timestamp string in iso format, as used by the storables, into microseconds since the epoch, which is
+    how timestamps are stored in the database.
+
+    :param stamp: Timestamp string in iso format, optionally with a trailing Z
+    :type stamp: str
+    :return: int
+    """
+    seconds, _, fraction = stamp.rstrip('Z').partition('.')
+    parsed = datetime.datetime.strptime(seconds.replace(' ', 'T'), '%Y-%m-%dT%H:%M:%S')
+    return calendar.timegm(parsed.timetuple()) * 1000000 + int((fraction + '000000')[:6])
+
+
+# Context of entries created outside of any execution, e.g. by tests of actors, see leapp.messaging
+TESTING_CONTEXT = 'TESTING-CONTEXT'
+
+
+def _get_execution_id(connection, context):
+    """
+    Returns the id of the execution of the given context.
+
+    Executions have to be stored before any entries of their context, only the execution of the testing context is
+    created when it does not exist yet.
+
+    :raises leapp.exceptions.LeappRuntimeError: When the execution of the context does not exist
+    """
+    cache = _get_id_cache(connection)
+    key = ('execution', context)
+    execution_id = cache.get(key)
+    if execution_id is None:
+        if context == TESTING_CONTEXT:
+            connection.execute('INSERT OR IGNORE INTO execution (context, stamp) VALUES(?, ?)',
+                               (context, to_epoch_us(datetime.datetime.utcnow().isoformat())))
+        row = connection.execute('SELECT id FROM execution WHERE context = ?', (context,)).fetchone()
+        if row is None:
+            raise LeappRuntimeError('Unknown execution context {}, the execution has to be stored first'.format(
+                context))
+        execution_id = cache[key] = row[0]
+    return execution_id
 
 
 class Storable(object):
@@ -63,11 +301,26 @@ class Storable(object):
     def store(self, db=None):
         """
         Stores the data within a transaction
+
+        If an audit writer is running and no database object is given, the data is handed to the writer instead and
+        the ids of the entries are not set.
+
         :param db: Database object (optional)
         :return: None
         """
-        with get_connection(db) as connection:
-            self.do_store(connection)
+        writer = None if db else _get_writer()
+        if writer:
+            writer.submit([self])
+            return
+        with database_lock():
+            connection = get_connection(db)
+            try:
+                with connection:
+                    self.do_store(connection)
+            except Exception:
+                clear_id_cache(connection)
+                remove_orphaned_payload_files(connection, [self])
+                raise
 
     def do_store(self, connection):
         """
@@ -113,11 +366,14 @@ class Execution(Storable):
 
     def do_store(self, connection):
         super(Execution, self).do_store(connection)
+        stamp = to_epoch_us(self.stamp)
         connection.execute('INSERT OR IGNORE INTO execution (context, configuration, stamp, kind) VALUES(?, ?, ?, ?)',
-                           (self.context, self.configuration, self.stamp, self.kind))
-        cursor = connection.execute('SELECT id FROM execution WHERE context = ?',
-                                    (self.context,))
-        self._execution_id = cursor.fetchone()[0]
+                           (self.context, self.configuration, stamp, self.kind))
+        # The execution of the testing context is created without details when entries are stored for it first
+        connection.execute(
+            'UPDATE execution SET configuration = ?, stamp = ?, kind = ? WHERE context = ? AND kind IS NULL',
+            (self.configuration, stamp, self.kind, self.context))
+        self._execution_id = _get_execution_id(connection, self.context)
 
 
 class Host(Storable):
@@ -127,6 +383,7 @@ class Host(Storable):
     def __init__(self, context=None, hostname=None):
         self.context = context
         self.hostname = hostname
+        self._execution_id = None
         self._host_id = None
 
     @property
@@ -139,31 +396,168 @@ class Host(Storable):
 
     def do_store(self, connection):
         super(Host, self).do_store(connection)
-        connection.execute('INSERT OR IGNORE INTO host (context, hostname) VALUES(?, ?)',
-                           (self.context, self.hostname))
-        cursor = connection.execute('SELECT id FROM host WHERE context = ? AND hostname = ?',
-                                    (self.context, self.hostname))
-        self._host_id = cursor.fetchone()[0]
+        self._execution_id = _get_execution_id(connection, self.context)
+        cache = _get_id_cache(connection)
+        key = ('host', self._execution_id, self.hostname)
+        self._host_id = cache.get(key)
+        if self._host_id is None:
+            connection.execute('INSERT OR IGNORE INTO host (execution_id, hostname) VALUES(?, ?)',
+                               (self._execution_id, self.hostname))
+            cursor = connection.execute('SELECT id FROM host WHERE execution_id = ? AND hostname = ?',
+                                        (self._execution_id, self.hostname))
+            self._host_id = cache[key] = cursor.fetchone()[0]
+
+
+# Format of compressed message payloads in the compression column of the message_data table
+_COMPRESSION_ZLIB = 'zlib'
+# Codec of message payloads which are text, the payloads of all other codecs are binary, see leapp.messaging.codecs
+TEXT_CODEC = 'json'
+# Storage of message payloads in the storage column of the message_data table, see leapp.utils.audit.payloads
+STORAGE_FILE = 'file'
+
+
+def get_connection_payload_dir(connection):
+    """
+    Returns the directory of the payload files of the database of the given connection, see
+    :py:func:`leapp.utils.audit.payloads.get_payload_dir`.
+
+    :param connection: Connection to the database
+    :type connection: :py:class:`sqlite3.Connection`
+    :return: str
+    """
+    path = [row[2] for row in connection.execute('PRAGMA database_list') if row[1] == 'main'][0]
+    return get_payload_dir(path)
+
+
+def _compress_payload(data, codec=TEXT_CODEC):
+    """
+    Prepares a message payload for the message_data table, payloads of at least `compression_threshold` bytes, an
+    option in the `database` section of the leapp configuration, are compressed unless that does not save any space.
+
+    :param data: Message payload
+    :type data: str or bytes
+    :param codec: Name of the codec the payload has been serialized with
+    :type codec: str
+    :return: Tuple of the stored data and its compression format, which is None for uncompressed data
+    """
+    config = get_config()
+    threshold = config.getint('database', 'compression_threshold')
+    stored = data if data is None or codec == TEXT_CODEC else sqlite3.Binary(data)
+    if data is None or threshold <= 0 or len(data) < threshold:
+        return stored, None
+    raw = data.encode('utf-8') if isinstance(data, six.text_type) else data
+    compressed = zlib.compress(raw, config.getint('database', 'compression_level'))
+    if len(compressed) >= len(raw):
+        return stored, None
+    return sqlite3.Binary(compressed), _COMPRESSION_ZLIB
+
+
+def _decompress_payload(data, compression, codec=TEXT_CODEC):
+    """
+    Returns the original message payload of data stored in the message_data table.
+
+    :param data: Stored data
+    :param compression: Compression format of the stored data or None
+    :type compression: str or None
+    :param codec: Name of the codec the payload has been serialized with
+    :type codec: str
+    :return: Message payload
+    :rtype: str or bytes
+    """
+    if compression is None:
+        return data if data is None or codec == TEXT_CODEC else bytes(data)
+    if compression == _COMPRESSION_ZLIB:
+        data = zlib.decompress(bytes(data))
+        return data.decode('utf-8') if codec == TEXT_CODEC else data
+    raise LeappRuntimeError('Unsupported compression of message data: {}'.format(compression))
+
+
+def _encode_payload(connection, hash_id, data, codec=TEXT_CODEC):
+    """
+    Prepares a message payload for the message_data table, payloads of at least `side_storage_threshold` bytes, an
+    option in the `database` section of the leapp configuration, are written to a file instead.
+
+    :return: Tuple of the stored data, its compression format and its storage, which is None for the table
+    """
+    threshold = get_config().getint('database', 'side_storage_threshold')
+    if data is not None and 0 < threshold <= len(data) and is_storable(hash_id):
+        # The row of a payload stored already is kept, a file written for it would not be referenced
+        if connection.execute('SELECT 1 FROM message_data WHERE hash = ?', (hash_id,)).fetchone() is None:
+            raw = data.encode('utf-8') if isinstance(data, six.text_type) else data
+            write_payload_file(get_connection_payload_dir(connection), hash_id, raw)
+            return None, None, STORAGE_FILE
+    return _compress_payload(data, codec) + (None,)
+
+
+def load_payload(connection, hash_id, data, compression, codec, storage):
+    """
+    Returns the message payload of a row of the message_data table, payloads stored in files are returned as
+    :py:class:`leapp.utils.audit.payloads.PayloadFile`.
+
+    :param connection: Connection to the database of the row
+    :type connection: :py:class:`sqlite3.Connection`
+    :param hash_id: Value of the hash column
+    :param data: Value of the data column
+    :param compression: Value of the compression column
+    :param codec: Value of the codec column
+    :param storage: Value of the storage column
+    :return: str, bytes or :py:class:`leapp.utils.audit.payloads.PayloadFile`
+    """
+    if storage == STORAGE_FILE:
+        return PayloadFile(os.path.join(get_connection_payload_dir(connection), hash_id))
+    return _decompress_payload(data, compression, codec)
+
+
+def remove_orphaned_payload_files(connection, entries):
+    """
+    Removes the payload files written for the given entries which are not referenced by the message_data table.
+
+    Payload files are written before the rows referencing them are inserted, this has to be called whenever a
+    transaction storing message payloads has been rolled back.
+
+    :param connection: Connection the transaction has been rolled back on
+    :type connection: :py:class:`sqlite3.Connection`
+    :param entries: Entries of the rolled back transaction, only messages and their payloads are considered
+    :type entries: list of :py:class:`Storable`
+    :return: Number of removed files
+    :rtype: int
+    """
+    threshold = get_config().getint('database', 'side_storage_threshold')
+    hashes = set()
+    for entry in entries:
+        payload = entry.message if isinstance(entry, Audit) else entry
+        payload = payload.data if isinstance(payload, Message) else payload
+        if isinstance(payload, MessageData) and payload.data is not None and 0 < threshold <= len(payload.data):
+            hashes.add(payload.hash_id)
+    orphaned = [hash_id for hash_id in sorted(hashes) if is_storable(hash_id) and connection.execute(
+        'SELECT 1 FROM message_data WHERE hash = ? AND storage = ?', (hash_id, STORAGE_FILE)).fetchone() is None]
+    return remove_payload_files(get_connection_payload_dir(connection), orphaned) if orphaned else 0
 
 
 class MessageData(Storable):
     """
     Message data
     """
-    def __init__(self, data=None, hash_id=None):
+    def __init__(self, data=None, hash_id=None, codec=TEXT_CODEC):
         """
         :param data: Message payload
-        :type data: str
+        :type data: str or bytes
         :param hash_id: SHA256 hash in hexadecimal representation of data
         :type hash_id: str
+        :param codec: Name of the codec the payload has been serialized with
+        :type codec: str
         """
         super(MessageData, self).__init__()
         self.data = data
         self.hash_id = hash_id
+        self.codec = codec
 
     def do_store(self, connection):
         super(MessageData, self).do_store(connection)
-        connection.execute('INSERT OR IGNORE INTO message_data (hash, data) VALUES(?, ?)', (self.hash_id, self.data))
+        connection.execute('INSERT OR IGNORE INTO message_data (hash, data, compression, storage, codec) '
+                           'VALUES(?, ?, ?, ?, ?)',
+                           (self.hash_id,) + _encode_payload(connection, self.hash_id, self.data, self.codec) +
+                           (self.codec,))
 
 
 class DataSource(Host):
@@ -193,12 +587,17 @@ class DataSource(Host):
 
     def do_store(self, connection):
         super(DataSource, self).do_store(connection)
-        connection.execute('INSERT OR IGNORE INTO data_source (context, host_id, actor, phase) VALUES(?, ?, ?, ?)',
-                           (self.context, self.host_id, self.actor, self.phase))
-        cursor = connection.execute(
-            'SELECT id FROM data_source WHERE context = ? AND host_id = ? AND actor = ? AND phase = ?',
-            (self.context, self.host_id, self.actor, self.phase))
-        self._data_source_id = cursor.fetchone()[0]
+        cache = _get_id_cache(connection)
+        key = ('data_source', self._execution_id, self.host_id, self.actor, self.phase)
+        self._data_source_id = cache.get(key)
+        if self._data_source_id is None:
+            connection.execute(
+                'INSERT OR IGNORE INTO data_source (execution_id, host_id, actor, phase) VALUES(?, ?, ?, ?)',
+                (self._execution_id, self.host_id, self.actor, self.phase))
+            cursor = connection.execute(
+                'SELECT id FROM data_source WHERE execution_id = ? AND host_id = ? AND actor = ? AND phase = ?',
+                (self._execution_id, self.host_id, self.actor, self.phase))
+            self._data_source_id = cache[key] = cursor.fetchone()[0]
 
 
 class Message(DataSource):
@@ -240,10 +639,14 @@ class Message(DataSource):
     def do_store(self, connection):
         super(Message, self).do_store(connection)
         self.data.do_store(connection)
+        self._insert(connection)
+
+    def _insert(self, connection):
         cursor = connection.execute(
-            'INSERT INTO message (context, stamp, topic, type, data_source_id, message_data_hash) '
+            'INSERT INTO message (execution_id, stamp, topic, type, data_source_id, message_data_hash) '
             'VALUES(?, ?, ?, ?, ?, ?)',
-            (self.context, self.stamp, self.topic, self.msg_type, self.data_source_id, self.data.hash_id))
+            (self._execution_id, to_epoch_us(self.stamp), self.topic, self.msg_type, self.data_source_id,
+             self.data.hash_id))
         self._message_id = cursor.lastrowid
 
 
@@ -288,18 +691,85 @@ class Audit(DataSource):
         if self.message and not self.message.message_id:
             self.message.do_store(connection)
 
-        if self.data and not isinstance(self.data, six.string_types):
-            self.data = json.dumps(self.data)
+        self._insert(connection)
+
+    def _insert(self, connection):
+        # The level of log messages is stored separately to allow querying by it
+        level = self.data.get('level') if isinstance(self.data, dict) else None
+        data = self.data
+        if data and not isinstance(data, six.string_types):
+            data = json.dumps(data)
 
         cursor = connection.execute(
-            'INSERT INTO audit (event, stamp, context, data_source_id, message_id, data)'
-            ' VALUES(?, ?, ?, ?, ?, ?)',
-            (self.event, self.stamp, self.context, self.data_source_id,
-             self.message.message_id if self.message else None, self.data))
+            'INSERT INTO audit (event, stamp, execution_id, data_source_id, level, message_id, data)'
+            ' VALUES(?, ?, ?, ?, ?, ?, ?)',
+            (self.event, to_epoch_us(self.stamp), self._execution_id, self.data_source_id, level,
+             self.message.message_id if self.message else None, data))
 
         self._audit_id = cursor.lastrowid
 
 
+def store_audit_entries(entries, db=None):
+    """
+    Stores the given audit entries and their messages within a single transaction
+
+    Host and data source entries are looked up only once for all entries sharing them and the message payloads are
+    inserted at once. If an audit writer is running and no database object is given, the entries are handed to the
+    writer instead.
+
+    :param entries: Audit entries to store
+    :type entries: list of :py:class:`leapp.utils.audit.Audit`
+    :param db: Database object (optional)
+    :return: None
+    """
+    entries = [entry for entry in entries if not entry.audit_id]
+    if not entries:
+        return
+    writer = None if db else _get_writer()
+    if writer:
+        writer.submit(entries)
+        return
+    messages = [entry.message for entry in entries if entry.message and not entry.message.message_id]
+    with database_lock():
+        connection = get_connection(db)
+        try:
+            with connection:
+                _store_audit_entries(entries, connection)
+        except Exception:
+            clear_id_cache(connection)
+            remove_orphaned_payload_files(connection, entries)
+            # Ids assigned within the rolled back transaction do not exist, the entries can be stored again
+            for entry in entries:
+                entry._audit_id = None
+            for message in messages:
+                message._message_id = None
+            raise
+
+
+def _store_audit_entries(entries, connection):
+    data_sources = {}
+    for source in entries + [entry.message for entry in entries if entry.message]:
+        key = (source.context, source.hostname, source.actor, source.phase)
+        if key not in data_sources:
+            data_sources[key] = DataSource(actor=source.actor, phase=source.phase, context=source.context,
+                                           hostname=source.hostname)
+            data_sources[key].do_store(connection)
+        source._execution_id = data_sources[key]._execution_id
+        source._host_id = data_sources[key].host_id
+        source._data_source_id = data_sources[key].data_source_id
+
+    messages = [entry.message for entry in entries if entry.message and not entry.message.message_id]
+    connection.executemany('INSERT OR IGNORE INTO message_data (hash, data, compression, storage, codec) '
+                           'VALUES(?, ?, ?, ?, ?)',
+                           [(message.data.hash_id,) + _encode_payload(connection, message.data.hash_id,
+                                                                      message.data.data, message.data.codec) +
+                            (message.data.codec,) for message in messages])
+    for message in messages:
+        message._insert(connection)
+    for entry in entries:
+        entry._insert(connection)
+
+
 def _dict_factory(cursor, row):
     d = {}
     for idx, col in enumerate(cursor.description):
@@ -309,12 +779,22 @@ def _dict_factory(cursor, row):
 
 _MESSAGE_QUERY_TEMPLATE = '''
         SELECT
-             id, context, stamp, topic, type, actor, phase, message_hash, message_data, hostname
+             id, context, stamp, topic, type, actor, phase, message_hash, message_data, message_compression,
+             message_codec, message_storage, hostname
         FROM
              messages_data
         WHERE context = ? AND type IN (%s)'''
 
 
+def _to_message(row, connection):
+    """ Transforms a row of the messages_data view to the expected format """
+    codec = row.pop('message_codec')
+    row['message'] = {'hash': row.pop('message_hash'), 'codec': codec}
+    row['message']['data'] = load_payload(connection, row['message']['hash'], row.pop('message_data'),
+                                          row.pop('message_compression'), codec, row.pop('message_storage'))
+    return row
+
+
 def get_messages(names, context):
     """
     Queries all messages from the database for the given context and the list of model names
@@ -327,17 +807,92 @@ def get_messages(names, context):
     if not names:
         return ()
 
-    with get_connection(None) as conn:
-        cursor = conn.execute(_MESSAGE_QUERY_TEMPLATE % ', '.join('?' * len(names)), (context,) + tuple(names))
+    flush_writer()
+    with database_lock(), get_connection(None) as conn:
+        # Without the ordering the rows would be returned in the order of the index on the message types
+        cursor = conn.execute(_MESSAGE_QUERY_TEMPLATE % ', '.join('?' * len(names)) + ' ORDER BY id',
+                              (context,) + tuple(names))
         cursor.row_factory = _dict_factory
         result = cursor.fetchall()
 
         # Transform to expected format
         for row in result:
-            row['message'] = {'data': row.pop('message_data'), 'hash': row.pop('message_hash')}
+            _to_message(row, conn)
         return result
 
 
+def get_last_message_id():
+    """
+    Returns the id of the message stored last
+
+    :return: Id of the last message or 0 if there are no messages
+    :rtype: int
+    """
+    flush_writer()
+    with database_lock(), get_connection(None) as conn:
+        return conn.execute('SELECT MAX(id) FROM message').fetchone()[0] or 0
+
+
+def iter_messages(names, context, until_id=None, batch_size=500, after_id=0):
+    """
+    Queries the messages from the database for the given context and the list of model names in batches.
+
+    Every batch is queried separately, no database transaction is held open while the returned messages are processed.
+
+    :param names: List of names that should be messages returned for
+    :type names: list or tuple of str
+    :param context: Execution id the message should be queried from.
+    :type context: str
+    :param until_id: Only messages up to including this id are returned, all messages if None
+    :type until_id: int or None
+    :param batch_size: Number of messages queried at once
+    :type batch_size: int
+    :param after_id: Only messages with a greater id than this one are returned
+    :type after_id: int
+    :return: Iterable with messages in the order they have been stored
+    :rtype: iterable
+    """
+    if not names:
+        return
+    flush_writer()
+    query = _MESSAGE_QUERY_TEMPLATE % ', '.join('?' * len(names))
+    parameters = (context,) + tuple(names)
+    if until_id is not None:
+        query += ' AND id <= ?'
+        parameters += (until_id,)
+    query += ' AND id > ? ORDER BY id LIMIT ?'
+    last_id = after_id
+    while True:
+        with database_lock(), get_connection(None) as conn:
+            cursor = conn.execute(query, parameters + (last_id, batch_size))
+            cursor.row_factory = _dict_factory
+            rows = [_to_message(row, conn) for row in cursor.fetchall()]
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]['id']
+
+
+def checkpoint_wal(db=None):
+    """
+    Transfers the content of the write-ahead log into the database and truncates the log, if the database uses
+    write-ahead logging.
+
+    Transactions are transferred automatically whenever the log grows larger than the `wal_autocheckpoint` option in
+    the `database` section of the leapp configuration, this allows to do it at a convenient time, e.g. once a workflow
+    has finished. Transactions of connections, which are still reading, are not transferred.
+
+    :param db: Database object (optional)
+    :return: None
+    """
+    flush_writer()
+    with database_lock():
+        connection = get_connection(db)
+        if connection.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+            connection.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+
 _AUDIT_CHECKPOINT_EVENT = 'checkpoint'
 
 
@@ -379,19 +934,15 @@ def get_checkpoints(context):
     :type context: str
     :return: list of dicts with id, timestamp, actor and phase fields
     """
-    with get_connection(None) as conn:
+    flush_writer()
+    with database_lock(), get_connection(None) as conn:
         cursor = conn.execute('''
             SELECT
-                audit.id          AS id,
-                audit.stamp       AS stamp,
-                data_source.actor AS actor,
-                data_source.phase AS phase
+                id, stamp, actor, phase
               FROM
-                audit
-              JOIN
-                data_source ON data_source.id = audit.data_source_id
+                audit_data
               WHERE
-                audit.context = ? AND audit.event = ?
+                context = ? AND event = ?
               ORDER BY stamp ASC;
         ''', (context, _AUDIT_CHECKPOINT_EVENT))
         cursor.row_factory = _dict_factory
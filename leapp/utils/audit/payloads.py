@@ -0,0 +1,156 @@
+"""
+Side storage of very large message payloads.
+
+Payloads of at least `side_storage_threshold` bytes, an option in the `database` section of the leapp configuration,
+are not stored in the message_data table but in files next to the database, which are named by the hash of the
+payload. Messages queried from the database provide these payloads as :py:class:`PayloadFile`, which reads the file
+only when it is used and allows to read only parts of it or to map it into memory.
+"""
+import errno
+import mmap
+import os
+import re
+import tempfile
+
+from leapp.config import get_config
+
+# Only payloads identified by a SHA256 hash in hexadecimal representation are stored in files
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def get_payload_dir(database_path):
+    """
+    Returns the directory of the payload files of the database at the given path, which is the `message-data`
+    directory next to the database unless the `side_storage_dir` option in the `database` section of the leapp
+    configuration is set.
+
+    :param database_path: Path to the database file
+    :type database_path: str
+    :return: str
+    """
+    return get_config().get('database', 'side_storage_dir') or os.path.join(
+        os.path.dirname(os.path.abspath(database_path)), 'message-data')
+
+
+def is_storable(hash_id):
+    """
+    :param hash_id: Hash of a payload
+    :type hash_id: str
+    :return: Whether a payload with this hash can be stored in a file
+    :rtype: bool
+    """
+    return bool(hash_id and _HASH_PATTERN.match(hash_id))
+
+
+def write_payload_file(directory, hash_id, data):
+    """
+    Stores a payload in its file, unless the file exists already.
+
+    The file is written under a temporary name and renamed once it is complete, so that an existing file always holds
+    the complete payload.
+
+    :param directory: Directory of the payload files
+    :type directory: str
+    :param hash_id: Hash of the payload
+    :type hash_id: str
+    :param data: Encoded payload
+    :type data: bytes
+    :return: Path to the file
+    :rtype: str
+    """
+    path = os.path.join(directory, hash_id)
+    if os.path.exists(path):
+        return path
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    fd, temporary = tempfile.mkstemp(prefix='.' + hash_id, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary, path)
+    except Exception:
+        os.unlink(temporary)
+        raise
+    return path
+
+
+def remove_payload_files(directory, hashes):
+    """
+    Removes the files of the given payloads, files which do not exist are ignored.
+
+    :param directory: Directory of the payload files
+    :type directory: str
+    :param hashes: Hashes of the payloads
+    :type hashes: Iterable of str
+    :return: Number of removed files
+    :rtype: int
+    """
+    removed = 0
+    for hash_id in hashes:
+        try:
+            os.unlink(os.path.join(directory, hash_id))
+            removed += 1
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+    return removed
+
+
+class PayloadFile(object):
+    """
+    Payload of a message stored in a file, the file is read only when the payload is used.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path to the payload file
+        :type path: str
+        """
+        self.path = path
+
+    def __len__(self):
+        return os.path.getsize(self.path)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, PayloadFile) and other.path == self.path
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def read(self, offset=0, size=-1):
+        """
+        Reads the payload or a part of it.
+
+        :param offset: Position of the first byte to read
+        :type offset: int
+        :param size: Number of bytes to read, all remaining bytes if negative
+        :type size: int
+        :return: Encoded payload
+        :rtype: bytes
+        """
+        with open(self.path, 'rb') as f:
+            if offset:
+                f.seek(offset)
+            return f.read(size)
+
+    def mmap(self):
+        """
+        Maps the payload read-only into memory, pages of the file are only read when they are accessed.
+
+        The returned object has to be closed once it is not needed anymore.
+
+        :return: :py:class:`mmap.mmap` of the payload file
+        """
+        with open(self.path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
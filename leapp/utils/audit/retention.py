@@ -0,0 +1,221 @@
+"""
+Retention of executions in the audit database.
+
+Pruning removes executions together with all their hosts, data sources, messages and audit entries, and afterwards the
+message payloads no longer referenced by any message, including their files. Removed executions can be archived to a
+gzip compressed file with one JSON document per execution. The space freed in the database file is returned to the
+file system by an incremental vacuum.
+"""
+import base64
+import datetime
+import gzip
+import json
+import os
+
+from leapp.config import get_config
+from leapp.utils.audit import (STORAGE_FILE, TEXT_CODEC, clear_id_cache, database_lock, flush_writer, get_connection,
+                               get_connection_payload_dir, load_payload, to_epoch_us)
+from leapp.utils.audit.payloads import PayloadFile, remove_payload_files
+
+# Maximum number of ids bound to a single statement, SQLite allows 999 variables by default
+_CHUNK_SIZE = 500
+
+
+def get_retention_policy(max_age_days=None, kinds=None, keep_last=None, archive=None, archive_dir=None):
+    """
+    Returns the retention policy configured in the `retention` section of the leapp configuration as keyword arguments
+    for :py:func:`prune`.
+
+    Every given parameter overrides the respective configuration option.
+
+    :param max_age_days: Minimum age of removed executions in days, 0 removes executions of any age
+    :type max_age_days: int or None
+    :param kinds: Kinds of the removed executions, all kinds if empty
+    :type kinds: list of str or None
+    :param keep_last: Number of the latest executions of every kind which are kept
+    :type keep_last: int or None
+    :param archive: Whether removed executions are archived
+    :type archive: bool or None
+    :param archive_dir: Directory to archive removed executions in, next to the database if empty
+    :type archive_dir: str or None
+    :return: dict
+    """
+    config = get_config()
+    if max_age_days is None:
+        max_age_days = config.getint('retention', 'max_age_days')
+    if kinds is None:
+        kinds = [kind.strip() for kind in config.get('retention', 'kinds').split(',') if kind.strip()]
+    if keep_last is None:
+        keep_last = config.getint('retention', 'keep_last')
+    if archive is None:
+        archive = config.getboolean('retention', 'archive')
+    if archive:
+        archive_dir = archive_dir or config.get('retention', 'archive_dir') or os.path.join(
+            os.path.dirname(os.path.abspath(config.get('database', 'path'))), 'archive')
+    return {
+        'max_age': datetime.timedelta(days=max_age_days) if max_age_days > 0 else None,
+        'kinds': kinds,
+        'keep_last': keep_last,
+        'archive_dir': archive_dir if archive else None,
+        'vacuum_pages': config.getint('retention', 'vacuum_pages'),
+    }
+
+
+def _select_executions(connection, max_age, kinds, keep_last):
+    current = os.environ.get('LEAPP_EXECUTION_ID')
+    cutoff = None
+    if max_age is not None:
+        cutoff = to_epoch_us((datetime.datetime.utcnow() - max_age).isoformat())
+    kept = {}
+    selected = []
+    for execution_id, context, kind, stamp in connection.execute(
+            'SELECT id, context, kind, stamp FROM execution ORDER BY stamp DESC, id DESC'):
+        kept[kind] = kept.get(kind, 0) + 1
+        if kept[kind] <= keep_last or context == current:
+            continue
+        if (cutoff is None or stamp < cutoff) and (not kinds or kind in kinds):
+            selected.append(execution_id)
+    return selected
+
+
+def _chunks(ids):
+    for index in range(0, len(ids), _CHUNK_SIZE):
+        chunk = ids[index:index + _CHUNK_SIZE]
+        yield chunk, ', '.join('?' * len(chunk))
+
+
+def _query(connection, query, parameters):
+    cursor = connection.execute(query, parameters)
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def _archive(connection, ids, archive_dir):
+    if not os.path.isdir(archive_dir):
+        os.makedirs(archive_dir)
+    stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    path = os.path.join(archive_dir, 'leapp-{}.jsonl.gz'.format(stamp))
+    with gzip.open(path, 'wb') as f:
+        for execution_id in ids:
+            document = _query(connection, 'SELECT id, context, stamp, configuration, kind FROM execution WHERE id = ?',
+                              (execution_id,))[0]
+            document['messages'] = _query(
+                connection, 'SELECT id, stamp, topic, type, actor, phase, hostname, message_hash, message_data, '
+                            'message_compression, message_codec, message_storage FROM messages_data '
+                            'WHERE execution_id = ? ORDER BY id', (execution_id,))
+            for message in document['messages']:
+                data = load_payload(connection, message['message_hash'], message['message_data'],
+                                    message.pop('message_compression'), message['message_codec'],
+                                    message.pop('message_storage'))
+                if isinstance(data, PayloadFile):
+                    data = data.read()
+                    if message['message_codec'] == TEXT_CODEC:
+                        data = data.decode('utf-8')
+                if message['message_codec'] != TEXT_CODEC:
+                    # Binary payloads are archived in base64
+                    data = base64.b64encode(data).decode('ascii')
+                message['message_data'] = data
+            document['audit'] = _query(
+                connection, 'SELECT id, event, stamp, actor, phase, hostname, level, message_id, data '
+                            'FROM audit_data WHERE execution_id = ? ORDER BY id', (execution_id,))
+            f.write((json.dumps(document, sort_keys=True) + '\n').encode('utf-8'))
+    return path
+
+
+def _delete(connection, ids):
+    counts = {'executions': 0, 'messages': 0, 'audit': 0}
+    for chunk, placeholders in _chunks(ids):
+        counts['audit'] += connection.execute(
+            'DELETE FROM audit WHERE execution_id IN ({})'.format(placeholders), chunk).rowcount
+        counts['messages'] += connection.execute(
+            'DELETE FROM message WHERE execution_id IN ({})'.format(placeholders), chunk).rowcount
+        connection.execute('DELETE FROM data_source WHERE execution_id IN ({})'.format(placeholders), chunk)
+        connection.execute('DELETE FROM host WHERE execution_id IN ({})'.format(placeholders), chunk)
+        counts['executions'] += connection.execute(
+            'DELETE FROM execution WHERE id IN ({})'.format(placeholders), chunk).rowcount
+    counts['payload_files'] = [row[0] for row in connection.execute(
+        'SELECT hash FROM message_data WHERE storage = ? AND hash NOT IN (SELECT message_data_hash FROM message)',
+        (STORAGE_FILE,))]
+    counts['message_data'] = connection.execute(
+        'DELETE FROM message_data WHERE hash NOT IN (SELECT message_data_hash FROM message)').rowcount
+    return counts
+
+
+def vacuum(pages=0, db=None):
+    """
+    Returns free pages of the database file to the file system.
+
+    Databases created without incremental vacuum support are converted by a full vacuum the first time.
+
+    :param pages: Maximum number of pages to free, 0 frees all free pages
+    :type pages: int
+    :param db: Database object (optional)
+    :return: Number of freed pages
+    :rtype: int
+    """
+    with database_lock():
+        connection = get_connection(db)
+        free = connection.execute('PRAGMA freelist_count').fetchone()[0]
+        if connection.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            connection.execute('VACUUM')
+        else:
+            # Every step of the statement frees a single page, unlike execute, executescript performs all of them
+            connection.executescript('PRAGMA incremental_vacuum({:d});'.format(max(0, pages)))
+        return free - connection.execute('PRAGMA freelist_count').fetchone()[0]
+
+
+def report(result):
+    """
+    Returns a human readable summary of the result of :py:func:`prune`.
+
+    :param result: Result returned by :py:func:`prune`
+    :type result: dict
+    :return: str
+    """
+    summary = 'Removed {executions} executions with {messages} messages, {audit} audit entries and {message_data} ' \
+              'message payloads ({payload_files} stored in files), freed {freed_pages} database pages'.format(**result)
+    if result['archive']:
+        summary += '\nArchived the removed executions in {}'.format(result['archive'])
+    return summary
+
+
+def prune(max_age=None, kinds=None, keep_last=1, archive_dir=None, vacuum_pages=0, db=None):
+    """
+    Removes executions and all their entries from the database.
+
+    The latest executions of every kind and the current execution are always kept, so that they can be resumed.
+
+    :param max_age: Only executions started longer ago are removed, all executions if None
+    :type max_age: :py:class:`datetime.timedelta` or None
+    :param kinds: Only executions of these kinds are removed, executions of all kinds if empty
+    :type kinds: list of str or None
+    :param keep_last: Number of the latest executions of every kind which are kept
+    :type keep_last: int
+    :param archive_dir: Directory to archive the removed executions in, they are not archived if None
+    :type archive_dir: str or None
+    :param vacuum_pages: Maximum number of pages freed in the database file, 0 frees all
+    :type vacuum_pages: int
+    :param db: Database object (optional)
+    :return: Numbers of the removed `executions`, `messages`, `audit` entries, `message_data` payloads and
+             `payload_files`, the `archive` path or None and the number of `freed_pages`
+    :rtype: dict
+    """
+    flush_writer()
+    with database_lock():
+        connection = get_connection(db)
+        ids = _select_executions(connection, max_age, kinds, max(0, keep_last))
+        archive = None
+        if ids and archive_dir:
+            archive = _archive(connection, ids, archive_dir)
+        try:
+            with connection:
+                result = _delete(connection, ids)
+        finally:
+            # Cached ids of removed hosts and data sources must not be used anymore
+            clear_id_cache(connection)
+        # Files are removed only once their rows are gone for sure
+        result['payload_files'] = remove_payload_files(get_connection_payload_dir(connection), result['payload_files'])
+        result['archive'] = archive
+        result['freed_pages'] = vacuum(pages=vacuum_pages, db=connection)
+    return result
@@ -0,0 +1,296 @@
+"""
+Single writer process for the audit database.
+
+While an :py:class:`AuditWriter` is running, all audit entries stored by the process that started it and by all
+processes started afterwards, like the actor processes, are sent over a UNIX socket to the writer process instead of
+being written to the database by every process on its own. The writer process is the only one writing to the database
+and stores the entries it receives in group transactions.
+
+Storing entries does not wait for them to be written, the ids of stored objects are therefore not set. Reading from
+the database through :py:mod:`leapp.utils.audit` waits until all entries received by the writer have been written.
+"""
+import atexit
+import binascii
+import os
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+import weakref
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
+
+from six.moves import queue
+
+from leapp.exceptions import LeappRuntimeError
+from leapp.logger import flush_audit_log
+from leapp.utils.audit import (Audit, _store_audit_entries, clear_id_cache, database_lock, get_connection,
+                               remove_orphaned_payload_files)
+
+_ADDRESS_VARIABLE = 'LEAPP_AUDIT_WRITER'
+_AUTHKEY_VARIABLE = 'LEAPP_AUDIT_WRITER_KEY'
+
+# Connection of the current process to the writer as ((pid, address), connection)
+_CLIENT = None
+
+
+def is_active():
+    """
+    :return: True if an audit writer is running for the current process
+    """
+    return bool(os.environ.get(_ADDRESS_VARIABLE))
+
+
+def _request(request, value=None):
+    global _CLIENT
+    address = os.environ[_ADDRESS_VARIABLE]
+    # The database lock is held whenever a process is forked, so that a forked process never inherits a connection
+    # in the middle of a request
+    with database_lock():
+        if _CLIENT is None or _CLIENT[0] != (os.getpid(), address):
+            authkey = binascii.unhexlify(os.environ[_AUTHKEY_VARIABLE].encode('ascii'))
+            _CLIENT = ((os.getpid(), address), Client(address, family='AF_UNIX', authkey=authkey))
+        connection = _CLIENT[1]
+        connection.send((request, value))
+        if request != 'store':
+            return connection.recv()
+        return None
+
+
+def submit(entries):
+    """
+    Sends the given entries to the audit writer, which stores them asynchronously.
+
+    :param entries: Entries to store
+    :type entries: list of :py:class:`leapp.utils.audit.Storable`
+    :return: None
+    """
+    _request('store', list(entries))
+
+
+def flush():
+    """
+    Waits until the audit writer has written all entries it received so far, from any process.
+
+    :return: Statistics of the audit writer or None if no audit writer is running
+    :rtype: dict or None
+    """
+    if not is_active():
+        return None
+    return _request('flush')
+
+
+def _forget_ids(entries):
+    # Ids assigned within a rolled back transaction do not exist, entries with an id would be skipped as stored
+    for entry in entries:
+        for stored in (entry, getattr(entry, 'message', None)):
+            for name in ('_audit_id', '_message_id'):
+                if getattr(stored, name, None) is not None:
+                    setattr(stored, name, None)
+
+
+def _store(entries, connection):
+    audits = []
+    for entry in entries:
+        if isinstance(entry, Audit):
+            audits.append(entry)
+            continue
+        if audits:
+            _store_audit_entries(audits, connection)
+            audits = []
+        entry.do_store(connection)
+    if audits:
+        _store_audit_entries(audits, connection)
+
+
+class _Server(object):
+    def __init__(self, batch_size):
+        self._batch_size = batch_size
+        self._queue = queue.Queue()
+        self.stats = {'entries': 0, 'transactions': 0, 'errors': 0, 'seconds': 0.0}
+
+    def accept(self, listener):
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception:  # noqa
+                # Failed authentication of a single client
+                continue
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        try:
+            while True:
+                request, value = connection.recv()
+                if request == 'store':
+                    self._queue.put(value)
+                else:
+                    connection.send(self.barrier())
+        except (EOFError, IOError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def barrier(self):
+        """
+        Waits until everything queued so far has been written and returns the statistics.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        return dict(self.stats)
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _write(self, entries):
+        with database_lock():
+            connection = get_connection(None)
+            try:
+                with connection:
+                    _store(entries, connection)
+                self.stats['transactions'] += 1
+                self.stats['entries'] += len(entries)
+            except Exception:  # noqa
+                clear_id_cache(connection)
+                remove_orphaned_payload_files(connection, entries)
+                _forget_ids(entries)
+                if len(entries) == 1:
+                    self.stats['errors'] += 1
+                    traceback.print_exc()
+                else:
+                    # Store every entry on its own, so that only the failing entries are lost
+                    for entry in entries:
+                        self._write([entry])
+
+    def _commit(self, entries):
+        if entries:
+            started = time.time()
+            self._write(entries)
+            self.stats['seconds'] += time.time() - started
+
+    def run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(block=not pending)
+            except queue.Empty:
+                # Nothing more to group with the pending entries
+                item = ()
+            if isinstance(item, list):
+                pending.extend(item)
+                if len(pending) < self._batch_size:
+                    continue
+            self._commit(pending)
+            pending = []
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+
+def _watch(control, server):
+    try:
+        control.recv()
+    except EOFError:
+        # The process that started the writer terminated
+        pass
+    stats = server.barrier()
+    try:
+        control.send(stats)
+    except (IOError, OSError):
+        pass
+    server.stop()
+
+
+def _writer_main(control, owner_control, address, authkey, batch_size):
+    # The writer notices the termination of its owner only once it does not hold the owner's end itself
+    owner_control.close()
+    # Entries of the writer process itself are written directly
+    os.environ.pop(_ADDRESS_VARIABLE, None)
+    os.environ.pop(_AUTHKEY_VARIABLE, None)
+    listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    server = _Server(batch_size)
+    for target, args in ((server.accept, (listener,)), (_watch, (control, server))):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+    control.send('ready')
+    server.run()
+
+
+_WRITERS = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_writers():
+    for writer in list(_WRITERS):
+        writer.stop()
+
+
+class AuditWriter(object):
+    """
+    Starts the audit writer process for the current process and all processes started by it afterwards.
+    """
+
+    def __init__(self, batch_size=1000):
+        """
+        :param batch_size: Maximum number of entries written in a single transaction
+        :type batch_size: int
+        """
+        self._directory = tempfile.mkdtemp(prefix='leapp-audit-writer-')
+        self.address = os.path.join(self._directory, 'socket')
+        authkey = os.urandom(32)
+        self._control, child_control = Pipe()
+        self._process = Process(target=_writer_main,
+                                args=(child_control, self._control, self.address, authkey, max(1, batch_size)))
+        with database_lock():
+            self._process.start()
+        child_control.close()
+        try:
+            self._control.recv()
+        except EOFError:
+            self._process.join()
+            shutil.rmtree(self._directory, ignore_errors=True)
+            raise LeappRuntimeError('The audit writer process failed to start')
+        self._previous = (os.environ.get(_ADDRESS_VARIABLE), os.environ.get(_AUTHKEY_VARIABLE))
+        os.environ[_ADDRESS_VARIABLE] = self.address
+        os.environ[_AUTHKEY_VARIABLE] = binascii.hexlify(authkey).decode('ascii')
+        self._stats = None
+        self._stopped = False
+        _WRITERS.add(self)
+
+    def stop(self):
+        """
+        Writes all pending entries, including the log records of the current process, and stops the writer process.
+
+        Entries stored afterwards are written directly to the database again.
+
+        :return: Statistics with the number of written `entries`, the number of `transactions` they have been written
+                 in, the number of entries that failed to be written as `errors` and the `seconds` spent writing
+        :rtype: dict
+        """
+        if self._stopped:
+            return self._stats
+        self._stopped = True
+        flush_audit_log()
+        if os.environ.get(_ADDRESS_VARIABLE) == self.address:
+            # Ensures the entries sent by this process are queued before the writer is stopped
+            flush()
+        for name, value in zip((_ADDRESS_VARIABLE, _AUTHKEY_VARIABLE), self._previous):
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        try:
+            self._control.send('stop')
+            self._stats = self._control.recv()
+        except (EOFError, IOError, OSError):
+            pass
+        self._control.close()
+        self._process.join()
+        shutil.rmtree(self._directory, ignore_errors=True)
+        return self._stats
@@ -2,6 +2,7 @@ import json
 import sys
 from pprint import pformat
 
+from leapp.messaging.codecs import decode_payload
 from leapp.models import ErrorModel
 
 
@@ -27,7 +28,7 @@ def report_errors(errors):
 
 
 def print_error(error):
-    model = ErrorModel.create(json.loads(error['message']['data']))
+    model = ErrorModel.create(decode_payload(error['message']))
     red, reset = _get_colors()
     sys.stdout.write("{red}{time} [{severity}]{reset} Actor: {actor} Message: {message}\n".format(
         red=red, reset=reset, severity=model.severity.upper(), message=model.message, time=model.time,
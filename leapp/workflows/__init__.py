@@ -4,14 +4,19 @@ import socket
 import sys
 import uuid
 
+from leapp.config import get_config
+from leapp.executors import get_executor
+from leapp.logger import flush_audit_log
 from leapp.utils.meta import with_metaclass, get_flattened_subclasses
 from leapp.utils import reboot_system
 from leapp.workflows.phases import Phase
 from leapp.workflows.policies import Policies
 from leapp.workflows.phaseactors import PhaseActors
-from leapp.messaging.inprocess import InProcessMessaging
+from leapp.workflows.scheduler import StageScheduler
+from leapp.messaging.inprocess import InProcessMessaging, MessageCache
 from leapp.tags import ExperimentalTag
-from leapp.utils.audit import checkpoint, get_errors
+from leapp.utils.audit import Execution, checkpoint, checkpoint_wal, get_errors
+from leapp.utils.audit.writer import AuditWriter
 
 
 def _phase_sorter_key(a):
@@ -26,6 +31,12 @@ def _get_phases_sorted(attrs):
     return tuple(sorted([attr for attr in attrs.values() if _is_phase(attr)], key=_phase_sorter_key))
 
 
+def _checkpoint(actor, phase, context):
+    # The log records of everything that happened before the checkpoint have to be stored before it
+    flush_audit_log()
+    checkpoint(actor=actor, phase=phase, context=context, hostname=os.environ['LEAPP_HOSTNAME'])
+
+
 class WorkflowMeta(type):
     """
     Meta class for the registration of workflows
@@ -126,7 +137,55 @@ class Workflow(with_metaclass(WorkflowMeta)):
         """ All produced messages """
         return self._all_produced
 
-    def run(self, context=None, until_phase=None, until_actor=None, skip_phases_until=None):
+    def _process_actor(self, actor, phase, context, logger, needle_actor, executor, cache=None):
+        """
+        Executes a single actor of the given phase and creates its checkpoint.
+
+        :param actor: Actor to execute
+        :type actor: :py:class:`leapp.repository.actor_definition.ActorDefinition`
+        :param phase: Phase the actor is executed in
+        :type phase: class derived from :py:class:`leapp.workflows.phases.Phase`
+        :param context: The execution context
+        :type context: str
+        :param logger: Logger of the current phase
+        :type logger: Instance of :py:class:`logging.Logger`
+        :param needle_actor: Lower case name of the actor after which the execution should finish
+        :type needle_actor: str
+        :param executor: Executor to run the actor with
+        :type executor: :py:class:`leapp.executors.ActorExecutor`
+        :param cache: Cache of the messages of the execution, which provides the consumed messages of the actor and is
+                      fed with the produced ones
+        :type cache: :py:class:`leapp.messaging.inprocess.MessageCache` or None
+        :return: True if the workflow execution has to finish after this actor, otherwise False
+        """
+        designation = ''
+        if ExperimentalTag in actor.tags:
+            designation = '[EXPERIMENTAL]'
+            if actor not in self.experimental_whitelist:
+                logger.info("Skipping experimental actor {actor}".format(actor=actor.name))
+                return False
+        logger.info("Executing actor {actor} {designation}".format(designation=designation, actor=actor.name))
+        messaging = InProcessMessaging(cache=cache)
+        messaging.load(actor.consumes)
+        actor(logger=logger, messaging=messaging, executor=executor).run()
+        if cache is not None:
+            cache.feed(messaging.messages())
+
+        # Collect errors
+        if messaging.errors():
+            self._errors.extend(messaging.errors())
+
+            if phase.policies.error is Policies.Errors.FailImmediately:
+                self.log.info('Workflow interrupted due to FailImmediately error policy')
+                return True
+
+        _checkpoint(actor=actor.name, phase=phase.name, context=context)
+        if needle_actor in (actor.name.lower(), actor.class_name.lower()):
+            self.log.info('Workflow finished due to the until-actor flag')
+            return True
+        return False
+
+    def run(self, context=None, until_phase=None, until_actor=None, skip_phases_until=None, max_workers=None):
         """
         Executes the workflow
 
@@ -142,12 +201,21 @@ class Workflow(with_metaclass(WorkflowMeta)):
         :param skip_phases_until: Skips all phases until including the phase specified, and then continues the
                execution.
         :type skip_phases_until: str or None
+        :param max_workers: Maximum number of actors of a stage executed concurrently. Actors are only executed
+                            concurrently if they do not depend on messages produced by each other. If not specified
+                            the value of `max_workers` in the `workflow` section of the configuration is used.
+                            With a value of 1 all actors are executed one after another.
+        :type max_workers: int or None
 
         """
         context = context or str(uuid.uuid4())
+        # Entries can only be stored for known executions, an execution which has been stored already is kept as it is
+        Execution(context=context, kind='workflow-run', configuration='').store()
         os.environ['LEAPP_EXECUTION_ID'] = context
         if not os.environ.get('LEAPP_HOSTNAME', None):
             os.environ['LEAPP_HOSTNAME'] = socket.getfqdn()
+        if max_workers is None:
+            max_workers = get_config().getint('workflow', 'max_workers')
 
         self.log.info('Starting workflow execution: {name} - ID: {id}'.format(
             name=self.name, id=os.environ['LEAPP_EXECUTION_ID']))
@@ -161,72 +229,84 @@ class Workflow(with_metaclass(WorkflowMeta)):
         needle_stage = (needle_stage or '').lower()
         needle_actor = (until_actor or '').lower()
 
+        config = get_config()
+        writer = None
+        if config.getboolean('database', 'audit_writer'):
+            # Started before the executor, so that all actor processes send their entries to the writer
+            writer = AuditWriter(batch_size=config.getint('database', 'audit_writer_batch_size'))
+
         self._errors = get_errors(context)
 
-        for phase in self._phase_actors:
-            os.environ['LEAPP_CURRENT_PHASE'] = phase[0].name
-
-            if skip_phases_until:
-                if skip_phases_until in (phase[0].__name__.lower(), phase[0].name.lower()):
-                    skip_phases_until = ''
-                self.log.info('Skipping phase {name}'.format(name=phase[0].name))
-                continue
-
-            self.log.info('Starting phase {name}'.format(name=phase[0].name))
-            current_logger = self.log.getChild(phase[0].name)
-
-            for stage in phase[1:]:
-                current_logger.info("Starting stage {stage} of phase {phase}".format(
-                    phase=phase[0].name, stage=stage.stage))
-                for actor in stage.actors:
-                    designation = ''
-                    if ExperimentalTag in actor.tags:
-                        designation = '[EXPERIMENTAL]'
-                        if actor not in self.experimental_whitelist:
-                            current_logger.info("Skipping experimental actor {actor}".format(actor=actor.name))
-                            continue
-                    current_logger.info("Executing actor {actor} {designation}".format(designation=designation,
-                                                                                       actor=actor.name))
-                    messaging = InProcessMessaging()
-                    messaging.load(actor.consumes)
-                    actor(logger=current_logger, messaging=messaging).run()
-
-                    # Collect errors
-                    if messaging.errors():
-                        self._errors.extend(messaging.errors())
-
-                        if phase[0].policies.error is Policies.Errors.FailImmediately:
-                            self.log.info('Workflow interrupted due to FailImmediately error policy')
+        cache = None
+        if config.getboolean('messaging', 'workflow_cache') and not config.getboolean('messaging', 'stream'):
+            cache = MessageCache([model.__name__ for model in self._all_consumed], context)
+
+        executor = get_executor(actors=[actor for phase in self._phase_actors for stage in phase[1:]
+                                        for actor in stage.actors])
+        try:
+            for phase in self._phase_actors:
+                os.environ['LEAPP_CURRENT_PHASE'] = phase[0].name
+
+                if skip_phases_until:
+                    if skip_phases_until in (phase[0].__name__.lower(), phase[0].name.lower()):
+                        skip_phases_until = ''
+                    self.log.info('Skipping phase {name}'.format(name=phase[0].name))
+                    continue
+
+                self.log.info('Starting phase {name}'.format(name=phase[0].name))
+                if cache is not None:
+                    # Picks up the messages stored before the execution or outside of it
+                    cache.refresh()
+                current_logger = self.log.getChild(phase[0].name)
+
+                for stage in phase[1:]:
+                    current_logger.info("Starting stage {stage} of phase {phase}".format(
+                        phase=phase[0].name, stage=stage.stage))
+
+                    def execute(actor):
+                        return self._process_actor(actor=actor, phase=phase[0], context=context, logger=current_logger,
+                                                   needle_actor=needle_actor, executor=executor, cache=cache)
+
+                    if max_workers > 1:
+                        last_actor = next((actor for actor in stage.actors
+                                           if needle_actor in (actor.name.lower(), actor.class_name.lower())), None)
+                        if StageScheduler(stage, max_workers, last_actor=last_actor).run(execute):
                             return
+                    else:
+                        for actor in stage.actors:
+                            if execute(actor):
+                                return
 
-                    checkpoint(actor=actor.name, phase=phase[0].name, context=context,
-                               hostname=os.environ['LEAPP_HOSTNAME'])
-                    if needle_actor in (actor.name.lower(), actor.class_name.lower()):
-                        self.log.info('Workflow finished due to the until-actor flag')
-                        return
-                if not stage.actors:
-                    checkpoint(actor='', phase=phase[0].name + '.' + stage.stage, context=context,
-                               hostname=os.environ['LEAPP_HOSTNAME'])
+                    if not stage.actors:
+                        _checkpoint(actor='', phase=phase[0].name + '.' + stage.stage, context=context)
 
-                if needle_phase in (phase[0].__name__.lower(), phase[0].name.lower()) and \
-                        needle_stage == stage.stage.lower():
-                    self.log.info('Workflow finished due to the until-phase flag')
-                    return
+                    if needle_phase in (phase[0].__name__.lower(), phase[0].name.lower()) and \
+                            needle_stage == stage.stage.lower():
+                        self.log.info('Workflow finished due to the until-phase flag')
+                        return
 
-            checkpoint(actor='', phase=phase[0].name, context=context, hostname=os.environ['LEAPP_HOSTNAME'])
+                _checkpoint(actor='', phase=phase[0].name, context=context)
 
-            if self._errors and phase[0].policies.error is Policies.Errors.FailPhase:
-                self.log.info('Workflow interrupted due to the FailPhase error policy')
-                return
+                if self._errors and phase[0].policies.error is Policies.Errors.FailPhase:
+                    self.log.info('Workflow interrupted due to the FailPhase error policy')
+                    return
 
-            if needle_phase in (phase[0].__name__.lower(), phase[0].name.lower()):
-                self.log.info('Workflow finished due to the until-phase flag')
-                return
+                if needle_phase in (phase[0].__name__.lower(), phase[0].name.lower()):
+                    self.log.info('Workflow finished due to the until-phase flag')
+                    return
 
-            if phase[0].flags.restart_after_phase:
-                self.log.info('Initiating system reboot due to the restart_after_reboot flag')
-                reboot_system()
-                return
+                if phase[0].flags.restart_after_phase:
+                    self.log.info('Initiating system reboot due to the restart_after_reboot flag')
+                    reboot_system()
+                    return
+        finally:
+            executor.close()
+            if writer:
+                stats = writer.stop()
+                if stats:
+                    self.log.debug('Audit writer stored %d entries in %d transactions within %.2f s with %d errors',
+                                   stats['entries'], stats['transactions'], stats['seconds'], stats['errors'])
+            checkpoint_wal()
 
 
 def get_workflows():
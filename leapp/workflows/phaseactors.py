@@ -18,6 +18,14 @@ class PhaseActors(object):
             for message in actor.consumes:
                 self._messages.setdefault(message.__name__, {'type': message, 'producers': []})
         self._initial = self._consumes - self._produces
+        self._dependencies = {}
+        for actor in self._actors:
+            dependencies = []
+            for message in actor.consumes:
+                for producer in self._messages[message.__name__]['producers']:
+                    if producer is not actor and producer not in dependencies:
+                        dependencies.append(producer)
+            self._dependencies[actor] = tuple(dependencies)
         self._sort()
 
     @property
@@ -36,6 +44,13 @@ class PhaseActors(object):
     def produces(self):
         return tuple(self._produces)
 
+    def dependencies(self, actor):
+        """
+        :param actor: Actor of this stage to get the dependencies for
+        :return: Tuple of actors within this stage producing messages consumed by the given actor
+        """
+        return self._dependencies.get(actor, ())
+
     def _sort(self):
         actors, self._actors = list(self._actors), ()
         while actors:
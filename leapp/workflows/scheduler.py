@@ -0,0 +1,99 @@
+import sys
+import threading
+
+import six
+
+
+class StageScheduler(object):
+    """
+    Executes the actors of a workflow stage concurrently while respecting the producer/consumer relationships
+    between them.
+
+    An actor becomes ready as soon as all actors of the stage producing messages it consumes have finished. Ready
+    actors are started in the order defined by :py:class:`leapp.workflows.phaseactors.PhaseActors` and at most
+    `max_workers` actors are executed at the same time.
+
+    If a last actor is given, the actors ordered after it are started only once it has finished without requesting
+    to stop, just like when the actors are executed one after another.
+    """
+
+    def __init__(self, stage, max_workers, last_actor=None):
+        """
+        :param stage: Stage to execute the actors of
+        :type stage: :py:class:`leapp.workflows.phaseactors.PhaseActors`
+        :param max_workers: Maximum number of actors executed at the same time
+        :type max_workers: int
+        :param last_actor: Actor of the stage after which the execution finishes or None to execute all actors
+        :type last_actor: subclass of :py:class:`leapp.actors.Actor` or None
+        """
+        self._stage = stage
+        self._max_workers = max(1, max_workers)
+        self._condition = threading.Condition()
+        self._pending = list(stage.actors)
+        self._last_actor = last_actor
+        self._held = set(self._pending[self._pending.index(last_actor) + 1:]) if last_actor is not None else set()
+        self._last_stopped = False
+        self._running = set()
+        self._finished = set()
+        self._stopped = False
+        self._failure = None
+
+    def _next_ready(self):
+        released = self._last_actor in self._finished and not self._last_stopped
+        for actor in self._pending:
+            if actor in self._held and not released:
+                continue
+            if all(dependency in self._finished for dependency in self._stage.dependencies(actor)):
+                return actor
+        return None
+
+    def _execute(self, actor, execute):
+        stop = False
+        try:
+            stop = execute(actor)
+        except BaseException:  # noqa
+            # Any failure is passed through to the thread that called run
+            with self._condition:
+                if not self._failure:
+                    self._failure = sys.exc_info()
+        finally:
+            with self._condition:
+                self._running.discard(actor)
+                self._finished.add(actor)
+                if actor == self._last_actor:
+                    # The actors ordered before the last one are still executed, just like when executed in order
+                    self._last_stopped = bool(stop)
+                else:
+                    self._stopped = self._stopped or bool(stop)
+                self._condition.notify_all()
+
+    def run(self, execute):
+        """
+        Executes all actors of the stage.
+
+        Once `execute` requests to stop or raises an exception, no further actors are started. Actors which are
+        already running are waited for before this method returns or re-raises the exception. A stop requested for
+        the last actor is reported only once all actors ordered before it have been executed.
+
+        :param execute: Callable executing the given actor, returning True if no further actors should be started
+        :type execute: callable
+        :return: True if the execution has been stopped by `execute`, otherwise False
+        """
+        with self._condition:
+            while True:
+                while not self._stopped and not self._failure and len(self._running) < self._max_workers:
+                    actor = self._next_ready()
+                    if actor is None:
+                        break
+                    self._pending.remove(actor)
+                    self._running.add(actor)
+                    thread = threading.Thread(target=self._execute, args=(actor, execute))
+                    thread.daemon = True
+                    thread.start()
+                if not self._running:
+                    break
+                self._condition.wait()
+
+        if self._failure:
+            six.reraise(*self._failure)
+        return self._stopped or self._last_stopped
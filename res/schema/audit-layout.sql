@@ -1,41 +1,51 @@
 BEGIN;
 
-PRAGMA user_version = 2;
+PRAGMA user_version = 7;
+
+-- Timestamps are stored as integer microseconds since the epoch (UTC), contexts and hostnames are referenced by the
+-- integer ids of their execution and host rows. The views at the end of this file provide the data in the original
+-- format.
 
 CREATE TABLE IF NOT EXISTS execution (
   id            INTEGER PRIMARY KEY NOT NULL,
   context       VARCHAR(36)         NOT NULL UNIQUE,
-  stamp         TIMESTAMP           NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  stamp         INTEGER             NOT NULL,
   configuration TEXT                         DEFAULT NULL,
   kind          VARCHAR(256)                 DEFAULT NULL
 );
 
 CREATE TABLE IF NOT EXISTS host (
-  id       INTEGER PRIMARY KEY NOT NULL,
-  context  VARCHAR(36)         NOT NULL REFERENCES execution (context),
-  hostname VARCHAR(255)        NOT NULL,
-  UNIQUE (context, hostname)
+  id           INTEGER PRIMARY KEY NOT NULL,
+  execution_id INTEGER             NOT NULL REFERENCES execution (id),
+  hostname     VARCHAR(255)        NOT NULL,
+  UNIQUE (execution_id, hostname)
 );
 
 CREATE TABLE IF NOT EXISTS message_data (
-  hash VARCHAR(64) PRIMARY KEY NOT NULL,
-  data TEXT
+  hash        VARCHAR(64) PRIMARY KEY NOT NULL,
+  data        TEXT,
+  -- Format of data, NULL for uncompressed data
+  compression VARCHAR(16) DEFAULT NULL,
+  -- Codec the payload has been serialized with, see leapp.messaging.codecs
+  codec       VARCHAR(16) NOT NULL DEFAULT 'json',
+  -- Where the payload is stored, NULL for data, 'file' for a file named by the hash, see leapp.utils.audit.payloads
+  storage     VARCHAR(16) DEFAULT NULL
 );
 
 CREATE TABLE IF NOT EXISTS data_source (
-  id      INTEGER PRIMARY KEY NOT NULL,
-  context VARCHAR(36)         NOT NULL REFERENCES execution (context),
-  host_id INTEGER             NOT NULL REFERENCES host (id),
-  actor   VARCHAR(1024)       NOT NULL DEFAULT '',
-  phase   VARCHAR(1024)       NOT NULL DEFAULT '',
-  UNIQUE (context, host_id, actor, phase)
+  id           INTEGER PRIMARY KEY NOT NULL,
+  execution_id INTEGER             NOT NULL REFERENCES execution (id),
+  host_id      INTEGER             NOT NULL REFERENCES host (id),
+  actor        VARCHAR(1024)       NOT NULL DEFAULT '',
+  phase        VARCHAR(1024)       NOT NULL DEFAULT '',
+  UNIQUE (execution_id, host_id, actor, phase)
 );
 
 
 CREATE TABLE IF NOT EXISTS message (
   id                INTEGER PRIMARY KEY NOT NULL,
-  context           VARCHAR(36)         NOT NULL REFERENCES execution (context),
-  stamp             TIMESTAMP           NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  execution_id      INTEGER             NOT NULL REFERENCES execution (id),
+  stamp             INTEGER             NOT NULL,
   topic             VARCHAR(1024)       NOT NULL,
   type              VARCHAR(1024)       NOT NULL,
   data_source_id    INTEGER             NOT NULL REFERENCES data_source (id),
@@ -45,33 +55,76 @@ CREATE TABLE IF NOT EXISTS message (
 
 CREATE TABLE IF NOT EXISTS audit (
   id             INTEGER PRIMARY KEY NOT NULL,
-  event          VARCHAR(256)        NOT NULL REFERENCES execution (context),
-  stamp          TIMESTAMP           NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  context        VARCHAR(36)         NOT NULL,
+  event          VARCHAR(256)        NOT NULL,
+  stamp          INTEGER             NOT NULL,
+  execution_id   INTEGER             NOT NULL REFERENCES execution (id),
   data_source_id INTEGER             NOT NULL REFERENCES data_source (id),
+  level          VARCHAR(16)                  DEFAULT NULL,
 
   message_id     INTEGER                      DEFAULT NULL REFERENCES message (id),
   data           TEXT                         DEFAULT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_execution_kind_stamp ON execution (kind, stamp);
+
+CREATE INDEX IF NOT EXISTS idx_message_execution_type ON message (execution_id, type);
+
+CREATE INDEX IF NOT EXISTS idx_message_stamp ON message (stamp);
+
+CREATE INDEX IF NOT EXISTS idx_audit_execution_event ON audit (execution_id, event);
+
+CREATE INDEX IF NOT EXISTS idx_audit_execution_level ON audit (execution_id, level);
+
+CREATE INDEX IF NOT EXISTS idx_audit_stamp ON audit (stamp);
+
 CREATE VIEW IF NOT EXISTS messages_data AS
   SELECT
-    message.id        AS id,
-    message.context   AS context,
-    message.stamp     AS stamp,
-    message.topic     AS topic,
-    message.type      AS type,
-    data_source.actor AS actor,
-    data_source.phase AS phase,
-    msg_data.hash     AS message_hash,
-    msg_data.data     AS message_data,
-    host.hostname     AS hostname
+    message.id           AS id,
+    execution.context    AS context,
+    strftime('%Y-%m-%dT%H:%M:%S', message.stamp / 1000000, 'unixepoch') || '.' ||
+      substr('000000' || (message.stamp % 1000000), -6) || 'Z'
+                         AS stamp,
+    message.topic        AS topic,
+    message.type         AS type,
+    data_source.actor    AS actor,
+    data_source.phase    AS phase,
+    msg_data.hash        AS message_hash,
+    msg_data.data        AS message_data,
+    msg_data.compression AS message_compression,
+    msg_data.codec       AS message_codec,
+    msg_data.storage     AS message_storage,
+    host.hostname        AS hostname,
+    message.execution_id AS execution_id
   FROM
     message
   JOIN
+    execution                ON execution.id              = message.execution_id,
     data_source              ON data_source.id            = message.data_source_id,
     message_data AS msg_data ON message.message_data_hash = msg_data.hash,
     host                     ON host.id                   = data_source.host_id
 ;
 
+CREATE VIEW IF NOT EXISTS audit_data AS
+  SELECT
+    audit.id             AS id,
+    audit.event          AS event,
+    strftime('%Y-%m-%dT%H:%M:%S', audit.stamp / 1000000, 'unixepoch') || '.' ||
+      substr('000000' || (audit.stamp % 1000000), -6) || 'Z'
+                         AS stamp,
+    execution.context    AS context,
+    data_source.actor    AS actor,
+    data_source.phase    AS phase,
+    host.hostname        AS hostname,
+    audit.level          AS level,
+    audit.message_id     AS message_id,
+    audit.data           AS data,
+    audit.execution_id   AS execution_id
+  FROM
+    audit
+  JOIN
+    execution   ON execution.id   = audit.execution_id,
+    data_source ON data_source.id = audit.data_source_id,
+    host        ON host.id        = data_source.host_id
+;
+
 COMMIT;
\ No newline at end of file
@@ -0,0 +1,11 @@
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_execution_kind_stamp ON execution (kind, stamp);
+
+CREATE INDEX IF NOT EXISTS idx_message_context_type ON message (context, type);
+
+CREATE INDEX IF NOT EXISTS idx_audit_context_event ON audit (context, event);
+
+PRAGMA user_version = 3;
+
+COMMIT;
\ No newline at end of file
@@ -0,0 +1,207 @@
+BEGIN;
+
+-- Moves to integer execution ids and timestamps in microseconds since the epoch and to a separate log level column
+
+-- Every context referenced by an entry has to have an execution
+INSERT OR IGNORE INTO execution (context)
+  SELECT context FROM host
+  UNION SELECT context FROM data_source
+  UNION SELECT context FROM message
+  UNION SELECT context FROM audit;
+
+DROP VIEW IF EXISTS messages_data;
+DROP INDEX IF EXISTS idx_execution_kind_stamp;
+DROP INDEX IF EXISTS idx_message_context_type;
+DROP INDEX IF EXISTS idx_audit_context_event;
+
+ALTER TABLE execution
+  RENAME TO execution_3;
+ALTER TABLE host
+  RENAME TO host_3;
+ALTER TABLE data_source
+  RENAME TO data_source_3;
+ALTER TABLE message
+  RENAME TO message_3;
+ALTER TABLE audit
+  RENAME TO audit_3;
+
+CREATE TABLE execution (
+  id            INTEGER PRIMARY KEY NOT NULL,
+  context       VARCHAR(36)         NOT NULL UNIQUE,
+  stamp         INTEGER             NOT NULL,
+  configuration TEXT                         DEFAULT NULL,
+  kind          VARCHAR(256)                 DEFAULT NULL
+);
+
+CREATE TABLE host (
+  id           INTEGER PRIMARY KEY NOT NULL,
+  execution_id INTEGER             NOT NULL REFERENCES execution (id),
+  hostname     VARCHAR(255)        NOT NULL,
+  UNIQUE (execution_id, hostname)
+);
+
+CREATE TABLE data_source (
+  id           INTEGER PRIMARY KEY NOT NULL,
+  execution_id INTEGER             NOT NULL REFERENCES execution (id),
+  host_id      INTEGER             NOT NULL REFERENCES host (id),
+  actor        VARCHAR(1024)       NOT NULL DEFAULT '',
+  phase        VARCHAR(1024)       NOT NULL DEFAULT '',
+  UNIQUE (execution_id, host_id, actor, phase)
+);
+
+
+CREATE TABLE message (
+  id                INTEGER PRIMARY KEY NOT NULL,
+  execution_id      INTEGER             NOT NULL REFERENCES execution (id),
+  stamp             INTEGER             NOT NULL,
+  topic             VARCHAR(1024)       NOT NULL,
+  type              VARCHAR(1024)       NOT NULL,
+  data_source_id    INTEGER             NOT NULL REFERENCES data_source (id),
+  message_data_hash VARCHAR(64)         NOT NULL REFERENCES message_data (hash)
+);
+
+
+CREATE TABLE audit (
+  id             INTEGER PRIMARY KEY NOT NULL,
+  event          VARCHAR(256)        NOT NULL,
+  stamp          INTEGER             NOT NULL,
+  execution_id   INTEGER             NOT NULL REFERENCES execution (id),
+  data_source_id INTEGER             NOT NULL REFERENCES data_source (id),
+  level          VARCHAR(16)                  DEFAULT NULL,
+
+  message_id     INTEGER                      DEFAULT NULL REFERENCES message (id),
+  data           TEXT                         DEFAULT NULL
+);
+
+CREATE INDEX idx_execution_kind_stamp ON execution (kind, stamp);
+
+CREATE INDEX idx_message_execution_type ON message (execution_id, type);
+
+CREATE INDEX idx_message_stamp ON message (stamp);
+
+CREATE INDEX idx_audit_execution_event ON audit (execution_id, event);
+
+CREATE INDEX idx_audit_execution_level ON audit (execution_id, level);
+
+CREATE INDEX idx_audit_stamp ON audit (stamp);
+
+CREATE VIEW messages_data AS
+  SELECT
+    message.id           AS id,
+    execution.context    AS context,
+    strftime('%Y-%m-%dT%H:%M:%S', message.stamp / 1000000, 'unixepoch') || '.' ||
+      substr('000000' || (message.stamp % 1000000), -6) || 'Z'
+                         AS stamp,
+    message.topic        AS topic,
+    message.type         AS type,
+    data_source.actor    AS actor,
+    data_source.phase    AS phase,
+    msg_data.hash        AS message_hash,
+    msg_data.data        AS message_data,
+    host.hostname        AS hostname,
+    message.execution_id AS execution_id
+  FROM
+    message
+  JOIN
+    execution                ON execution.id              = message.execution_id,
+    data_source              ON data_source.id            = message.data_source_id,
+    message_data AS msg_data ON message.message_data_hash = msg_data.hash,
+    host                     ON host.id                   = data_source.host_id
+;
+
+CREATE VIEW audit_data AS
+  SELECT
+    audit.id             AS id,
+    audit.event          AS event,
+    strftime('%Y-%m-%dT%H:%M:%S', audit.stamp / 1000000, 'unixepoch') || '.' ||
+      substr('000000' || (audit.stamp % 1000000), -6) || 'Z'
+                         AS stamp,
+    execution.context    AS context,
+    data_source.actor    AS actor,
+    data_source.phase    AS phase,
+    host.hostname        AS hostname,
+    audit.level          AS level,
+    audit.message_id     AS message_id,
+    audit.data           AS data,
+    audit.execution_id   AS execution_id
+  FROM
+    audit
+  JOIN
+    execution   ON execution.id   = audit.execution_id,
+    data_source ON data_source.id = audit.data_source_id,
+    host        ON host.id        = data_source.host_id
+;
+
+INSERT INTO execution (id, context, stamp, configuration, kind)
+  SELECT
+    id,
+    context,
+    COALESCE(CAST(strftime('%s', execution_3.stamp) AS INTEGER) * 1000000 +
+      CASE WHEN substr(execution_3.stamp, 20, 1) = '.'
+        THEN CAST(substr(rtrim(substr(execution_3.stamp, 21), 'Z') || '000000', 1, 6) AS INTEGER)
+        ELSE 0 END, 0),
+    configuration,
+    kind
+  FROM execution_3;
+
+INSERT INTO host (id, execution_id, hostname)
+  SELECT
+    host_3.id,
+    execution.id,
+    host_3.hostname
+  FROM host_3
+  JOIN execution ON execution.context = host_3.context;
+
+INSERT INTO data_source (id, execution_id, host_id, actor, phase)
+  SELECT
+    data_source_3.id,
+    execution.id,
+    data_source_3.host_id,
+    data_source_3.actor,
+    data_source_3.phase
+  FROM data_source_3
+  JOIN execution ON execution.context = data_source_3.context;
+
+INSERT INTO message (id, execution_id, stamp, topic, type, data_source_id, message_data_hash)
+  SELECT
+    message_3.id,
+    execution.id,
+    COALESCE(CAST(strftime('%s', message_3.stamp) AS INTEGER) * 1000000 +
+      CASE WHEN substr(message_3.stamp, 20, 1) = '.'
+        THEN CAST(substr(rtrim(substr(message_3.stamp, 21), 'Z') || '000000', 1, 6) AS INTEGER)
+        ELSE 0 END, 0),
+    message_3.topic,
+    message_3.type,
+    message_3.data_source_id,
+    message_3.message_data_hash
+  FROM message_3
+  JOIN execution ON execution.context = message_3.context;
+
+INSERT INTO audit (id, event, stamp, execution_id, data_source_id, level, message_id, data)
+  SELECT
+    audit_3.id,
+    audit_3.event,
+    COALESCE(CAST(strftime('%s', audit_3.stamp) AS INTEGER) * 1000000 +
+      CASE WHEN substr(audit_3.stamp, 20, 1) = '.'
+        THEN CAST(substr(rtrim(substr(audit_3.stamp, 21), 'Z') || '000000', 1, 6) AS INTEGER)
+        ELSE 0 END, 0),
+    execution.id,
+    audit_3.data_source_id,
+    CASE WHEN audit_3.event = 'log-message' AND instr(audit_3.data, '"level": "') > 0
+      THEN substr(audit_3.data, instr(audit_3.data, '"level": "') + 10,
+                  instr(substr(audit_3.data, instr(audit_3.data, '"level": "') + 10), '"') - 1)
+      END,
+    audit_3.message_id,
+    audit_3.data
+  FROM audit_3
+  JOIN execution ON execution.context = audit_3.context;
+
+DROP TABLE audit_3;
+DROP TABLE message_3;
+DROP TABLE data_source_3;
+DROP TABLE host_3;
+DROP TABLE execution_3;
+
+PRAGMA user_version = 4;
+
+COMMIT;
\ No newline at end of file
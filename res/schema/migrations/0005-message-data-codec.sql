@@ -0,0 +1,38 @@
+BEGIN;
+
+-- Message payloads can be serialized by different codecs, the codec column names the codec of the data column
+
+ALTER TABLE message_data
+  ADD COLUMN codec VARCHAR(16) NOT NULL DEFAULT 'json';
+
+DROP VIEW IF EXISTS messages_data;
+
+CREATE VIEW messages_data AS
+  SELECT
+    message.id           AS id,
+    execution.context    AS context,
+    strftime('%Y-%m-%dT%H:%M:%S', message.stamp / 1000000, 'unixepoch') || '.' ||
+      substr('000000' || (message.stamp % 1000000), -6) || 'Z'
+                         AS stamp,
+    message.topic        AS topic,
+    message.type         AS type,
+    data_source.actor    AS actor,
+    data_source.phase    AS phase,
+    msg_data.hash        AS message_hash,
+    msg_data.data        AS message_data,
+    msg_data.compression AS message_compression,
+    msg_data.codec       AS message_codec,
+    host.hostname        AS hostname,
+    message.execution_id AS execution_id
+  FROM
+    message
+  JOIN
+    execution                ON execution.id              = message.execution_id,
+    data_source              ON data_source.id            = message.data_source_id,
+    message_data AS msg_data ON message.message_data_hash = msg_data.hash,
+    host                     ON host.id                   = data_source.host_id
+;
+
+PRAGMA user_version = 6;
+
+COMMIT;
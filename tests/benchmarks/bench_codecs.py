@@ -0,0 +1,55 @@
+"""
+Compares the message codecs by the time to serialize and deserialize representative models and by the size of their
+payloads.
+
+Encoding includes dumping the model and hashing the payload and decoding includes creating the model from the decoded
+data, like producing and consuming messages does, the time of the codec alone is reported separately.
+
+Usage: python tests/benchmarks/bench_codecs.py [--packages N] [--files N] [--repeat N] [--codecs C ...]
+"""
+from __future__ import print_function
+
+import argparse
+import zlib
+
+from common import create_files, create_packages, measure
+from leapp.messaging.codecs import get_codec
+
+
+def _models(packages, files):
+    return (
+        ('packages', create_packages(packages)),
+        ('files', create_files(files)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--packages', type=int, default=2000, help='Number of packages in the package list model')
+    parser.add_argument('--files', type=int, default=20000, help='Number of files in the file list model')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of times every operation is executed')
+    parser.add_argument('--codecs', nargs='+', default=('json', 'binary'), help='Codecs to compare')
+    args = parser.parse_args()
+
+    print('{:<10} {:<8} {:>10} {:>10} {:>10} {:>10} {:>14} {:>12}'.format(
+        'model', 'codec', 'encode ms', 'codec ms', 'decode ms', 'codec ms', 'payload bytes', 'zlib bytes'))
+    for name, model in _models(args.packages, args.files):
+        for codec in [get_codec(codec) for codec in args.codecs]:
+            def encode():
+                payload = codec.encode(model.dump())
+                return payload, codec.digest(payload)
+
+            data = model.dump()
+            encode_ms, (payload, _) = measure(encode, args.repeat)
+            encode_codec_ms, _ = measure(lambda: codec.encode(data), args.repeat)
+            decode_ms, decoded = measure(lambda: type(model).create(codec.decode(payload)), args.repeat)
+            decode_codec_ms, _ = measure(lambda: codec.decode(payload), args.repeat)
+            assert decoded == model
+            raw = payload.encode('utf-8') if not isinstance(payload, bytes) else payload
+            print('{:<10} {:<8} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f} {:>14} {:>12}'.format(
+                name, codec.name, encode_ms, encode_codec_ms, decode_ms, decode_codec_ms, len(raw),
+                len(zlib.compress(raw, 6))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Compares the storage profiles of the audit database by the throughput of actors concurrently producing and consuming
+messages.
+
+Every producer stores messages one by one, like actors do, while every consumer repeatedly loads all messages of the
+execution. The benchmark is executed on a temporary database for every profile.
+
+Usage: python tests/benchmarks/bench_database.py [--producers N] [--consumers N] [--messages N] [--profiles P ...]
+"""
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from leapp.config import get_config
+from leapp.utils.audit import Audit, Execution, Message, MessageData, get_messages
+
+_CONTEXT = 'database-benchmark'
+_HOSTNAME = 'benchmark.example.com'
+
+
+def _configure(path, profile):
+    get_config().set('database', 'path', path)
+    get_config().set('database', 'profile', profile)
+
+
+def _produce(path, profile, index, count, start, results):
+    _configure(path, profile)
+    start.wait()
+    started = time.time()
+    for number in range(count):
+        data = json.dumps({'producer': index, 'number': number, 'payload': 'x' * 512}, sort_keys=True)
+        audit = Audit(event='new-message', actor='producer_{}'.format(index), phase='benchmark', hostname=_HOSTNAME,
+                      context=_CONTEXT)
+        audit.message = Message(msg_type='BenchmarkModel', topic='benchmark', actor=audit.actor, phase='benchmark',
+                                hostname=_HOSTNAME, context=_CONTEXT,
+                                data=MessageData(data=data, hash_id=hashlib.sha256(data.encode('utf-8')).hexdigest()))
+        audit.store()
+    results.put(('produced', count, time.time() - started))
+
+
+def _consume(path, profile, start, producing, results):
+    _configure(path, profile)
+    start.wait()
+    started = time.time()
+    loads = loaded = 0
+    while producing.value:
+        loaded += len(get_messages(('BenchmarkModel',), _CONTEXT))
+        loads += 1
+    results.put(('consumed', loads, loaded, time.time() - started))
+
+
+def _benchmark(profile, producers, consumers, messages):
+    directory = tempfile.mkdtemp(prefix='leapp-benchmark-')
+    path = os.path.join(directory, 'leapp.db')
+    try:
+        _configure(path, profile)
+        Execution(context=_CONTEXT, kind='benchmark', configuration='').store()
+        start = multiprocessing.Event()
+        producing = multiprocessing.Value('i', 1)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_produce, args=(path, profile, index, messages, start, results))
+                     for index in range(producers)]
+        readers = [multiprocessing.Process(target=_consume, args=(path, profile, start, producing, results))
+                   for _ in range(consumers)]
+        for process in processes + readers:
+            process.start()
+        started = time.time()
+        start.set()
+        produced = [results.get() for _ in processes]
+        elapsed = time.time() - started
+        producing.value = 0
+        consumed = [results.get() for _ in readers]
+        for process in processes + readers:
+            process.join()
+        print('{profile:<10} {throughput:>14.0f} {latency:>14.2f} {loads:>12.1f} {rows:>14.0f}'.format(
+            profile=profile,
+            throughput=sum(count for _, count, _ in produced) / elapsed,
+            latency=max(seconds / count for _, count, seconds in produced) * 1000,
+            loads=sum(loads / seconds for _, loads, _, seconds in consumed),
+            rows=sum(rows / seconds for _, _, rows, seconds in consumed)))
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--producers', type=int, default=4, help='Number of concurrently producing actors')
+    parser.add_argument('--consumers', type=int, default=2, help='Number of concurrently consuming actors')
+    parser.add_argument('--messages', type=int, default=500, help='Number of messages stored by every producer')
+    parser.add_argument('--profiles', nargs='+', default=('default', 'wal'), help='Storage profiles to compare')
+    args = parser.parse_args()
+
+    print('{:<10} {:>14} {:>14} {:>12} {:>14}'.format(
+        'profile', 'stored msg/s', 'max store ms', 'loads/s', 'loaded msg/s'))
+    for profile in args.profiles:
+        _benchmark(profile, args.producers, args.consumers, args.messages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Compares the actor executors by the time it takes from dispatching an actor until its process method is executed and
+by the memory used by every actor process.
+
+A temporary repository with a common library holding a large amount of data is generated for the benchmark.
+
+Usage: python tests/benchmarks/bench_executors.py [--runs N] [--actors N] [--library-size N]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from leapp.executors.pool import PoolExecutor
+from leapp.executors.process import ProcessExecutor
+from leapp.executors.zygote import ZygoteExecutor
+from leapp.repository.scan import scan_repo
+
+_TAG = '''
+from leapp.tags import Tag
+
+
+class BenchmarkTag(Tag):
+    name = 'benchmark'
+'''
+
+_LIBRARY = '''
+import decimal
+import difflib
+import email.mime.multipart
+import tarfile
+import xml.dom.minidom
+import zipfile
+
+TABLE = dict((i, ('entry-%d' % i, [i, i * 2, i * 3])) for i in range({size}))
+'''
+
+_ACTOR = '''
+import json
+import os
+import time
+
+from leapp.actors import Actor
+from leapp.libraries.common import benchlib
+from leapp.tags import BenchmarkTag
+
+
+def _memory():
+    result = {{}}
+    for path, keys in (('/proc/self/status', ('VmRSS',)),
+                       ('/proc/self/smaps_rollup', ('Private_Clean', 'Private_Dirty'))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    if key in keys:
+                        result[key] = int(value.split()[0])
+        except (IOError, OSError):
+            pass
+    return result
+
+
+class BenchmarkActor{index}(Actor):
+    name = 'benchmark_actor_{index}'
+    description = 'Records the time it has been started at.'
+    consumes = ()
+    produces = ()
+    tags = (BenchmarkTag,)
+
+    def process(self):
+        started = time.time()
+        memory = _memory()
+        with open(os.environ['LEAPP_BENCHMARK_OUTPUT'], 'a') as f:
+            f.write(json.dumps({{
+                'started': started,
+                'rss': memory.get('VmRSS', 0),
+                'private': memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0),
+                'entries': len(benchlib.TABLE)}}) + '\\n')
+'''
+
+
+def _write(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def _create_repository(path, actors, library_size):
+    _write(os.path.join(path, '.leapp', 'info'), json.dumps({'name': 'executor-benchmark',
+                                                             'id': 'e6f3b5fa-4dc4-4b7e-9c3c-5c4d0b7cbf10'}))
+    _write(os.path.join(path, 'tags', 'benchmark.py'), _TAG)
+    _write(os.path.join(path, 'libraries', 'benchlib.py'), _LIBRARY.format(size=library_size))
+    for index in range(actors):
+        _write(os.path.join(path, 'actors', 'benchmarkactor{}'.format(index), 'actor.py'), _ACTOR.format(index=index))
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def _benchmark(name, create_executor, definitions, runs, output):
+    setup_start = time.time()
+    executor = create_executor()
+    setup = time.time() - setup_start
+    records = []
+    try:
+        for _ in range(runs):
+            for definition in definitions:
+                dispatched = time.time()
+                definition(executor=executor).run()
+                with open(output) as f:
+                    record = json.loads(f.readlines()[-1])
+                records.append((record['started'] - dispatched, record['rss'], record['private']))
+    finally:
+        executor.close()
+    print('{name:<10} {setup:>10.1f} {median:>12.2f} {maximum:>12.2f} {rss:>10d} {private:>12d}'.format(
+        name=name, setup=setup * 1000,
+        median=_median([latency for latency, _, _ in records]) * 1000,
+        maximum=max(latency for latency, _, _ in records) * 1000,
+        rss=int(_median([rss for _, rss, _ in records])),
+        private=int(_median([private for _, _, private in records]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Number of times every actor is executed')
+    parser.add_argument('--actors', type=int, default=10, help='Number of actors in the repository')
+    parser.add_argument('--library-size', type=int, default=200000, help='Number of entries in the common library')
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='leapp-benchmark-')
+    try:
+        _create_repository(path, actors=args.actors, library_size=args.library_size)
+        repository = scan_repo(path)
+        repository.load(resolve=True)
+        definitions = sorted(repository.actors, key=lambda definition: definition.directory)
+        os.environ['LEAPP_BENCHMARK_OUTPUT'] = os.path.join(path, 'output')
+
+        print('{:<10} {:>10} {:>12} {:>12} {:>10} {:>12}'.format(
+            'executor', 'setup ms', 'median ms', 'max ms', 'rss kB', 'private kB'))
+        _benchmark('process', ProcessExecutor, definitions, args.runs, os.environ['LEAPP_BENCHMARK_OUTPUT'])
+        _benchmark('pool', PoolExecutor, definitions, args.runs, os.environ['LEAPP_BENCHMARK_OUTPUT'])
+        _benchmark('zygote', lambda: ZygoteExecutor(definitions=definitions), definitions, args.runs,
+                   os.environ['LEAPP_BENCHMARK_OUTPUT'])
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares the memory used by large lists of models and the time to create them, access their fields and dump them for
+models storing their fields in a dictionary per instance and for compact models storing them in slots.
+
+The memory is measured with tracemalloc and requires Python 3.
+
+Usage: python tests/benchmarks/bench_model_memory.py [--count N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import tracemalloc
+
+from common import BenchmarkPackage, BenchmarkTopic, compact_model, create_package, measure
+from leapp.models import Model, fields
+
+
+class BenchmarkFile(Model):
+    topic = BenchmarkTopic
+    path = fields.String()
+    size = fields.Integer()
+
+
+# Compact models use the data of the model listed before them, the nested dependencies of packages are not compact and
+# therefore left out
+_MODELS = (
+    ('package', BenchmarkPackage, lambda index: create_package(index, dependencies=False).dump()),
+    ('package*', compact_model(BenchmarkPackage), None),
+    ('file', BenchmarkFile, lambda index: {'path': '/usr/share/doc/file-{}'.format(index), 'size': index}),
+    ('file*', compact_model(BenchmarkFile), None),
+)
+
+
+def _allocated(create):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = create()
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--count', type=int, default=100000, help='Number of models in the list')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of times every operation is executed')
+    args = parser.parse_args()
+
+    print('{:<10} {:>8} {:>12} {:>14} {:>10} {:>10} {:>10}'.format(
+        'model', 'compact', 'bytes total', 'bytes / model', 'create ms', 'access ms', 'dump ms'))
+    make_data = None
+    for name, model, data_factory in _MODELS:
+        make_data = data_factory or make_data
+        data = [make_data(index) for index in range(args.count)]
+        # The memory of the payload data is shared by both kinds of models and not accounted
+        size, models = _allocated(lambda: [model.create(entry) for entry in data])
+        create_ms, _ = measure(lambda: [model.create(entry) for entry in data], args.repeat)
+        field_names = list(model.fields)
+        access_ms, _ = measure(lambda: [getattr(entry, field) for entry in models for field in field_names],
+                               args.repeat)
+        dump_ms, _ = measure(lambda: [entry.dump() for entry in models], args.repeat)
+        print('{:<10} {:>8} {:>12} {:>14.1f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            name, str(model.compact), size, float(size) / args.count, create_ms, access_ms, dump_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares dumping models and creating them from builtin data with the compiled plans of the models against the
+conversion by the methods of their fields.
+
+The generic conversion is measured by disabling the plans of the benchmarked models, both conversions have to give
+the same results. Creating models from trusted data, which is not validated, is reported separately.
+
+Usage: python tests/benchmarks/bench_models.py [--packages N] [--files N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+
+from common import BenchmarkDependency, BenchmarkFiles, BenchmarkPackage, BenchmarkPackages, create_files, \
+    create_packages, measure
+
+_MODELS = (BenchmarkDependency, BenchmarkPackage, BenchmarkPackages, BenchmarkFiles)
+
+
+def _models(packages, files):
+    return (
+        ('nested', create_packages(packages)),
+        ('lists', create_files(files)),
+    )
+
+
+def _set_compiled(enabled):
+    for model in _MODELS:
+        # An empty plan makes the models convert their fields by the methods of the fields
+        model._plan = None if enabled else ()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--packages', type=int, default=2000, help='Number of packages in the nested model')
+    parser.add_argument('--files', type=int, default=20000, help='Number of files in the list model')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of times every operation is executed')
+    args = parser.parse_args()
+
+    print('{:<8} {:>12} {:>12} {:>8} {:>12} {:>12} {:>8} {:>12} {:>8}'.format(
+        'model', 'dump ms', 'compiled ms', 'speedup', 'create ms', 'compiled ms', 'speedup', 'trusted ms', 'speedup'))
+    for name, model in _models(args.packages, args.files):
+        results = {}
+        for compiled in (False, True):
+            _set_compiled(compiled)
+            dump_ms, data = measure(model.dump, args.repeat)
+            create_ms, created = measure(lambda: type(model).create(data), args.repeat)
+            results[compiled] = dump_ms, create_ms, data, created
+        _set_compiled(True)
+        trusted_ms, trusted = measure(lambda: type(model).create(results[True][2], trusted=True), args.repeat)
+        assert results[False][2] == results[True][2]
+        assert results[False][3] == results[True][3] == trusted == model
+        print('{:<8} {:>12.2f} {:>12.2f} {:>7.1f}x {:>12.2f} {:>12.2f} {:>7.1f}x {:>12.2f} {:>7.1f}x'.format(
+            name, results[False][0], results[True][0], results[False][0] / results[True][0],
+            results[False][1], results[True][1], results[False][1] / results[True][1],
+            trusted_ms, results[False][1] / trusted_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures the queries of the audit database against a database holding many executions, with and without the query
+indexes of the audit schema.
+
+Usage: python tests/benchmarks/bench_queries.py [--executions N] [--messages N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from leapp.config import get_config
+from leapp.utils.audit import create_connection, get_checkpoints, get_messages
+
+_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_execution_kind_stamp ON execution (kind, stamp)',
+    'CREATE INDEX IF NOT EXISTS idx_message_execution_type ON message (execution_id, type)',
+    'CREATE INDEX IF NOT EXISTS idx_audit_execution_event ON audit (execution_id, event)',
+    'CREATE INDEX IF NOT EXISTS idx_audit_execution_level ON audit (execution_id, level)',
+)
+_TYPES = ('ModelA', 'ModelB', 'ModelC', 'ModelD', 'ModelE')
+
+
+def _populate(db, executions, messages):
+    contexts = [str(uuid.uuid4()) for _ in range(executions)]
+    with db:
+        db.executemany('INSERT INTO execution (id, context, stamp, kind, configuration) VALUES (?, ?, ?, ?, ?)',
+                       [(index, context, 1546300800000000 + index * 1000, ('upgrade', 'snactor-run')[index % 2], '')
+                        for index, context in enumerate(contexts)])
+        db.execute("INSERT INTO message_data (hash, data) VALUES ('benchmark', '{}')")
+        for index in range(len(contexts)):
+            stamp = 1546300800000000 + index * 1000
+            db.execute('INSERT INTO host (id, execution_id, hostname) VALUES (?, ?, ?)', (index, index, 'benchmark'))
+            db.execute('INSERT INTO data_source (id, execution_id, host_id, actor, phase) VALUES (?, ?, ?, ?, ?)',
+                       (index, index, index, 'actor', 'phase'))
+            db.executemany('INSERT INTO message (execution_id, stamp, topic, type, data_source_id, message_data_hash) '
+                           "VALUES (?, ?, 'topic', ?, ?, 'benchmark')",
+                           [(index, stamp, _TYPES[number % len(_TYPES)], index) for number in range(messages)])
+            db.executemany('INSERT INTO audit (event, stamp, execution_id, data_source_id) VALUES (?, ?, ?, ?)',
+                           [(('checkpoint', 'log-message', 'new-message')[number % 3], stamp, index, index)
+                            for number in range(messages)])
+    return contexts
+
+
+def _measure(query, repeat):
+    started = time.time()
+    for _ in range(repeat):
+        query()
+    return (time.time() - started) / repeat * 1000
+
+
+def _run(db, contexts, repeat):
+    context = contexts[len(contexts) // 2]
+    return (
+        _measure(lambda: get_messages(_TYPES[:2], context), repeat),
+        _measure(lambda: get_checkpoints(context), repeat),
+        _measure(lambda: db.execute("SELECT context, stamp FROM execution WHERE kind = 'upgrade' "
+                                    "ORDER BY stamp DESC LIMIT 1").fetchone(), repeat),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--executions', type=int, default=2000, help='Number of executions in the database')
+    parser.add_argument('--messages', type=int, default=100, help='Number of messages and audit entries per execution')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of times every query is executed')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='leapp-benchmark-')
+    try:
+        path = os.path.join(directory, 'leapp.db')
+        get_config().set('database', 'path', path)
+        db = create_connection(path)
+        contexts = _populate(db, args.executions, args.messages)
+
+        print('{:<10} {:>18} {:>18} {:>18}'.format(
+            'indexes', 'get_messages ms', 'get_checkpoints ms', 'last context ms'))
+        for name in ('without', 'with'):
+            with db:
+                for statement in _INDEXES:
+                    if name == 'with':
+                        db.execute(statement)
+                    else:
+                        db.execute('DROP INDEX IF EXISTS ' + statement.split()[5])
+            db.execute('ANALYZE')
+            print('{:<10} {:>18.3f} {:>18.3f} {:>18.3f}'.format(name, *_run(db, contexts, args.repeat)))
+        db.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Models and helpers shared by the benchmarks, which import this module from the directory of their script.
+"""
+import copy
+import datetime
+import time
+
+from leapp.models import Model, fields
+from leapp.topics import Topic
+
+
+class BenchmarkTopic(Topic):
+    name = 'benchmark_topic'
+
+
+class BenchmarkDependency(Model):
+    topic = BenchmarkTopic
+    name = fields.String()
+    flags = fields.StringEnum(choices=['EQ', 'GE', 'LE'], allow_null=True, default=None)
+    version = fields.String(allow_null=True, default=None)
+
+
+class BenchmarkPackage(Model):
+    topic = BenchmarkTopic
+    name = fields.String()
+    epoch = fields.String()
+    version = fields.String()
+    release = fields.String()
+    arch = fields.String()
+    packager = fields.String()
+    installed = fields.DateTime()
+    size = fields.Number()
+    signed = fields.Boolean(default=True)
+    requires = fields.List(fields.Model(BenchmarkDependency), default=[])
+
+
+class BenchmarkPackages(Model):
+    topic = BenchmarkTopic
+    items = fields.List(fields.Model(BenchmarkPackage), default=[])
+
+
+class BenchmarkFiles(Model):
+    topic = BenchmarkTopic
+    paths = fields.List(fields.String(), default=[])
+    sizes = fields.List(fields.Integer(), default=[])
+    modes = fields.List(fields.IntegerEnum(choices=[0o644, 0o755]), default=[])
+
+
+def create_package(index, dependencies=True):
+    """
+    Returns a package model, every fourth package has no dependencies and the others up to three.
+    """
+    return BenchmarkPackage(
+        name='package-{}'.format(index), epoch='0', version='1.{}'.format(index % 50),
+        release='{}.el7'.format(index % 7), arch=('x86_64', 'noarch')[index % 2],
+        packager='Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>', installed=datetime.datetime(2018, 6, 1, 12, 30),
+        size=index * 1024.5, requires=[
+            BenchmarkDependency(name='package-{}'.format(dependency), flags='GE', version='1.0')
+            for dependency in range(index % 4 if dependencies else 0)])
+
+
+def create_packages(count):
+    return BenchmarkPackages(items=[create_package(index) for index in range(count)])
+
+
+def create_files(count):
+    return BenchmarkFiles(paths=['/usr/share/doc/package-{}/file-{}'.format(index % 100, index)
+                                 for index in range(count)],
+                          sizes=[index * 37 % 65536 for index in range(count)],
+                          modes=[(0o644, 0o755)[index % 2] for index in range(count)])
+
+
+def compact_model(model):
+    """
+    Returns a compact model with the fields of the given model, see :py:attr:`leapp.models.Model.compact`.
+    """
+    attrs = copy.deepcopy(model.fields)
+    attrs.update(topic=model.topic, compact=True)
+    return type(model.__name__.replace('Benchmark', 'BenchmarkCompact', 1), (Model,), attrs)
+
+
+def measure(function, repeat):
+    """
+    Calls the function repeatedly.
+
+    :return: Average duration of a call in milliseconds and the result of the last call
+    """
+    started = time.time()
+    for _ in range(repeat):
+        result = function()
+    return (time.time() - started) / repeat * 1000, result
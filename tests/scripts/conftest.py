@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+from leapp.repository.scan import scan_repo
+
+
+@pytest.fixture(scope='session')
+def repository():
+    # The modules of a repository can be registered only once, all tests therefore share the loaded repository
+    repo = scan_repo(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'workflow-tests'))
+    repo.load(resolve=True)
+    return repo
@@ -1,10 +1,21 @@
+import hashlib
 import json
+import multiprocessing
 import os
 import sqlite3
+import threading
+import time
 
-from leapp.utils.audit import get_connection, Execution, Host, MessageData, \
-    DataSource, Message, Audit, get_messages, checkpoint, get_checkpoints
+import pytest
+
+from leapp.utils.audit import get_connection, create_connection, Execution, Host, MessageData, \
+    DataSource, Message, Audit, get_messages, checkpoint, get_checkpoints, clear_id_cache, store_audit_entries, \
+    TESTING_CONTEXT
 from leapp.config import get_config
+from leapp.messaging.codecs import decode_payload
+from leapp.utils.audit.payloads import PayloadFile
+from leapp.exceptions import LeappRuntimeError
+from leapp.utils.schemas import MIGRATIONS
 
 _HOSTNAME = 'test-host.example.com'
 _CONTEXT_NAME = 'test-context-name'
@@ -12,6 +23,7 @@ _ACTOR_NAME = 'test-actor-name'
 _PHASE_NAME = 'test-phase-name'
 _MESSAGE_TYPE = 'MessageType'
 _TOPIC_NAME = 'test-topic'
+_CURRENT_VERSION = 7
 
 _ORIGINAL_DB_SCHEMA = '''
 CREATE TABLE execution (
@@ -92,7 +104,11 @@ def setup_module(m):
     get_config().set('database', 'path', '/tmp/leapp-test.db')
 
 
-def setup():
+def _store_execution():
+    Execution(context=_CONTEXT_NAME, kind='test-kind', configuration='').store()
+
+
+def setup_function(f):
     path = get_config().get('database', 'path')
     if os.path.isfile(path):
         os.unlink(path)
@@ -105,7 +121,42 @@ def test_migrations_are_applied():
     con.close()
 
     with get_connection(None) as db:
-        assert db.execute("PRAGMA user_version").fetchone()[0] > 0
+        assert db.execute("PRAGMA user_version").fetchone()[0] == _CURRENT_VERSION
+        _assert_query_indexes(db)
+
+
+def _assert_query_indexes(db):
+    indexes = [row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert set(indexes).issuperset(('idx_execution_kind_stamp', 'idx_message_execution_type',
+                                    'idx_audit_execution_event', 'idx_audit_execution_level'))
+    for query, parameters, index in (
+            ('SELECT * FROM messages_data WHERE context = ? AND type IN (?, ?)', ('a', 'b', 'c'),
+             'idx_message_execution_type'),
+            ('SELECT * FROM audit_data WHERE context = ? AND event = ?', ('a', 'b'), 'idx_audit_execution_event'),
+            ('SELECT * FROM audit_data WHERE context = ? AND level = ?', ('a', 'b'), 'idx_audit_execution_level'),
+            ('SELECT * FROM execution WHERE kind = ? ORDER BY stamp DESC LIMIT 1', ('a',), 'idx_execution_kind_stamp')):
+        plan = ' '.join(str(row[-1]) for row in db.execute('EXPLAIN QUERY PLAN ' + query, parameters))
+        assert index in plan
+
+
+def test_new_database_schema():
+    with get_connection(None) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == _CURRENT_VERSION
+        _assert_query_indexes(db)
+
+
+def test_migration_version_fixup():
+    # Databases which have been migrated by 0001 before it set the version correctly
+    con = sqlite3.connect(get_config().get('database', 'path'))
+    con.executescript(_ORIGINAL_DB_SCHEMA)
+    con.executescript(MIGRATIONS[0][1])
+    con.execute('ALTER TABLE execution ADD COLUMN kind VARCHAR(256) DEFAULT NULL')
+    con.execute('PRAGMA user_version = 1')
+    con.close()
+
+    with get_connection(None) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == _CURRENT_VERSION
+        _assert_query_indexes(db)
 
 
 def test_pass_through():
@@ -114,6 +165,127 @@ def test_pass_through():
             assert db is db2
 
 
+def _report_connection_reused(connection, queue):
+    queue.put(get_connection(None) is connection)
+
+
+def test_connection_reuse():
+    connection = get_connection(None)
+    assert get_connection(None) is connection
+
+    # Threads and forked processes use connections of their own
+    result = []
+    thread = threading.Thread(target=lambda: result.append(get_connection(None) is connection))
+    thread.start()
+    thread.join()
+    assert result == [False]
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_report_connection_reused, args=(connection, queue))
+    process.start()
+    assert queue.get() is False
+    process.join()
+
+    # Removing the database results in a new, initialized database
+    os.unlink(get_config().get('database', 'path'))
+    reopened = get_connection(None)
+    assert reopened is not connection
+    assert reopened.execute("PRAGMA user_version").fetchone()[0] > 0
+    assert get_connection(None) is reopened
+
+
+def test_migration_to_integer_ids():
+    con = sqlite3.connect(get_config().get('database', 'path'))
+    con.executescript(_ORIGINAL_DB_SCHEMA)
+    for migration in MIGRATIONS[:3]:
+        con.executescript(migration[1])
+    con.executescript('''
+        INSERT INTO execution (context, stamp, kind) VALUES ('context-1', '2018-05-04T10:11:12.123456Z', 'upgrade');
+        INSERT INTO host (id, context, hostname) VALUES (1, 'context-1', 'host-1'), (2, 'context-2', 'host-2');
+        INSERT INTO data_source (id, context, host_id, actor, phase) VALUES
+          (1, 'context-1', 1, 'actor-1', 'phase-1'), (2, 'context-2', 2, 'actor-2', 'phase-2');
+        INSERT INTO message_data (hash, data) VALUES ('hash-1', '{"key": "value"}');
+        INSERT INTO message (id, context, stamp, topic, type, data_source_id, message_data_hash) VALUES
+          (1, 'context-1', '2018-05-04T10:11:13.5Z', 'topic-1', 'Model1', 1, 'hash-1'),
+          (2, 'context-2', '2018-05-04T10:11:14Z', 'topic-2', 'Model2', 2, 'hash-1');
+        INSERT INTO audit (event, stamp, context, data_source_id, message_id, data) VALUES
+          ('new-message', '2018-05-04T10:11:13.5Z', 'context-1', 1, 1, NULL),
+          ('log-message', '2018-05-04T10:11:15.000001Z', 'context-1', 1, NULL,
+           '{"message": "Something happened", "level": "WARNING"}'),
+          ('checkpoint', '2018-05-04T10:11:16.654321Z', 'context-2', 2, NULL, NULL);
+    ''')
+    con.close()
+
+    messages = get_messages(('Model1',), 'context-1')
+    assert len(messages) == 1
+    assert messages[0]['stamp'] == '2018-05-04T10:11:13.500000Z'
+    assert messages[0]['hostname'] == 'host-1'
+    assert messages[0]['actor'] == 'actor-1'
+    assert messages[0]['message'] == {'data': '{"key": "value"}', 'hash': 'hash-1', 'codec': 'json'}
+    assert get_messages(('Model2',), 'context-2')[0]['stamp'] == '2018-05-04T10:11:14.000000Z'
+    assert get_checkpoints('context-2')[0]['stamp'] == '2018-05-04T10:11:16.654321Z'
+    with get_connection(None) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == _CURRENT_VERSION
+        # Executions, which had been referenced without existing, have been created
+        assert [row[0] for row in db.execute('SELECT context FROM execution ORDER BY id')] == [
+            'context-1', 'context-2']
+        assert db.execute("SELECT stamp FROM execution WHERE context = 'context-1'").fetchone()[0] == 1525428672123456
+        assert db.execute("SELECT level FROM audit_data WHERE event = 'log-message'").fetchone()[0] == 'WARNING'
+
+
+def test_execution_unknown_context():
+    with pytest.raises(LeappRuntimeError):
+        checkpoint(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME)
+    with get_connection(None) as db:
+        assert not db.execute('SELECT COUNT(*) FROM execution').fetchone()[0]
+
+    # Only the execution of the testing context is created implicitly
+    checkpoint(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=TESTING_CONTEXT, hostname=_HOSTNAME)
+    Execution(context=TESTING_CONTEXT, kind='test-kind', configuration='{}', stamp='2018-01-01T00:00:00Z').store()
+    with get_connection(None) as db:
+        assert db.execute('SELECT context, kind, stamp FROM execution').fetchall() == [
+            (TESTING_CONTEXT, 'test-kind', 1514764800000000)]
+
+
+def test_storage_profile():
+    path = get_config().get('database', 'path')
+    config = get_config()
+    try:
+        db = create_connection(path)
+        Execution(context=_CONTEXT_NAME, configuration='').store(db)
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        db.close()
+
+        # Existing databases are switched once no other connection is writing to them
+        config.set('database', 'profile', 'wal')
+        blocking = sqlite3.connect(path)
+        blocking.execute('BEGIN IMMEDIATE')
+        started = time.time()
+        db = create_connection(path)
+        assert time.time() - started < 1
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        db.close()
+        blocking.rollback()
+        blocking.close()
+
+        db = create_connection(path)
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert db.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert db.execute('SELECT COUNT(*) FROM execution').fetchone()[0] == 1
+        db.close()
+
+        config.set('database', 'profile', 'default')
+        db = create_connection(path)
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        assert db.execute('PRAGMA synchronous').fetchone()[0] == 2
+        db.close()
+
+        config.set('database', 'profile', 'unknown')
+        with pytest.raises(LeappRuntimeError):
+            create_connection(path)
+    finally:
+        config.set('database', 'profile', 'default')
+
+
 def test_execution():
     e = Execution(context=_CONTEXT_NAME, configuration=json.dumps({'data': 'nothing to store'}))
     e.store()
@@ -121,6 +293,7 @@ def test_execution():
 
 
 def test_host():
+    _store_execution()
     e = Host(context=_CONTEXT_NAME, hostname=_HOSTNAME)
     e.store()
     assert e.host_id
@@ -137,7 +310,100 @@ def test_message_data(saved=True):
     return e
 
 
+def test_message_data_compression():
+    _store_execution()
+    payload = json.dumps({'packages': ['package-{}'.format(index) for index in range(1000)]})
+    get_config().set('database', 'compression_threshold', '1024')
+    try:
+        for hash_id, data in (('large', payload), ('small', '{"small": true}')):
+            e = MessageData(data=data, hash_id=hash_id)
+            Message(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME,
+                    topic=_TOPIC_NAME, msg_type=_MESSAGE_TYPE, data=e).store()
+    finally:
+        get_config().set('database', 'compression_threshold', '4096')
+    with get_connection(None) as conn:
+        stored = dict((row[0], row[1:]) for row in conn.execute('SELECT hash, data, compression FROM message_data'))
+    assert stored['large'][1] == 'zlib'
+    assert len(stored['large'][0]) < len(payload) / 4
+    assert stored['small'] == ('{"small": true}', None)
+    # The hash identifies the uncompressed payload, which is returned transparently
+    messages = get_messages((_MESSAGE_TYPE,), _CONTEXT_NAME)
+    assert sorted((m['message']['hash'], m['message']['data']) for m in messages) == [
+        ('large', payload), ('small', '{"small": true}')]
+
+
+def test_payload_files(tmpdir):
+    _store_execution()
+    payload = json.dumps({'files': ['/usr/share/file-{}'.format(index) for index in range(100)]})
+    hash_id = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    config = get_config()
+    config.set('database', 'side_storage_threshold', '1024')
+    config.set('database', 'side_storage_dir', tmpdir.strpath)
+    try:
+        for data, key in ((payload, hash_id), (payload, 'not-a-hash'), ('{"small": true}', 'small')):
+            Message(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME,
+                    topic=_TOPIC_NAME, msg_type=_MESSAGE_TYPE, data=MessageData(data=data, hash_id=key)).store()
+        with get_connection(None) as conn:
+            stored = dict((row[0], row[1:]) for row in conn.execute('SELECT hash, data, storage FROM message_data'))
+        # Only payloads which are identified by their hash are stored in files
+        assert stored[hash_id] == (None, 'file')
+        assert stored['not-a-hash'] == (payload, None)
+        assert stored['small'] == ('{"small": true}', None)
+        assert tmpdir.join(hash_id).read() == payload
+
+        messages = dict((m['message']['hash'], m['message']) for m in get_messages((_MESSAGE_TYPE,), _CONTEXT_NAME))
+        payload_file = messages[hash_id]['data']
+        assert isinstance(payload_file, PayloadFile)
+        assert len(payload_file) == len(payload)
+        assert payload_file.read(offset=2, size=5) == b'files'
+        mapped = payload_file.mmap()
+        try:
+            assert mapped[:len(payload)] == payload.encode('utf-8')
+        finally:
+            mapped.close()
+        assert decode_payload(messages[hash_id]) == json.loads(payload)
+        assert messages['not-a-hash']['data'] == payload
+    finally:
+        config.set('database', 'side_storage_threshold', '16777216')
+        config.set('database', 'side_storage_dir', '')
+
+
+def test_payload_files_orphaned(tmpdir):
+    def message(data):
+        hash_id = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        return Message(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME,
+                       topic=_TOPIC_NAME, msg_type=_MESSAGE_TYPE, data=MessageData(data=data, hash_id=hash_id))
+
+    _store_execution()
+    stored = json.dumps({'stored': ['/usr/share/file-{}'.format(index) for index in range(100)]})
+    failed = json.dumps({'failed': ['/usr/share/file-{}'.format(index) for index in range(100)]})
+    # The payload is stored in the table before payload files are enabled
+    message(stored).store()
+    config = get_config()
+    config.set('database', 'side_storage_threshold', '1024')
+    config.set('database', 'side_storage_dir', tmpdir.strpath)
+    try:
+        message(stored).store()
+        assert not tmpdir.listdir()
+
+        # The audit entry can not be serialized, which rolls back the message and its payload
+        entries = [Audit(event='new-message', message=message(failed), actor=_ACTOR_NAME, phase=_PHASE_NAME,
+                         context=_CONTEXT_NAME, hostname=_HOSTNAME),
+                   Audit(event='log-message', data={'message': object()}, actor=_ACTOR_NAME, phase=_PHASE_NAME,
+                         context=_CONTEXT_NAME, hostname=_HOSTNAME)]
+        with pytest.raises(TypeError):
+            store_audit_entries(entries)
+        assert not tmpdir.listdir()
+
+        store_audit_entries(entries[:1])
+        assert [path.basename for path in tmpdir.listdir()] == [entries[0].message.data.hash_id]
+    finally:
+        config.set('database', 'side_storage_threshold', '16777216')
+        config.set('database', 'side_storage_dir', '')
+
+
 def test_data_source():
+    _store_execution()
     e = DataSource(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME)
     e.store()
     assert e.data_source_id
@@ -145,7 +411,25 @@ def test_data_source():
     return e
 
 
+def test_data_source_id_cache():
+    first = test_data_source()
+    with get_connection(None) as connection:
+        connection.execute('DELETE FROM data_source')
+        connection.execute('DELETE FROM host')
+    # The ids are known already, therefore the rows are not created again
+    second = test_data_source()
+    assert (second.host_id, second.data_source_id) == (first.host_id, first.data_source_id)
+    with get_connection(None) as connection:
+        assert not connection.execute('SELECT COUNT(*) FROM data_source').fetchone()[0]
+
+    clear_id_cache(get_connection(None))
+    test_data_source()
+    with get_connection(None) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM data_source').fetchone()[0] == 1
+
+
 def test_message(saved=True):
+    _store_execution()
     data = test_message_data(saved=True)
     e = Message(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME,
                 topic=_TOPIC_NAME, msg_type=_MESSAGE_TYPE, data=data)
@@ -158,6 +442,7 @@ def test_message(saved=True):
 
 
 def test_message_not_saved_data():
+    _store_execution()
     data = test_message_data(saved=False)
     e = Message(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME,
                 topic=_TOPIC_NAME, msg_type=_MESSAGE_TYPE, data=data)
@@ -180,6 +465,7 @@ def test_audit_message():
 
 
 def test_audit_not_saved_message():
+    _store_execution()
     msg = test_message(saved=False)
     e = Audit(event='new-message', message=msg, actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME,
               hostname=_HOSTNAME)
@@ -192,6 +478,7 @@ def test_audit_not_saved_message():
 
 
 def test_audit_data():
+    _store_execution()
     e = Audit(event='new-message', data='Some data', actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME,
               hostname=_HOSTNAME)
     e.store()
@@ -201,6 +488,7 @@ def test_audit_data():
 
 
 def test_audit_non_string_data():
+    _store_execution()
     e = Audit(event='new-message', data=['Some data'], actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME,
               hostname=_HOSTNAME)
     e.store()
@@ -224,6 +512,7 @@ def test_get_messages():
 
 
 def test_checkpoints():
+    _store_execution()
     checkpoint(actor=_ACTOR_NAME, phase=_PHASE_NAME, context=_CONTEXT_NAME, hostname=_HOSTNAME)
     result = get_checkpoints(_CONTEXT_NAME)
     assert result and len(result) == 1
@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import sqlite3
+import uuid
+
+import pytest
+
+from leapp.config import get_config
+from leapp.utils.audit import Audit, Execution, Message, MessageData, Storable, checkpoint, get_checkpoints, \
+    get_connection, get_messages
+from leapp.utils.audit.writer import AuditWriter, _Server, flush, is_active
+
+_HOSTNAME = 'test-host.example.com'
+
+
+def setup_module(m):
+    get_config().set('database', 'path', '/tmp/leapp-test.db')
+
+
+@pytest.fixture
+def context():
+    return str(uuid.uuid4())
+
+
+def _make_message_audit(context, index):
+    audit = Audit(event='new-message', actor='writer-actor', phase='writer-phase', hostname=_HOSTNAME,
+                  context=context)
+    audit.message = Message(msg_type='WriterModel', topic='writer-topic', actor='writer-actor', phase='writer-phase',
+                            hostname=_HOSTNAME, context=context,
+                            data=MessageData(data='{"index": %d}' % index, hash_id='writer-hash-%d' % index))
+    return audit
+
+
+def _store_message(context, index):
+    _make_message_audit(context, index).store()
+
+
+def _store_in_child(context):
+    for index in range(5, 10):
+        _store_message(context, index)
+    # Like actors, a process has to wait for its entries to be written before others can rely on them
+    flush()
+
+
+def test_audit_writer(context):
+    writer = AuditWriter(batch_size=3)
+    try:
+        assert is_active()
+        Execution(context=context, kind='writer-test', configuration='').store()
+        for index in range(5):
+            _store_message(context, index)
+        process = multiprocessing.Process(target=_store_in_child, args=(context,))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        checkpoint(actor='', phase='writer-phase', context=context, hostname=_HOSTNAME)
+
+        # Reading waits until everything sent to the writer has been written
+        messages = get_messages(('WriterModel',), context)
+        assert sorted(message['message']['data'] for message in messages) == sorted(
+            '{"index": %d}' % index for index in range(10))
+        assert len(get_checkpoints(context)) == 1
+    finally:
+        stats = writer.stop()
+    assert not is_active()
+    assert stats['entries'] == 12
+    assert stats['errors'] == 0
+    assert 4 <= stats['transactions'] < 12
+    assert writer.stop() is stats
+    assert not os.path.exists(writer.address)
+
+    # Entries are written directly again once the writer has been stopped
+    checkpoint(actor='', phase='after-writer', context=context, hostname=_HOSTNAME)
+    assert len(get_checkpoints(context)) == 2
+
+
+class _FailingEntry(Storable):
+    def do_store(self, connection):
+        raise sqlite3.OperationalError('failing entry')
+
+
+def test_audit_writer_retries_entries(context):
+    Execution(context=context, kind='writer-test', configuration='').store()
+    log = Audit(event='log-message', actor='writer-actor', phase='writer-phase', hostname=_HOSTNAME, context=context,
+                data={'level': 'ERROR', 'message': 'logged'})
+    entries = [_make_message_audit(context, 0), log, _FailingEntry(), _make_message_audit(context, 1)]
+
+    server = _Server(batch_size=10)
+    # The failing entry rolls back the group transaction, the other entries are written one by one afterwards
+    server._write(entries)
+    assert server.stats['errors'] == 1
+    assert server.stats['entries'] == 3
+
+    messages = get_messages(('WriterModel',), context)
+    assert [message['message']['data'] for message in messages] == ['{"index": 0}', '{"index": 1}']
+    assert [message['id'] for message in messages] == [entries[0].message.message_id, entries[3].message.message_id]
+    with get_connection(None) as connection:
+        assert connection.execute('SELECT level FROM audit WHERE id = ?', (log.audit_id,)).fetchone()[0] == 'ERROR'
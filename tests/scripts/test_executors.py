@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from leapp.config import get_config
+from leapp.executors import ActorJob, get_executor
+from leapp.executors.pool import PoolExecutor
+from leapp.executors.process import ProcessExecutor
+from leapp.executors.zygote import ZygoteExecutor
+from leapp.messaging.inprocess import InProcessMessaging
+
+
+def _executed_actors(log_file):
+    log_file.seek(0)
+    return [json.loads(line.decode('utf-8'))['class_name'] for line in log_file]
+
+
+@pytest.mark.parametrize('executor_type', (ProcessExecutor, PoolExecutor, ZygoteExecutor))
+def test_executor_runs_actor(repository, executor_type):
+    executor = executor_type()
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            for name in ('FirstActor', 'SecondActor', 'ThirdActor'):
+                executor.execute(ActorJob(definition=repository.lookup_actor(name), logger=None, messaging=None))
+            assert _executed_actors(test_log_file) == ['FirstActor', 'SecondActor', 'ThirdActor']
+        assert [name for name, _ in executor.launch_latencies] == ['first_actor', 'second_actor', 'third_actor']
+        assert all(latency >= 0 for _, latency in executor.launch_latencies)
+    finally:
+        executor.close()
+
+
+@pytest.mark.parametrize('executor_type', (ProcessExecutor, PoolExecutor, ZygoteExecutor))
+def test_executor_passes_back_results(repository, executor_type):
+    executor = executor_type()
+    messaging = InProcessMessaging(stored=False)
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            os.environ['FirstActor-ReportError'] = '1'
+            repository.lookup_actor('FirstActor')(messaging=messaging, executor=executor).run()
+    finally:
+        os.environ.pop('FirstActor-ReportError')
+        executor.close()
+    assert [error['actor'] for error in messaging.errors()] == ['first_actor']
+    assert not messaging.messages()
+
+
+@pytest.mark.parametrize('max_actors_per_worker', (0, 1, 2))
+def test_pool_executor_recycles_workers(repository, max_actors_per_worker):
+    executor = PoolExecutor(size=1, max_actors_per_worker=max_actors_per_worker)
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            for _ in range(3):
+                repository.lookup_actor('FirstActor')(executor=executor).run()
+            assert _executed_actors(test_log_file) == ['FirstActor'] * 3
+    finally:
+        executor.close()
+
+
+def test_zygote_executor_preloads_actors(repository):
+    executor = ZygoteExecutor(definitions=repository.actors)
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            for name in ('FirstActor', 'SecondActor', 'FirstActor'):
+                repository.lookup_actor(name)(executor=executor).run()
+            assert _executed_actors(test_log_file) == ['FirstActor', 'SecondActor', 'FirstActor']
+    finally:
+        executor.close()
+    # Closing an executor twice is harmless, which happens when it is closed again at exit
+    executor.close()
+
+
+def test_get_executor():
+    config = get_config()
+    try:
+        config.set('executor', 'kind', 'pool')
+        executor = get_executor()
+        assert isinstance(executor, PoolExecutor)
+        executor.close()
+        config.set('executor', 'kind', 'zygote')
+        executor = get_executor()
+        assert isinstance(executor, ZygoteExecutor)
+        executor.close()
+    finally:
+        config.set('executor', 'kind', 'process')
+    executor = get_executor()
+    assert isinstance(executor, ProcessExecutor)
+    executor.close()
@@ -0,0 +1,113 @@
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+
+import pytest
+
+from leapp.config import get_config
+from leapp.logger import LeappAuditHandler, flush_audit_log
+from leapp.utils.audit import Audit, Execution, get_connection
+
+
+def setup_module(m):
+    get_config().set('database', 'path', '/tmp/leapp-test.db')
+
+
+@pytest.fixture
+def audit_logger():
+    os.environ['LEAPP_EXECUTION_ID'] = str(uuid.uuid4())
+    Execution(context=os.environ['LEAPP_EXECUTION_ID'], kind='test', configuration='').store()
+    logger = logging.getLogger('leapp.test.logger')
+    logger.setLevel(logging.DEBUG)
+    handler = LeappAuditHandler()
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+    handler.close()
+    os.environ.pop('LEAPP_EXECUTION_ID')
+
+
+def _logged_messages(column='data'):
+    with get_connection(None) as connection:
+        cursor = connection.execute('SELECT %s FROM audit_data WHERE event = ? AND context = ? ORDER BY id' % column,
+                                    ('log-message', os.environ['LEAPP_EXECUTION_ID']))
+        return [row[0] for row in cursor]
+
+
+def _log_in_child(logger):
+    logger.info('child message')
+    flush_audit_log()
+
+
+@pytest.mark.parametrize('asynchronous', ('True', 'False'))
+def test_audit_handler(audit_logger, asynchronous):
+    get_config().set('logging', 'asynchronous', asynchronous)
+    get_config().set('logging', 'batch_size', '3')
+    try:
+        handler = LeappAuditHandler()
+        audit_logger.addHandler(handler)
+        try:
+            for i in range(10):
+                audit_logger.info('message %d', i)
+            flush_audit_log()
+        finally:
+            audit_logger.removeHandler(handler)
+            handler.close()
+    finally:
+        get_config().set('logging', 'asynchronous', 'False')
+        get_config().set('logging', 'batch_size', '500')
+    logged = _logged_messages()
+    # Every message is logged twice, by the handler of the fixture and the one of the test
+    assert len(logged) == 20
+    assert ['message {}'.format(i) in entry for i in range(10) for entry in logged].count(True) == 20
+    assert set(_logged_messages('level')) == {'INFO'}
+
+
+def test_audit_handler_forked(audit_logger):
+    audit_logger.info('parent message')
+    process = multiprocessing.Process(target=_log_in_child, args=(audit_logger,))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    flush_audit_log()
+    logged = _logged_messages()
+    assert len(logged) == 2
+    assert any('child message' in entry for entry in logged)
+
+
+def _log_entry(message):
+    return Audit(event='log-message', context=os.environ['LEAPP_EXECUTION_ID'], hostname='localhost', actor='',
+                 phase='', data={'level': 'INFO', 'message': message})
+
+
+def test_audit_handler_stores_records_after_failed_batch(audit_logger):
+    # The data of the second record cannot be serialized, which rolls back the batch
+    batch = [_log_entry('first message'), _log_entry(object()), _log_entry('last message')]
+    LeappAuditHandler._store(batch)
+    logged = _logged_messages()
+    assert len(logged) == 2
+    assert 'first message' in logged[0]
+    assert 'last message' in logged[1]
+    assert batch[0].audit_id and not batch[1].audit_id and batch[2].audit_id
+
+
+def test_audit_handler_starts_one_writer():
+    handler = LeappAuditHandler()
+    started = threading.Event()
+    queues = []
+
+    def get_queue():
+        started.wait()
+        queues.append(handler._get_queue())
+
+    threads = [threading.Thread(target=get_queue) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    handler.close()
+    assert len(queues) == 8
+    assert all(entries is queues[0] for entries in queues)
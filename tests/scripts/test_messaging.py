@@ -1,8 +1,17 @@
+import json
+import os
+import uuid
+
 import pytest
 
-from leapp.messaging.inprocess import InProcessMessaging, BaseMessaging
+from leapp.config import get_config
+from leapp.exceptions import LeappRuntimeError
+from leapp.messaging.codecs import get_codec, to_json_message
+from leapp.messaging.inprocess import InProcessMessaging, BaseMessaging, MessageCache
+from leapp.messaging.messagestore import MessageStore, PayloadCache
 from leapp.models.error_severity import ErrorSeverity
 from leapp.models import ErrorModel
+from leapp.utils.audit import Execution, Message, MessageData, get_messages
 from leapp.exceptions import CannotConsumeErrorMessages
 
 from helpers import repository_dir
@@ -63,6 +72,204 @@ def test_loading(repository_dir):
         assert len(msg.messages()) == 0
 
 
+def _start_execution():
+    os.environ['LEAPP_EXECUTION_ID'] = str(uuid.uuid4())
+    Execution(context=os.environ['LEAPP_EXECUTION_ID'], kind='test', configuration='').store()
+
+
+def test_loading_stream(repository_dir):
+    config = get_config()
+    config.set('messaging', 'stream', 'True')
+    config.set('messaging', 'stream_batch_size', '2')
+    _start_execution()
+    try:
+        with repository_dir.as_cwd():
+            producer = InProcessMessaging()
+            produced = [UnitTestModel(integer=i) for i in range(5)]
+            for model in produced[:3]:
+                producer.produce(model, FakeActor())
+            msg = InProcessMessaging()
+            msg.load((UnitTestModel,))
+            # Messages stored after loading are not consumed
+            producer.produce(produced[3], FakeActor())
+            msg.produce(produced[4], FakeActor())
+            assert list(msg.consume(FakeActor(), UnitTestModel)) == produced[:3] + produced[4:]
+            assert list(msg.consume(FakeActor())) == produced[:3] + produced[4:]
+            assert not list(msg.consume(FakeActor(), UnitTestModelUnused))
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+        config.set('messaging', 'stream', 'False')
+        config.set('messaging', 'stream_batch_size', '500')
+
+
+def test_message_cache(repository_dir, monkeypatch):
+    _start_execution()
+    try:
+        with repository_dir.as_cwd():
+            produced = [UnitTestModel(integer=i) for i in range(4)]
+            external = InProcessMessaging()
+            external.produce(produced[0], FakeActor())
+            cache = MessageCache(['UnitTestModel'], os.environ['LEAPP_EXECUTION_ID'])
+            assert cache.refresh() == 1
+            assert cache.covers(['UnitTestModel'])
+            assert not cache.covers(['UnitTestModel', 'UnitTestModelUnused'])
+
+            # Loading from the cache does not query the database
+            monkeypatch.setattr('leapp.messaging.inprocess.get_messages', None)
+            actor = InProcessMessaging(cache=cache)
+            actor.load((UnitTestModel,))
+            actor.produce(produced[1], FakeActor())
+            actor.produce(produced[1], FakeActor())
+            cache.feed(actor.messages())
+            external.produce(produced[2], FakeActor())
+
+            # Fed messages are not added again once they are seen in the database, but become trusted
+            assert [trusted for _, trusted in cache.messages(['UnitTestModel']).by_types_with_trust(
+                ['UnitTestModel'])] == [True, False, False]
+            assert cache.refresh() == 1
+            assert cache.refresh() == 0
+            assert len(cache) == 4
+            msg = InProcessMessaging(cache=cache)
+            msg.load((UnitTestModel,))
+            assert all(trusted for _, trusted in msg._data.by_types_with_trust(['UnitTestModel']))
+            assert list(msg.consume(FakeActor())) == [produced[0], produced[1], produced[1], produced[2]]
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+
+
+def test_trusted_consume(repository_dir, monkeypatch):
+    _start_execution()
+    try:
+        with repository_dir.as_cwd():
+            InProcessMessaging().produce(UnitTestModel(integer=1), FakeActor())
+            # A payload which does not match its hash has not been produced from a validated model
+            Message(msg_type=UnitTestModel.__name__, topic=UnitTestModel.topic.name, actor='tool', phase='phase',
+                    hostname='localhost', context=os.environ['LEAPP_EXECUTION_ID'],
+                    data=MessageData(data=json.dumps({'integer': 4}), hash_id='0' * 64)).store()
+            msg = InProcessMessaging()
+            msg.load((UnitTestModel,))
+            # Trust is not derived from the message content, e.g. an id passed along by a remote messaging client
+            msg.feed(UnitTestModel(integer=2), FakeActor())['id'] = 2
+            msg.produce(UnitTestModel(integer=3), FakeActor())
+
+            created = []
+            create_many = UnitTestModel.create_many.__func__
+
+            def record(cls, data, trusted=False):
+                created.append(([entry['integer'] for entry in data], trusted))
+                return create_many(cls, data, trusted=trusted)
+            monkeypatch.setattr(UnitTestModel, 'create_many', classmethod(record))
+            assert [model.integer for model in msg.consume(FakeActor())] == [1, 4, 2, 3]
+            # Only messages loaded from the database matching their hash are trusted, the messages are created in
+            # batches
+            assert created == [([1], True), ([4, 2, 3], False)]
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+
+
+@pytest.mark.parametrize('write_errors_immediately', ('True', 'False'))
+def test_buffered_writes(repository_dir, write_errors_immediately):
+    config = get_config()
+    config.set('messaging', 'write_buffer_size', '3')
+    config.set('messaging', 'write_errors_immediately', write_errors_immediately)
+    _start_execution()
+    try:
+        with repository_dir.as_cwd():
+            msg = InProcessMessaging()
+            produced = [UnitTestModel(integer=i) for i in range(4)]
+            for model in produced:
+                msg.produce(model, FakeActor())
+            msg.report_error('Some error', ErrorSeverity.ERROR, FakeActor(), details=None)
+            stored = get_messages(('UnitTestModel', 'ErrorModel'), os.environ['LEAPP_EXECUTION_ID'])
+            assert [message['type'] for message in stored] == ['UnitTestModel'] * 3 + (
+                ['ErrorModel'] if write_errors_immediately == 'True' else [])
+            msg.flush()
+            stored = get_messages(('UnitTestModel',), os.environ['LEAPP_EXECUTION_ID'])
+            assert [UnitTestModel.create(json.loads(message['message']['data'])) for message in stored] == produced
+            assert len(get_messages(('ErrorModel',), os.environ['LEAPP_EXECUTION_ID'])) == 1
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+        config.set('messaging', 'write_buffer_size', '0')
+        config.set('messaging', 'write_errors_immediately', 'True')
+
+
+@pytest.mark.parametrize('compression_threshold', ('0', '1'))
+def test_codecs(repository_dir, compression_threshold):
+    config = get_config()
+    config.set('database', 'compression_threshold', compression_threshold)
+    _start_execution()
+    try:
+        with repository_dir.as_cwd():
+            produced = [UnitTestModel(integer=i, strings=['value'] * i) for i in range(4)]
+            # Messages of different codecs are consumed side by side
+            for codec, models in (('binary', produced[:2]), ('json', produced[2:])):
+                config.set('messaging', 'codec', codec)
+                msg = InProcessMessaging()
+                for model in models:
+                    message = msg.produce(model, FakeActor())
+                    assert message['message']['codec'] == codec
+                    assert message['message']['hash'] == get_codec(codec).digest(message['message']['data'])
+            msg.report_error('Some error', ErrorSeverity.ERROR, FakeActor(), details=None)
+            stored = get_messages(('UnitTestModel',), os.environ['LEAPP_EXECUTION_ID'])
+            assert [message['message']['codec'] for message in stored] == ['binary'] * 2 + ['json'] * 2
+            assert isinstance(stored[0]['message']['data'], bytes)
+            msg = InProcessMessaging()
+            msg.load((UnitTestModel,))
+            assert list(msg.consume(FakeActor(), UnitTestModel)) == produced
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+        config.set('messaging', 'codec', 'json')
+        config.set('database', 'compression_threshold', '4096')
+
+
+def test_binary_codec():
+    codec = get_codec('binary')
+    data = {'text': u'\u017elu\u0165', 'long': 'x' * 300, 'integers': [0, 1, -1, 2 ** 70, -2 ** 70],
+            'float': 1.5, 'constants': [None, True, False], 'nested': {'empty': {}, 'list': []}}
+    payload = codec.encode(data)
+    assert codec.decode(payload) == data
+    # Payloads depend neither on the order of the keys nor on the identity of the values
+    reordered = dict(reversed(list(data.items())))
+    reordered['long'] = ''.join(['x'] * 300)
+    assert codec.encode(reordered) == payload
+    assert codec.encode({'b': 1, 'a': 2}) == b'\x01M\x02\x01aI\x04\x01bI\x02'
+    for invalid in (b'', b'\x02N', b'\x01X', b'\x01S\x05ab', b'\x01NN'):
+        with pytest.raises(LeappRuntimeError):
+            codec.decode(invalid)
+    with pytest.raises(TypeError):
+        codec.encode({'set': set()})
+
+
+def test_to_json_message(repository_dir):
+    config = get_config()
+    config.set('messaging', 'codec', 'binary')
+    try:
+        with repository_dir.as_cwd():
+            msg = InProcessMessaging(stored=False)
+            msg.produce(UnitTestModel(integer=1), FakeActor())
+            message = msg.messages()[0]
+            converted = to_json_message(message)
+            assert message['message']['codec'] == 'binary'
+            assert converted['message']['codec'] == 'json'
+            assert converted['message']['hash'] == get_codec('json').digest(converted['message']['data'])
+            output = json.loads(json.dumps(converted))
+            assert UnitTestModel.create(json.loads(output['message']['data'])) == UnitTestModel(integer=1)
+            assert to_json_message(converted) is converted
+    finally:
+        config.set('messaging', 'codec', 'json')
+
+
+def test_unknown_codec():
+    config = get_config()
+    config.set('messaging', 'codec', 'unknown')
+    try:
+        with pytest.raises(LeappRuntimeError):
+            InProcessMessaging()
+    finally:
+        config.set('messaging', 'codec', 'json')
+    assert get_codec().name == 'json'
+
+
 def test_report_error(repository_dir):
     with repository_dir.as_cwd():
         msg = InProcessMessaging()
@@ -87,3 +294,56 @@ def test_not_implemented(repository_dir, stored):
         assert len(msg.errors()) == 0
         assert len(msg.messages()) == 0
         assert msg.stored == stored
+
+
+def test_message_store():
+    store = MessageStore([{'type': 'A', 'id': 1}, {'type': 'B', 'id': 2}, {'type': 'A', 'id': 3}])
+    store.append({'type': 'C', 'id': 4})
+    assert len(store) == 4
+    assert [message['id'] for message in store] == [1, 2, 3, 4]
+    assert [message['id'] for message in store.by_types(['A'])] == [1, 3]
+    assert [message['id'] for message in store.by_types(['C', 'A'])] == [1, 3, 4]
+    assert not list(store.by_types(['D']))
+
+    # Only messages explicitly marked as loaded from the database are trusted
+    trusted = MessageStore([{'type': 'A', 'id': 7}], trusted=True)
+    position = trusted.append({'type': 'A', 'id': 8})
+    assert [entry[1] for entry in trusted.by_types_with_trust(['A'])] == [True, False]
+    trusted.trust(position)
+    assert [entry[1] for entry in trusted.by_types_with_trust(['A'])] == [True, True]
+    assert not any(entry[1] for entry in store.by_types_with_trust(['A', 'B', 'C']))
+
+    # Messages added after querying are not returned
+    for result in (store.by_types(['A']), store.by_types(['A', 'B'])):
+        store.append({'type': 'A', 'id': 5})
+        store.append({'type': 'B', 'id': 6})
+        assert 5 not in [message['id'] for message in result]
+
+
+def test_payload_cache():
+    payloads = [{'data': '{{"value": {}}}'.format(i), 'hash': str(i)} for i in range(3)]
+    cache = PayloadCache(max_size=len(payloads[0]['data']) * 2)
+    assert cache.decode(payloads[0]) == {'value': 0}
+    assert cache.decode(dict(payloads[0])) == {'value': 0}
+    cache.decode(payloads[1])
+    # Using the first payload again makes the second one the least recently used
+    cache.decode(payloads[0])
+    cache.decode(payloads[2])
+    assert len(cache) == 2
+    assert cache.size == len(payloads[0]['data']) * 2
+    assert set(cache._entries) == {'0', '2'}
+    assert cache.decode(payloads[1]) == {'value': 1}
+
+    disabled = PayloadCache(max_size=0)
+    assert disabled.decode(payloads[0]) == {'value': 0}
+    assert not len(disabled)
+
+
+def test_payload_cache_returns_copies():
+    payload = {'data': '{"items": [{"name": "first"}], "value": 1}', 'hash': 'copies'}
+    cache = PayloadCache(max_size=1024)
+    decoded = cache.decode(payload)
+    decoded['value'] = 2
+    decoded['items'][0]['name'] = 'changed'
+    decoded['items'].append({'name': 'second'})
+    assert cache.decode(payload) == {'items': [{'name': 'first'}], 'value': 1}
@@ -1,3 +1,6 @@
+import copy
+import pickle
+
 import pytest
 
 import leapp.models
@@ -25,6 +28,22 @@ class ExtendedOverriddenInheritedUnitTestModel(ExtendedInheritedUnitTestModel):
     integer = leapp.models.fields.Number()
 
 
+class CompactUnitTestModel(leapp.models.Model):
+    topic = UnitTestTopic
+    compact = True
+    strings = leapp.models.fields.List(leapp.models.fields.String(), allow_null=True)
+    integer = leapp.models.fields.Integer()
+    boolean = leapp.models.fields.Boolean(default=False)
+
+
+class ExtendedCompactUnitTestModel(CompactUnitTestModel):
+    integer = leapp.models.fields.Number(default=1)
+
+
+class NonCompactUnitTestModel(CompactUnitTestModel):
+    compact = False
+
+
 def test_model_definition_error():
     with pytest.raises(ModelDefinitionError):
         type('FailingModelDefinition', (leapp.models.Model,), {})
@@ -74,3 +93,20 @@ def test_inheritance():
     assert isinstance(InheritedUnitTestModel.fields['integer'], leapp.models.fields.Integer)
     assert isinstance(InheritedUnitTestModel.fields['strings'], leapp.models.fields.List)
     assert InheritedUnitTestModel.fields is not UnitTestModel.fields
+
+
+def test_compact_models():
+    model = ExtendedCompactUnitTestModel(strings=['first'], integer=2.5, boolean=True)
+    assert not hasattr(model, '__dict__')
+    assert hasattr(NonCompactUnitTestModel(), '__dict__')
+    assert set(ExtendedCompactUnitTestModel.fields) == {'strings', 'integer', 'boolean'}
+    with pytest.raises(AttributeError):
+        model.booleans = False
+
+    assert model.dump() == {'strings': ['first'], 'integer': 2.5, 'boolean': True}
+    assert ExtendedCompactUnitTestModel.create(model.dump()) == model
+    assert pickle.loads(pickle.dumps(model)) == model
+    assert copy.deepcopy(model) == model
+    assert ExtendedCompactUnitTestModel.create({'boolean': True}) != model
+    with pytest.raises(leapp.models.fields.ModelViolationError):
+        CompactUnitTestModel(integer=2.5)
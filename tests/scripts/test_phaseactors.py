@@ -86,3 +86,9 @@ def test_actor_phases_order():
     assert len(phase_actors.actors) == 2
     assert phase_actors.actors[0] is CycleActor2
     assert phase_actors.actors[1] is CycleActor3
+
+
+def test_actor_phases_dependencies():
+    phase_actors = PhaseActors((CycleActor3, CycleActor2), 'Test')
+    assert phase_actors.dependencies(CycleActor2) == ()
+    assert phase_actors.dependencies(CycleActor3) == (CycleActor2,)
@@ -1,5 +1,9 @@
+import os
+import sys
+
 import pytest
 
+import leapp.libraries.actor
 from leapp.repository.actor_definition import ActorDefinition, ActorInspectionFailedError, MultipleActorsError
 from leapp.exceptions import UnsupportedDefinitionKindError
 from leapp.repository import DefinitionKind
@@ -69,3 +73,35 @@ def test_actor_definition(repository_dir):
                     with mock.patch('leapp.repository.actor_definition.get_actors', return_value=[True, True]):
                         definition._discovery = None
                         definition.discover()
+
+
+def test_actor_definition_keeps_libraries(tmpdir):
+    actor_dir = tmpdir.mkdir('actors').mkdir('counting')
+    actor_dir.join('actor.py').write('from leapp.libraries.actor import counting\n')
+    # Every execution of the library code is counted in the environment
+    actor_dir.mkdir('libraries').join('counting.py').write(
+        'import os\nos.environ["LEAPP_TEST_LIBRARY_LOADS"] = str(int(os.environ["LEAPP_TEST_LIBRARY_LOADS"]) + 1)\n')
+    os.environ['LEAPP_TEST_LIBRARY_LOADS'] = '0'
+    try:
+        definition = ActorDefinition('actors/counting', tmpdir.strpath)
+        definition.add(DefinitionKind.LIBRARIES, 'libraries')
+        definition.load(keep_libraries=True)
+        assert os.environ['LEAPP_TEST_LIBRARY_LOADS'] == '1'
+        library = definition._libraries[0][1]
+        assert definition._module.counting is library
+        for _ in range(2):
+            with definition.injected_context():
+                assert leapp.libraries.actor.counting is library
+                assert sys.modules['leapp.libraries.actor.counting'] is library
+            assert 'leapp.libraries.actor.counting' not in sys.modules
+        assert os.environ['LEAPP_TEST_LIBRARY_LOADS'] == '1'
+        # Libraries are loaded again by every context unless they are kept
+        definition = ActorDefinition('actors/counting', tmpdir.strpath)
+        definition.add(DefinitionKind.LIBRARIES, 'libraries')
+        with definition.injected_context():
+            pass
+        assert os.environ['LEAPP_TEST_LIBRARY_LOADS'] == '2'
+    finally:
+        os.environ.pop('LEAPP_TEST_LIBRARY_LOADS')
+        sys.modules.pop('counting', None)
+        sys.modules.pop('actor', None)
@@ -0,0 +1,117 @@
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+
+from leapp.config import get_config
+from leapp.utils.audit import Audit, Execution, Message, MessageData, checkpoint, get_connection, get_messages
+from leapp.utils.audit.retention import get_retention_policy, prune, vacuum
+from leapp.utils.schemas import CURRENT_SCHEMA
+
+_HOSTNAME = 'test-host.example.com'
+
+
+def setup_module(m):
+    get_config().set('database', 'path', '/tmp/leapp-test.db')
+
+
+def setup_function(f):
+    path = get_config().get('database', 'path')
+    if os.path.isfile(path):
+        os.unlink(path)
+
+
+def _stamp(days):
+    return (datetime.datetime.utcnow() - datetime.timedelta(days=days)).isoformat() + 'Z'
+
+
+def _create_execution(context, kind, days, payload):
+    Execution(context=context, kind=kind, configuration='', stamp=_stamp(days)).store()
+    audit = Audit(event='new-message', actor='actor', phase='phase', hostname=_HOSTNAME, context=context)
+    audit.message = Message(msg_type='RetentionModel', topic='topic', actor='actor', phase='phase', hostname=_HOSTNAME,
+                            context=context, data=MessageData(data=payload, hash_id='hash-' + payload))
+    audit.store()
+    checkpoint(actor='actor', phase='phase', context=context, hostname=_HOSTNAME)
+
+
+def _contexts():
+    with get_connection(None) as db:
+        return sorted(row[0] for row in db.execute('SELECT context FROM execution'))
+
+
+def test_prune(tmpdir):
+    _create_execution('upgrade-old', 'upgrade', 100, 'shared')
+    _create_execution('upgrade-older', 'upgrade', 200, 'only-older')
+    _create_execution('upgrade-new', 'upgrade', 1, 'shared')
+    _create_execution('snactor-old', 'snactor-run', 300, 'snactor')
+    _create_execution('test-old', 'snactor-test-run', 150, 'test')
+    _create_execution('test-older', 'snactor-test-run', 160, 'test')
+
+    result = prune(max_age=datetime.timedelta(days=90), kinds=['upgrade', 'snactor-test-run'],
+                   archive_dir=tmpdir.strpath)
+    # The latest execution of every kind is kept, even if it is old
+    assert _contexts() == ['snactor-old', 'test-old', 'upgrade-new']
+    assert result['executions'] == 3
+    assert result['messages'] == 3
+    assert result['audit'] == 6
+    # Payloads still referenced by kept messages are kept
+    assert result['message_data'] == 1
+    assert get_messages(('RetentionModel',), 'upgrade-new')[0]['message']['data'] == 'shared'
+    with get_connection(None) as db:
+        assert not db.execute('SELECT COUNT(*) FROM host WHERE execution_id NOT IN (SELECT id FROM execution)'
+                              ).fetchone()[0]
+
+    with gzip.open(result['archive'], 'rb') as f:
+        archived = [json.loads(line.decode('utf-8')) for line in f]
+    assert sorted(document['context'] for document in archived) == ['test-older', 'upgrade-old', 'upgrade-older']
+    older = [document for document in archived if document['context'] == 'upgrade-older'][0]
+    assert older['kind'] == 'upgrade'
+    assert older['messages'][0]['message_data'] == 'only-older'
+    assert [entry['event'] for entry in older['audit']] == ['new-message', 'checkpoint']
+
+
+def test_prune_keeps_current_execution():
+    _create_execution('current', 'upgrade', 100, 'current')
+    _create_execution('newer', 'upgrade', 50, 'newer')
+    _create_execution('newest', 'upgrade', 10, 'newest')
+    os.environ['LEAPP_EXECUTION_ID'] = 'current'
+    try:
+        result = prune(keep_last=0)
+    finally:
+        os.environ.pop('LEAPP_EXECUTION_ID')
+    assert _contexts() == ['current']
+    assert result['executions'] == 2
+    assert result['archive'] is None
+
+
+def test_vacuum_converts_database():
+    # Databases created before incremental vacuum has been enabled
+    sqlite3.connect(get_config().get('database', 'path')).executescript(CURRENT_SCHEMA)
+    with get_connection(None) as db:
+        assert db.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+        db.executemany('INSERT INTO message_data (hash, data) VALUES (?, ?)',
+                       [(str(index), 'x' * 4096) for index in range(100)])
+    vacuum()
+    db = get_connection(None)
+    assert db.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    with db:
+        db.execute('DELETE FROM message_data')
+    assert db.execute('PRAGMA freelist_count').fetchone()[0] > 0
+    assert vacuum() > 0
+    assert db.execute('PRAGMA freelist_count').fetchone()[0] == 0
+
+
+@pytest.mark.parametrize('max_age_days,archive', ((None, None), (0, False)))
+def test_retention_policy(max_age_days, archive):
+    policy = get_retention_policy(max_age_days=max_age_days, archive=archive)
+    if max_age_days is None:
+        assert policy['max_age'] == datetime.timedelta(days=90)
+        assert policy['archive_dir'] == os.path.join('/tmp', 'archive')
+    else:
+        assert policy['max_age'] is None
+        assert policy['archive_dir'] is None
+    assert policy['kinds'] == []
+    assert policy['keep_last'] == 1
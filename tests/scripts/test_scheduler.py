@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from leapp.workflows.scheduler import StageScheduler
+
+_TIMEOUT = 5
+
+
+class _Stage(object):
+    def __init__(self, actors, dependencies=None):
+        self.actors = tuple(actors)
+        self._dependencies = dependencies or {}
+
+    def dependencies(self, actor):
+        return self._dependencies.get(actor, ())
+
+
+class _Recorder(object):
+    def __init__(self, stop=(), fail=(), wait=None):
+        self.events = []
+        self.reached = dict(((event, actor), threading.Event()) for actor in 'abcdef' for event in ('start', 'end'))
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+        self._stop = stop
+        self._fail = fail
+        self._wait = wait or {}
+
+    def __call__(self, actor):
+        with self._lock:
+            self.events.append(('start', actor))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.reached[('start', actor)].set()
+        try:
+            if actor in self._wait:
+                assert self.reached[self._wait[actor]].wait(_TIMEOUT)
+            else:
+                time.sleep(0.05)
+            if actor in self._fail:
+                raise ValueError(actor)
+            return actor in self._stop
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.events.append(('end', actor))
+            self.reached[('end', actor)].set()
+
+    def executed(self):
+        return [actor for event, actor in self.events if event == 'start']
+
+    def index(self, event, actor):
+        return self.events.index((event, actor))
+
+
+def test_scheduler_runs_independent_actors_concurrently():
+    # Both actors wait until the other one has started, which only succeeds if they are running at the same time
+    recorder = _Recorder(wait={'a': ('start', 'b'), 'b': ('start', 'a')})
+    assert not StageScheduler(_Stage('ab'), max_workers=2).run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b']
+    assert recorder.max_running == 2
+
+
+def test_scheduler_releases_dependent_actors():
+    # b does not depend on a and has to run while a is still waiting for it
+    recorder = _Recorder(wait={'a': ('start', 'b')})
+    stage = _Stage('abcd', dependencies={'c': ('a',), 'd': ('b', 'c')})
+    assert not StageScheduler(stage, max_workers=4).run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b', 'c', 'd']
+    assert recorder.index('start', 'b') < recorder.index('end', 'a')
+    assert recorder.index('end', 'a') < recorder.index('start', 'c')
+    assert recorder.index('end', 'b') < recorder.index('start', 'd')
+    assert recorder.index('end', 'c') < recorder.index('start', 'd')
+
+
+def test_scheduler_bounds_running_actors():
+    recorder = _Recorder()
+    assert not StageScheduler(_Stage('abcdef'), max_workers=2).run(recorder)
+    assert recorder.executed() == list('abcdef')
+    assert recorder.max_running == 2
+
+
+def test_scheduler_sequential():
+    recorder = _Recorder()
+    assert not StageScheduler(_Stage('abc'), max_workers=1).run(recorder)
+    assert recorder.events == [(event, actor) for actor in 'abc' for event in ('start', 'end')]
+
+
+def test_scheduler_stops():
+    recorder = _Recorder(stop='a', wait={'b': ('end', 'a')})
+    assert StageScheduler(_Stage('abcd'), max_workers=2).run(recorder)
+    # The running actor is waited for, no further actors are started
+    assert sorted(recorder.executed()) == ['a', 'b']
+    assert ('end', 'b') in recorder.events
+
+
+def test_scheduler_propagates_exceptions():
+    recorder = _Recorder(fail='b', wait={'b': ('start', 'a')})
+    with pytest.raises(ValueError):
+        StageScheduler(_Stage('abcd'), max_workers=2).run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b']
+    assert ('end', 'a') in recorder.events
+
+
+def test_scheduler_last_actor():
+    # c and d are ordered after the last actor b and must not be started even though they are ready
+    recorder = _Recorder(stop='b', wait={'a': ('end', 'b')})
+    stage = _Stage('abcd')
+    assert StageScheduler(stage, max_workers=4, last_actor='b').run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b']
+
+    # Actors ordered before the last actor are executed even if it finishes first
+    recorder = _Recorder(stop='c', wait={'a': ('end', 'c')})
+    stage = _Stage('abcd', dependencies={'b': ('a',)})
+    assert StageScheduler(stage, max_workers=4, last_actor='c').run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b', 'c']
+    assert recorder.index('end', 'c') < recorder.index('start', 'b')
+
+
+def test_scheduler_last_actor_not_stopping():
+    # The actors after the last actor are started once it has finished without requesting to stop
+    recorder = _Recorder()
+    assert not StageScheduler(_Stage('abcd'), max_workers=4, last_actor='b').run(recorder)
+    assert sorted(recorder.executed()) == ['a', 'b', 'c', 'd']
+    assert recorder.index('end', 'b') < recorder.index('start', 'c')
+    assert recorder.index('end', 'b') < recorder.index('start', 'd')
@@ -5,6 +5,7 @@ import pytest
 import six
 
 from leapp.models import Model, fields
+from leapp.models.fields import ModelMisuseError
 from leapp.topics import Topic
 
 
@@ -58,6 +59,104 @@ class RequiredFieldModel(Model):
     field = fields.String(required=True)
 
 
+class LowerCaseString(fields.String):
+    def _convert_to_model(self, value, name):
+        return super(LowerCaseString, self)._convert_to_model(value, name).lower()
+
+
+class CustomFieldModel(Model):
+    topic = ModelTestTopic
+    name = LowerCaseString()
+
+
+def test_compiled_conversion():
+    assert AllFieldTypesModel.get_plan()
+    assert WithNestedListModel.get_plan()
+    # Fields overriding the conversion are converted by their methods
+    assert not CustomFieldModel.get_plan()
+    assert CustomFieldModel.create({'name': 'ABC'}).name == 'abc'
+
+    m = AllFieldTypesModel()
+    assert m.dump() == dict((name, field._convert_from_model(getattr(m, name), name))
+                            for name, field in AllFieldTypesModel.fields.items())
+
+    # Errors are raised with the name of the field and the index of the element
+    with pytest.raises(fields.ModelViolationError) as err:
+        WithStringListModel.create({'messages': ['first', 2]})
+    assert 'messages[1]' in str(err.value)
+    with pytest.raises(fields.ModelViolationError) as err:
+        WithNestedListModel.create({'items': [{'message': 'first'}, {'message': None}]})
+    assert 'The message field is null' in str(err.value)
+    m = WithNestedListModel(items=[BasicModel(message='first')])
+    m.items.append('second')
+    with pytest.raises(fields.ModelViolationError) as err:
+        m.dump()
+    assert 'items[1]' in str(err.value)
+    with pytest.raises(fields.ModelViolationError) as err:
+        AllFieldTypesModel.create({'date_field': 'yesterday'})
+    assert "The date_field field contains an invalid datetime value: 'yesterday'" == str(err.value)
+
+
+def test_trusted_create():
+    m = AllFieldTypesModel()
+    assert AllFieldTypesModel.create(m.dump(), trusted=True) == m
+    data = WithNestedListModel(items=[BasicModel(message='first')]).dump()
+    created = WithNestedListModel.create(data, trusted=True)
+    assert created == WithNestedListModel.create(data)
+    created.items.append(BasicModel(message='second'))
+    assert len(data['items']) == 1
+    # Trusted data is not validated
+    assert WithStringListModel.create({'messages': [1]}, trusted=True).messages == [1]
+    with pytest.raises(fields.ModelViolationError):
+        WithStringListModel.create({'messages': [1]})
+    # Fields which can not be compiled are validated
+    assert CustomFieldModel.create({'name': 'ABC'}, trusted=True).name == 'abc'
+    # Required fields and undefined fields are checked nonetheless
+    with pytest.raises(fields.ModelViolationError):
+        WithStringListModel.create({}, trusted=True)
+    with pytest.raises(fields.ModelViolationError):
+        WithStringListModel.create_many([{'messages': []}, {}], trusted=True)
+    with pytest.raises(ModelMisuseError):
+        WithStringListModel.create({'messages': [], 'undefined': 1}, trusted=True)
+
+
+def test_create_many():
+    models = [WithNestedListModel(items=[BasicModel(message=str(index))] * index) for index in range(3)]
+    data = WithNestedListModel.dump_many(models)
+    assert data == [model.dump() for model in models]
+    assert WithNestedListModel.create_many(data) == models
+    assert WithNestedListModel.create_many(data, trusted=True) == models
+    assert CustomFieldModel.create_many([{'name': 'ABC'}])[0].name == 'abc'
+
+    models[1].items = 'first'
+    with pytest.raises(fields.ModelViolationError):
+        WithNestedListModel.dump_many(models)
+    with pytest.raises(fields.ModelViolationError) as err:
+        WithStringListModel.create_many([{'messages': ['first']}, {'messages': ['second', 2]}])
+    assert 'messages[1]' in str(err.value)
+    with pytest.raises(fields.ModelMisuseError):
+        WithStringListModel.create_many([{'message': ['first']}])
+
+
+def test_builtin_list_field():
+    field = fields.List(fields.Integer(allow_null=True), minimum=1)
+    for convert in (field._convert_to_model, field._convert_from_model):
+        converted = convert((1, True, 2), 'test-value')
+        assert converted == [1, True, 2] and isinstance(converted, list) and converted[1] is True
+        assert convert([1, None], 'test-value') == [1, None]
+        with pytest.raises(fields.ModelViolationError) as err:
+            convert([1, 2, 'three'], 'test-value')
+        assert 'test-value[2]' in str(err.value)
+        with pytest.raises(fields.ModelViolationError):
+            convert([], 'test-value')
+
+    data = {'messages': ('first', 'second')}
+    created = WithStringListModel.create(data)
+    assert created.messages == ['first', 'second'] and isinstance(created.messages, list)
+    created.messages.append('third')
+    assert WithStringListModel.create(created.dump()).messages == ['first', 'second', 'third']
+
+
 def test_builtin_needs_override():
     with pytest.raises(NotImplementedError):
         BadBuiltinField(allow_null=True, required=False).to_builtin(None, '', None)
@@ -1,21 +1,13 @@
 import json
 import os
 import tempfile
+import uuid
 
 import mock
-import py
 import pytest
 
-from leapp.repository.scan import scan_repo
-
-
-@pytest.fixture(scope='module')
-def repository():
-    repository_path = py.path.local(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'workflow-tests'))
-    with repository_path.as_cwd():
-        repo = scan_repo('.')
-        repo.load(resolve=True)
-        yield repo
+from leapp.config import get_config
+from leapp.utils.audit import get_checkpoints
 
 
 def test_workflow(repository):
@@ -39,6 +31,93 @@ def test_workflow(repository):
         assert not order
 
 
+def test_workflow_parallel(repository):
+    with tempfile.NamedTemporaryFile() as test_log_file:
+        os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+        workflow = repository.lookup_workflow('UnitTest')()
+        workflow.run(max_workers=4)
+        test_log_file.seek(0)
+        order = [json.loads(line.decode('utf-8'))['class_name'] for line in test_log_file]
+        assert order.pop(0) == 'FirstActor'
+        assert tuple(sorted([order.pop(0), order.pop(0)])) == ('SecondActor', 'SecondCommonActor')
+        assert tuple(sorted([order.pop(0), order.pop(0)])) == ('BeforeCommonThirdActor', 'BeforeThirdActor')
+        assert order.pop(0) == 'ThirdActor'
+        assert tuple(sorted([order.pop(0), order.pop(0)])) == ('AfterCommonThirdActor', 'AfterThirdActor')
+        assert order.pop(0) == 'FourthActor'
+        assert order.pop(0) == 'FifthActor'
+        assert not order
+
+
+@pytest.mark.parametrize('kind', ('pool', 'zygote'))
+def test_workflow_executor(repository, kind):
+    config = get_config()
+    config.set('executor', 'kind', kind)
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            workflow = repository.lookup_workflow('UnitTest')()
+            workflow.run(max_workers=2)
+            test_log_file.seek(0)
+            order = [json.loads(line.decode('utf-8'))['class_name'] for line in test_log_file]
+            assert order.pop(0) == 'FirstActor'
+            assert tuple(sorted([order.pop(0), order.pop(0)])) == ('SecondActor', 'SecondCommonActor')
+            assert tuple(sorted([order.pop(0), order.pop(0)])) == ('BeforeCommonThirdActor', 'BeforeThirdActor')
+            assert order.pop(0) == 'ThirdActor'
+            assert tuple(sorted([order.pop(0), order.pop(0)])) == ('AfterCommonThirdActor', 'AfterThirdActor')
+            assert order.pop(0) == 'FourthActor'
+            assert order.pop(0) == 'FifthActor'
+            assert not order
+    finally:
+        config.set('executor', 'kind', 'process')
+
+
+def test_workflow_audit_writer(repository):
+    config = get_config()
+    config.set('database', 'audit_writer', 'True')
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            workflow = repository.lookup_workflow('UnitTest')()
+            context = str(uuid.uuid4())
+            workflow.run(context=context, max_workers=2)
+            assert 'LEAPP_AUDIT_WRITER' not in os.environ
+            test_log_file.seek(0)
+            assert len(test_log_file.readlines()) == 10
+            assert [entry['phase'] for entry in get_checkpoints(context)][-1] == 'fifth-phase'
+    finally:
+        config.set('database', 'audit_writer', 'False')
+
+
+def test_workflow_cache(repository):
+    config = get_config()
+    config.set('messaging', 'workflow_cache', 'True')
+    try:
+        with tempfile.NamedTemporaryFile() as test_log_file:
+            os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+            workflow = repository.lookup_workflow('UnitTest')()
+            context = str(uuid.uuid4())
+            workflow.run(context=context)
+            test_log_file.seek(0)
+            assert len(test_log_file.readlines()) == 10
+            assert [entry['phase'] for entry in get_checkpoints(context)][-1] == 'fifth-phase'
+    finally:
+        config.set('messaging', 'workflow_cache', 'False')
+
+
+def test_workflow_parallel_until_actor(repository):
+    with tempfile.NamedTemporaryFile() as test_log_file:
+        os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name
+        workflow = repository.lookup_workflow('UnitTest')()
+        workflow.run(context='unit-test-context', until_actor='ThirdActor', max_workers=4)
+        test_log_file.seek(0)
+        order = [json.loads(line.decode('utf-8'))['class_name'] for line in test_log_file]
+        assert order.pop(0) == 'FirstActor'
+        assert tuple(sorted([order.pop(0), order.pop(0)])) == ('SecondActor', 'SecondCommonActor')
+        assert tuple(sorted([order.pop(0), order.pop(0)])) == ('BeforeCommonThirdActor', 'BeforeThirdActor')
+        assert order.pop(0) == 'ThirdActor'
+        assert not order
+
+
 def test_workflow_until_actor(repository):
     with tempfile.NamedTemporaryFile() as test_log_file:
         os.environ['LEAPP_TEST_EXECUTION_LOG'] = test_log_file.name